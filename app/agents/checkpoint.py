@@ -0,0 +1,49 @@
+"""Checkpoint storage for extraction agent runs."""
+import json
+from typing import Any, Dict, Optional
+
+from app.utils.executors import executors
+from app.utils.state import StateBackend
+
+
+class CheckpointStore:
+    """
+    Persist agent state after each node, keyed by document.
+
+    Checkpoints live in a :class:`StateBackend`, so the store is in-memory,
+    SQLite or Redis depending on the backend passed in, and a retry can
+    resume on any worker sharing that backend.
+    """
+
+    def __init__(self, backend: StateBackend, ttl_seconds: float = 86400):
+        """
+        Initialize the store.
+
+        Args:
+            backend: State backend holding the checkpoints
+            ttl_seconds: How long an unfinished run can be resumed
+        """
+        self.backend = backend
+        self.ttl_seconds = ttl_seconds
+
+    @staticmethod
+    def _key(thread_id: str) -> str:
+        return f"agent:{thread_id}"
+
+    async def load(self, thread_id: str) -> Optional[Dict[str, Any]]:
+        """Return the last checkpointed state for a run, if any."""
+        raw = await executors.run_io(self.backend.get, self._key(thread_id))
+        return json.loads(raw) if raw is not None else None
+
+    async def save(self, thread_id: str, state: Dict[str, Any]) -> None:
+        """Checkpoint the state of a run."""
+        await executors.run_io(
+            self.backend.set,
+            self._key(thread_id),
+            json.dumps(state, default=str),
+            self.ttl_seconds,
+        )
+
+    async def clear(self, thread_id: str) -> None:
+        """Drop the checkpoint of a finished run."""
+        await executors.run_io(self.backend.delete, self._key(thread_id))
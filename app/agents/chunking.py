@@ -0,0 +1,189 @@
+"""Map-reduce extraction support for long OCR transcripts.
+
+Long multi-page packets are split into chunks on page boundaries (form feeds
+between OCR'd pages) and, inside an oversized page, on section boundaries
+(blank lines and Markdown headings). Fields are extracted from every chunk
+concurrently, so latency follows the longest chunk rather than the whole
+transcript, and the per-chunk results are merged deterministically:
+
+- list fields (diagnosis codes, service lines) are concatenated in page
+  order without duplicates
+- any other field takes the value with the best local confidence, then the
+  one most chunks agree on, then the one from the earliest page
+
+Every merged field records the pages its value came from.
+"""
+import json
+import re
+from dataclasses import dataclass
+from typing import Any, Dict, List, Sequence, Tuple
+
+from app.agents.validators import is_empty, normalise
+
+PAGE_BREAK = "\f"
+
+# Blank lines and Markdown headings start a new section
+_SECTION_BREAK = re.compile(r"\n\s*\n|\n(?=#{1,6} )")
+
+
+@dataclass
+class Chunk:
+    """A slice of the OCR transcript covering one or more whole pages, or part of one."""
+
+    text: str
+    first_page: int
+    last_page: int
+
+    @property
+    def pages(self) -> List[int]:
+        """1-based page numbers the chunk covers."""
+        return list(range(self.first_page, self.last_page + 1))
+
+
+def _sections(text: str, max_chars: int) -> List[str]:
+    """Split one page into pieces of at most ``max_chars``, preferring section breaks."""
+    pieces: List[str] = []
+    current = ""
+    for section in _SECTION_BREAK.split(text):
+        section = section.strip("\n")
+        if not section:
+            continue
+        while len(section) > max_chars:
+            # No section break close enough; cut at the last line break (or hard cut)
+            cut = section.rfind("\n", 0, max_chars)
+            cut = cut if cut > 0 else max_chars
+            if current:
+                pieces.append(current)
+                current = ""
+            pieces.append(section[:cut])
+            section = section[cut:].lstrip("\n")
+        if current and len(current) + 2 + len(section) > max_chars:
+            pieces.append(current)
+            current = ""
+        current = f"{current}\n\n{section}" if current else section
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+def split_transcript(ocr_text: str, max_chars: int) -> List[Chunk]:
+    """
+    Split OCR text into chunks of at most ``max_chars`` characters.
+
+    Consecutive short pages are packed into one chunk; a page longer than
+    ``max_chars`` is split at section boundaries.
+
+    Args:
+        ocr_text: Transcript with pages separated by form feeds
+        max_chars: Largest chunk, in characters
+
+    Returns:
+        Chunks in page order (a single chunk if the text fits)
+    """
+    chunks: List[Chunk] = []
+    pending: List[str] = []
+    pending_first = 1
+
+    def flush(last_page: int) -> None:
+        if pending:
+            chunks.append(Chunk("\n\n".join(pending), pending_first, last_page))
+            pending.clear()
+
+    for number, page in enumerate(ocr_text.split(PAGE_BREAK), start=1):
+        page = page.strip()
+        if not page:
+            continue
+        if len(page) > max_chars:
+            flush(number - 1)
+            chunks.extend(Chunk(piece, number, number) for piece in _sections(page, max_chars))
+            continue
+        if pending and sum(len(p) + 2 for p in pending) + len(page) > max_chars:
+            flush(number - 1)
+        if not pending:
+            pending_first = number
+        pending.append(page)
+        last = number
+    if pending:
+        flush(last)
+    return chunks or [Chunk(ocr_text, 1, 1)]
+
+
+def _identity(value: Any) -> str:
+    """Comparable spelling of a value, ignoring case, punctuation and key order."""
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, sort_keys=True, default=str).upper()
+    return normalise(str(value))
+
+
+def merge_extractions(
+    results: Sequence[Tuple[Chunk, Dict[str, Any], Dict[str, float]]]
+) -> Tuple[Dict[str, Any], Dict[str, List[int]], List[Dict[str, str]]]:
+    """
+    Merge per-chunk extractions into one set of fields.
+
+    Args:
+        results: ``(chunk, fields, confidence)`` per chunk, in page order
+
+    Returns:
+        Merged fields, source pages per field, and one reasoning-log entry
+        per field whose chunks disagreed
+    """
+    merged: Dict[str, Any] = {}
+    provenance: Dict[str, List[int]] = {}
+    conflicts: List[Dict[str, str]] = []
+
+    names: List[str] = []
+    for _, fields, _ in results:
+        names.extend(name for name in fields if name not in names)
+
+    for name in names:
+        candidates = [
+            (chunk, fields[name], confidence.get(name, 0.0))
+            for chunk, fields, confidence in results
+            if not is_empty(fields.get(name))
+        ]
+        if not candidates:
+            merged[name] = next(
+                (fields[name] for _, fields, _ in results if name in fields), None
+            )
+            continue
+
+        if all(isinstance(value, list) for _, value, _ in candidates):
+            items, seen, pages = [], set(), []
+            for chunk, value, _ in candidates:
+                for item in value:
+                    key = _identity(item)
+                    if key not in seen:
+                        seen.add(key)
+                        items.append(item)
+                pages.extend(p for p in chunk.pages if p not in pages)
+            merged[name] = items
+            provenance[name] = pages
+            continue
+
+        votes: Dict[str, int] = {}
+        for _, value, _ in candidates:
+            votes[_identity(value)] = votes.get(_identity(value), 0) + 1
+        # Best confidence, then most agreement, then earliest page
+        order = sorted(
+            range(len(candidates)),
+            key=lambda i: (-candidates[i][2], -votes[_identity(candidates[i][1])], i),
+        )
+        chunk, value, score = candidates[order[0]]
+        chosen = _identity(value)
+        merged[name] = value
+        provenance[name] = sorted(
+            {p for c, v, _ in candidates if _identity(v) == chosen for p in c.pages}
+        )
+        rejected = [(c, v) for c, v, _ in candidates if _identity(v) != chosen]
+        if rejected:
+            others = "; ".join(f"{v!r} (pages {c.first_page}-{c.last_page})" for c, v in rejected)
+            conflicts.append({
+                "step": "chunk_merge",
+                "reasoning": (
+                    f"{name}: chose {value!r} (confidence {score:.2f}, "
+                    f"{votes[chosen]} of {len(candidates)} chunks) over {others}"
+                ),
+            })
+
+    return merged, provenance, conflicts
@@ -0,0 +1,61 @@
+"""CMS-1500 field catalogue used by the extraction agent.
+
+Maps each extracted field to the printed label (box caption) that signals
+its presence in OCR text, so field identification needs no LLM call.
+"""
+import re
+from typing import Dict, List, Pattern
+
+
+FORM_TYPE = "CMS-1500"
+
+FIELD_LABELS: Dict[str, Pattern[str]] = {
+    name: re.compile(pattern, re.IGNORECASE)
+    for name, pattern in {
+        "patient_name": r"PATIENT'?S NAME",
+        "patient_dob": r"PATIENT'?S BIRTH DATE",
+        "patient_sex": r"\bSEX\b",
+        "patient_address": r"PATIENT'?S ADDRESS",
+        "insured_id": r"INSURED'?S I\.?D\.? NUMBER",
+        "insured_name": r"INSURED'?S NAME",
+        "insured_group_number": r"INSURED'?S POLICY GROUP",
+        "referring_provider_npi": r"17b\.? NPI|REFERRING PROVIDER",
+        "diagnosis_codes": r"DIAGNOSIS OR NATURE",
+        "prior_authorization_number": r"PRIOR AUTHORIZATION",
+        "service_lines": r"DATE\(S\) OF SERVICE",
+        "federal_tax_id": r"FEDERAL TAX I\.?D",
+        "patient_account_number": r"PATIENT'?S ACCOUNT",
+        "total_charge": r"TOTAL CHARGE",
+        "amount_paid": r"AMOUNT PAID",
+        "billing_provider_name": r"BILLING PROVIDER",
+        "billing_provider_npi": r"33a\.? NPI|BILLING PROVIDER",
+    }.items()
+}
+
+# Fields every submitted claim carries; a weak extraction of any of them
+# escalates the model cascade
+REQUIRED_FIELDS: List[str] = [
+    "patient_name",
+    "patient_dob",
+    "insured_id",
+    "diagnosis_codes",
+    "service_lines",
+    "total_charge",
+    "billing_provider_npi",
+]
+
+FORM_MARKERS: List[Pattern[str]] = [
+    re.compile(r"HEALTH INSURANCE CLAIM FORM", re.IGNORECASE),
+    re.compile(r"\b1500\b"),
+    re.compile(r"\bNUCC\b", re.IGNORECASE),
+]
+
+
+def identify_fields(ocr_text: str) -> List[str]:
+    """Return the fields whose box labels appear in the OCR text."""
+    return [name for name, label in FIELD_LABELS.items() if label.search(ocr_text)]
+
+
+def looks_like_form(ocr_text: str) -> bool:
+    """Return True if the OCR text carries any CMS-1500 header marker."""
+    return any(marker.search(ocr_text) for marker in FORM_MARKERS)
@@ -0,0 +1,299 @@
+"""ICD-10-CM / HCPCS code index and OCR-confusion correction.
+
+Code sets are plain text files in ``CODE_SETS_DIR`` (one code per line,
+optionally followed by a description, ``#`` for comments). Each is compiled
+once into a sorted, fixed-width ``.idx`` file next to it and memory-mapped,
+so every worker shares one copy through the page cache and startup only
+pays for a rebuild when the source file changes.
+
+Codes that are malformed (or, with ``CODE_INDEX_STRICT=True``, missing from
+the index) are corrected by substituting characters OCR commonly confuses
+(O/0, I/1, S/5, ...). A correction is applied only when exactly one nearest
+candidate exists, so ambiguous codes are left for review rather than guessed.
+"""
+import itertools
+import mmap
+import os
+import re
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Pattern, Tuple
+
+from app.agents.validators import is_empty, npi_valid
+from app.config import settings
+
+
+_MAGIC = b"CIDX"
+_HEADER = 8  # magic, record width (2 bytes), reserved
+
+# Characters OCR engines mistake for each other
+CONFUSIONS: Dict[str, str] = {
+    "0": "ODQ", "O": "0DQ", "D": "0O", "Q": "0O",
+    "1": "IL", "I": "1L", "L": "1I",
+    "2": "Z", "Z": "2",
+    "5": "S", "S": "5",
+    "6": "G", "G": "6",
+    "8": "B", "B": "8",
+    "7": "T", "T": "7",
+    "4": "A", "A": "4",
+}
+
+_DIGIT_FOR = {"O": "0", "D": "0", "Q": "0", "I": "1", "L": "1", "Z": "2",
+              "S": "5", "G": "6", "B": "8", "T": "7", "A": "4"}
+
+# The third character of an ICD-10-CM category is a digit except in a few categories
+ICD10_SHAPE = re.compile(r"^(?:[A-TV-Z][0-9]{2}|C4A|C7[AB]|D3A|M1A|O9A|Z3A)[0-9A-Z]{0,4}$")
+HCPCS_SHAPE = re.compile(r"^(?:[0-9]{4}[0-9FTU]|[A-V][0-9]{4})$")
+
+
+def _clean(code: Any) -> str:
+    return re.sub(r"[\s.]", "", str(code)).upper()
+
+
+class CodeIndex:
+    """Sorted, memory-mapped set of codes from one code-set file."""
+
+    def __init__(self, name: str, source: Path, shape: Pattern[str]):
+        """
+        Initialize the index; nothing is read until :meth:`load`.
+
+        Args:
+            name: Code set name, for logs
+            source: Text file with one code per line
+            shape: Regex a well-formed code (without dots) matches
+        """
+        self.name = name
+        self.source = Path(source)
+        self.shape = shape
+        self._data: Optional[Any] = None  # mmap or bytes
+        self._width = 0
+        self._count = 0
+
+    @property
+    def path(self) -> Path:
+        """Compiled index file next to the source."""
+        return self.source.with_suffix(".idx")
+
+    def load(self) -> None:
+        """Map the compiled index, rebuilding it if the source is newer."""
+        if self._data is not None:
+            return
+        if not self.source.exists():
+            print(f"Code set {self.name}: {self.source} not found; index is empty")
+            self._data, self._width, self._count = b"", 1, 0
+            return
+        if not self.path.exists() or self.path.stat().st_mtime < self.source.stat().st_mtime:
+            blob = self._compile()
+            try:
+                tmp = self.path.with_suffix(f".idx.{os.getpid()}")
+                tmp.write_bytes(blob)
+                os.replace(tmp, self.path)
+            except OSError as e:
+                print(f"Code set {self.name}: could not write {self.path}: {e}")
+                self._set(blob)
+                return
+        with open(self.path, "rb") as f:
+            self._set(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+    def _compile(self) -> bytes:
+        codes = set()
+        with open(self.source, encoding="utf-8") as f:
+            for line in f:
+                token = line.split(None, 1)[0] if line.strip() else ""
+                if token and not token.startswith("#"):
+                    codes.add(_clean(token).encode("ascii"))
+        width = max((len(code) for code in codes), default=1)
+        records = b"".join(code.ljust(width) for code in sorted(codes))
+        return _MAGIC + width.to_bytes(2, "little") + b"\0\0" + records
+
+    def _set(self, data: Any) -> None:
+        if data[:4] != _MAGIC:
+            raise ValueError(f"{self.path} is not a code index")
+        self._width = int.from_bytes(data[4:6], "little")
+        self._count = (len(data) - _HEADER) // self._width
+        self._data = data
+
+    def __len__(self) -> int:
+        self.load()
+        return self._count
+
+    def _record(self, index: int) -> bytes:
+        start = _HEADER + index * self._width
+        return self._data[start:start + self._width]
+
+    def __contains__(self, code: Any) -> bool:
+        self.load()
+        key = _clean(code).encode("ascii", "replace")
+        if not key or len(key) > self._width:
+            return False
+        key = key.ljust(self._width)
+        low, high = 0, self._count
+        while low < high:
+            mid = (low + high) // 2
+            if self._record(mid) < key:
+                low = mid + 1
+            else:
+                high = mid
+        return low < self._count and self._record(low) == key
+
+    def well_formed(self, code: Any) -> bool:
+        """Return True if the code has the shape of this code set."""
+        return bool(self.shape.match(_clean(code)))
+
+    def valid(self, code: Any) -> bool:
+        """Well-formed, and in the index when ``CODE_INDEX_STRICT`` is set."""
+        if not self.well_formed(code):
+            return False
+        return code in self if settings.code_index_strict else True
+
+    def nearest(self, code: Any, max_substitutions: int = 2) -> List[str]:
+        """
+        Return the valid codes closest to ``code`` under OCR confusions.
+
+        Candidates in the index win over candidates that are only well
+        formed; among those, fewer substitutions win.
+
+        Args:
+            code: Code as extracted
+            max_substitutions: Most characters to substitute
+
+        Returns:
+            All candidates at the best distance (dots removed)
+        """
+        clean = _clean(code)
+        for substitutions in range(1, max_substitutions + 1):
+            indexed, formed = [], []
+            for candidate in _substitutions(clean, substitutions):
+                if candidate in self:
+                    indexed.append(candidate)
+                elif self.well_formed(candidate) and not settings.code_index_strict:
+                    formed.append(candidate)
+            if indexed or formed:
+                return sorted(set(indexed or formed))
+        return []
+
+
+def _substitutions(code: str, count: int) -> Iterator[str]:
+    """Yield spellings of ``code`` with exactly ``count`` confusable characters swapped."""
+    positions = [i for i, char in enumerate(code) if char in CONFUSIONS]
+    for chosen in itertools.combinations(positions, count):
+        for replacements in itertools.product(*(CONFUSIONS[code[i]] for i in chosen)):
+            chars = list(code)
+            for i, replacement in zip(chosen, replacements):
+                chars[i] = replacement
+            yield "".join(chars)
+
+
+def _format_like(original: Any, code: str, dotted_after: int) -> str:
+    """Restore the dot (after ``dotted_after`` characters) if the original had one."""
+    if dotted_after and "." in str(original) and len(code) > dotted_after:
+        return f"{code[:dotted_after]}.{code[dotted_after:]}"
+    return code
+
+
+def correct_npi(value: Any) -> Optional[str]:
+    """
+    Return a corrected NPI, or None if the value is valid or cannot be fixed.
+
+    Only letters OCR substitutes for digits are mapped back. An all-digit
+    NPI that fails its check digit is left as extracted (and fails
+    validation, so it is reviewed): about one in ten digit swaps passes the
+    check, so guessing would invent plausible provider identifiers.
+    """
+    text = str(value).strip()
+    if npi_valid(text):
+        return None
+    digits = "".join(_DIGIT_FOR.get(c, c) for c in text.upper() if not c.isspace() and c != "-")
+    if not digits.isdigit() or len(digits) != 10:
+        return None
+    return digits if npi_valid(digits) else None
+
+
+class CodeSets:
+    """The code indexes used to check and correct extracted CMS-1500 fields."""
+
+    def __init__(self, directory: Path):
+        """
+        Initialize the code sets from a directory of code-set files.
+
+        Args:
+            directory: Directory with ``icd10cm.txt`` and ``hcpcs.txt``
+        """
+        directory = Path(directory)
+        self.icd10 = CodeIndex("icd10cm", directory / "icd10cm.txt", ICD10_SHAPE)
+        self.hcpcs = CodeIndex("hcpcs", directory / "hcpcs.txt", HCPCS_SHAPE)
+
+    def load(self) -> None:
+        """Map every index (rebuilding stale ones)."""
+        self.icd10.load()
+        self.hcpcs.load()
+
+    @staticmethod
+    def _correct(index: CodeIndex, code: Any, dotted_after: int = 0) -> Optional[str]:
+        if is_empty(code) or index.valid(code):
+            return None
+        candidates = index.nearest(code)
+        if len(candidates) != 1:
+            return None
+        return _format_like(code, candidates[0], dotted_after)
+
+    def correct_fields(self, fields: Dict[str, Any]) -> Tuple[Dict[str, Any], List[Dict[str, str]]]:
+        """
+        Correct OCR confusions in diagnosis codes, procedure codes and NPIs.
+
+        Args:
+            fields: Extracted fields (not modified)
+
+        Returns:
+            Corrected copy of the fields, and one ``{"field", "from", "to"}``
+            record per correction
+        """
+        fields = dict(fields)
+        corrections: List[Dict[str, str]] = []
+
+        def fix(path: str, old: Any, new: Optional[str]) -> Any:
+            if new is None or new == old:
+                return old
+            corrections.append({"field": path, "from": str(old), "to": new})
+            return new
+
+        codes = fields.get("diagnosis_codes")
+        if isinstance(codes, list):
+            fields["diagnosis_codes"] = [
+                fix(f"diagnosis_codes[{i}]", code, self._correct(self.icd10, code, dotted_after=3))
+                for i, code in enumerate(codes)
+            ]
+
+        for name in ("referring_provider_npi", "billing_provider_npi"):
+            if not is_empty(fields.get(name)):
+                fields[name] = fix(name, fields[name], correct_npi(fields[name]))
+
+        lines = fields.get("service_lines")
+        if isinstance(lines, list):
+            fixed_lines = []
+            for i, line in enumerate(lines):
+                if isinstance(line, dict):
+                    line = dict(line)
+                    for key, value in line.items():
+                        lowered = key.lower()
+                        path = f"service_lines[{i}].{key}"
+                        if is_empty(value) or isinstance(value, (list, dict)):
+                            continue
+                        if "procedure" in lowered or "cpt" in lowered or "hcpcs" in lowered:
+                            line[key] = fix(path, value, self._correct(self.hcpcs, value))
+                        elif "npi" in lowered:
+                            line[key] = fix(path, value, correct_npi(value))
+                fixed_lines.append(line)
+            fields["service_lines"] = fixed_lines
+
+        return fields, corrections
+
+
+def correction_log(corrections: List[Dict[str, str]]) -> Dict[str, str]:
+    """Reasoning-log entry describing code corrections."""
+    return {
+        "step": "code_correction",
+        "reasoning": "; ".join(f"{c['field']}: {c['from']} -> {c['to']}" for c in corrections),
+    }
+
+
+code_sets = CodeSets(Path(settings.code_sets_dir))
@@ -0,0 +1,234 @@
+"""Local confidence scoring for extracted fields.
+
+Scores every field of a form without an LLM call by combining three kinds of
+evidence:
+
+- OCR support: the value (or a reformatted spelling of it) appears in the
+  OCR text exactly, or approximately by edit distance
+- Format rules: NPI check digits, ICD-10 shape, date sanity and charge
+  totals from :mod:`app.agents.validators`
+- Provider token log-probabilities for the value, when the completion
+  carried them (``LLM_LOGPROBS=True``)
+
+The OCR text is normalised and tokenised once per form and shared by all of
+its fields, so a whole form scores in a few milliseconds. :func:`score_forms`
+scores a batch of forms (such as the chunks of a packet) in one pass: forms
+with the same OCR text share one index, and the evidence for every field of
+every form is combined together.
+"""
+import bisect
+import math
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import editdistance
+
+from app.agents.validators import (
+    FIELD_RULES,
+    cross_field_failures,
+    is_empty,
+    leaves,
+    normalise,
+    value_variants,
+)
+
+
+# Relative weight of each kind of evidence; missing evidence is left out
+# and the remaining weights renormalised
+WEIGHTS = {"ocr": 0.6, "format": 0.25, "logprob": 0.15}
+
+# A value that breaks a hard rule (check digit, totals) is probably wrong
+# however close it is to the OCR text
+RULE_FAILURE_CAP = 0.3
+
+# Fuzzy matches below this similarity count as no OCR support
+MIN_SIMILARITY = 0.5
+
+
+class OCREvidence:
+    """Normalised OCR text of one form, for exact and fuzzy value lookup."""
+
+    def __init__(self, ocr_text: str):
+        """
+        Index the OCR text.
+
+        Args:
+            ocr_text: Text the fields were extracted from
+        """
+        self.tokens = normalise(ocr_text).split()
+        self.haystack = f" {' '.join(self.tokens)} "
+        self._windows: Dict[int, List[str]] = {}
+        self._similarity: Dict[str, float] = {}
+
+    def _ngrams(self, size: int) -> List[str]:
+        windows = self._windows.get(size)
+        if windows is None:
+            windows = self._windows[size] = [
+                " ".join(self.tokens[i:i + size])
+                for i in range(max(1, len(self.tokens) - size + 1))
+            ]
+        return windows
+
+    def similarity(self, needle: str) -> float:
+        """
+        Return how well a normalised value is supported by the OCR text.
+
+        Args:
+            needle: Normalised value
+
+        Returns:
+            1.0 for an exact token match, otherwise the best ``1 - distance /
+            length`` over OCR windows with the same number of tokens
+        """
+        score = self._similarity.get(needle)
+        if score is None:
+            score = self._similarity[needle] = self._best_similarity(needle)
+        return score
+
+    def _best_similarity(self, needle: str) -> float:
+        if f" {needle} " in self.haystack:
+            return 1.0
+        size = needle.count(" ") + 1
+        best = len(needle)
+        for window in self._ngrams(size):
+            # Edit distance is at least the length difference; skip hopeless windows
+            if abs(len(window) - len(needle)) >= best:
+                continue
+            distance = editdistance.eval(needle, window)
+            if distance < best:
+                best = distance
+                if best == 1:
+                    break
+        score = 1.0 - best / max(len(needle), 1)
+        return score if score >= MIN_SIMILARITY else 0.0
+
+    def support(self, value: Any) -> Optional[float]:
+        """Average OCR support over the scalars of a field value."""
+        scores = []
+        for scalar in leaves(value):
+            variants = value_variants(scalar)
+            if variants:
+                scores.append(max(self.similarity(variant) for variant in variants))
+        return sum(scores) / len(scores) if scores else None
+
+
+def _format_score(name: str, value: Any, cross: Dict[str, str]) -> Optional[float]:
+    if name in cross:
+        return 0.0
+    rule = FIELD_RULES.get(name)
+    if rule is None:
+        return None
+    return 1.0 if rule(value) else 0.0
+
+
+def _token_spans(token_logprobs: Sequence[Tuple[str, float]]) -> Tuple[List[int], List[float]]:
+    starts, probs = [], []
+    offset = 0
+    for token, logprob in token_logprobs:
+        starts.append(offset)
+        probs.append(math.exp(logprob))
+        offset += len(token)
+    starts.append(offset)
+    return starts, probs
+
+
+def _logprob_score(
+    value: Any,
+    raw_response: str,
+    spans: Optional[Tuple[List[int], List[float]]]
+) -> Optional[float]:
+    """Mean token probability over the value's first occurrence in the response."""
+    if spans is None:
+        return None
+    starts, probs = spans
+    scores = []
+    for scalar in leaves(value):
+        text = str(scalar)
+        begin = raw_response.find(text)
+        if begin == -1:
+            continue
+        first = bisect.bisect_right(starts, begin) - 1
+        last = bisect.bisect_left(starts, begin + len(text))
+        covered = probs[first:last]
+        if covered:
+            scores.append(sum(covered) / len(covered))
+    return sum(scores) / len(scores) if scores else None
+
+
+@dataclass
+class FormFields:
+    """One form's extracted fields and the evidence to score them against."""
+
+    fields: Dict[str, Any]
+    ocr_text: str
+    raw_response: Optional[str] = None
+    token_logprobs: Optional[Sequence[Tuple[str, float]]] = None
+
+
+def _combine(features: Dict[str, Optional[float]]) -> Optional[float]:
+    weight = sum(WEIGHTS[k] for k, v in features.items() if v is not None)
+    if weight == 0:
+        return None
+    score = sum(WEIGHTS[k] * v for k, v in features.items() if v is not None) / weight
+    if features["format"] == 0.0:
+        score = min(score, RULE_FAILURE_CAP)
+    return round(score, 3)
+
+
+def score_forms(forms: Sequence[FormFields]) -> List[Dict[str, float]]:
+    """
+    Score every non-empty field of a batch of forms between 0 and 1.
+
+    Args:
+        forms: Forms to score
+
+    Returns:
+        Confidence per field, one mapping per form in input order
+    """
+    indexes: Dict[str, OCREvidence] = {}
+    rows: List[Tuple[int, str, Dict[str, Optional[float]]]] = []
+    for position, form in enumerate(forms):
+        evidence = indexes.get(form.ocr_text)
+        if evidence is None:
+            evidence = indexes[form.ocr_text] = OCREvidence(form.ocr_text)
+        cross = cross_field_failures(form.fields)
+        spans = (
+            _token_spans(form.token_logprobs)
+            if form.token_logprobs and form.raw_response else None
+        )
+        for name, value in form.fields.items():
+            if is_empty(value):
+                continue
+            rows.append((position, name, {
+                "ocr": evidence.support(value),
+                "format": _format_score(name, value, cross),
+                "logprob": _logprob_score(value, form.raw_response or "", spans),
+            }))
+
+    confidence: List[Dict[str, float]] = [{} for _ in forms]
+    for position, name, features in rows:
+        score = _combine(features)
+        if score is not None:
+            confidence[position][name] = score
+    return confidence
+
+
+def score_fields(
+    fields: Dict[str, Any],
+    ocr_text: str,
+    raw_response: Optional[str] = None,
+    token_logprobs: Optional[Sequence[Tuple[str, float]]] = None
+) -> Dict[str, float]:
+    """
+    Score every non-empty extracted field of one form between 0 and 1.
+
+    Args:
+        fields: Extracted field values
+        ocr_text: Text the fields were extracted from
+        raw_response: Completion text the fields were parsed from
+        token_logprobs: ``(token, logprob)`` pairs of that completion
+
+    Returns:
+        Confidence per field
+    """
+    return score_forms([FormFields(fields, ocr_text, raw_response, token_logprobs)])[0]
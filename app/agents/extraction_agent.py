@@ -1,14 +1,35 @@
 """LangGraph-based extraction agent for medical forms.
 
-This module will contain the agentic workflow for field extraction with:
+This module contains the agentic workflow for field extraction with:
 - Multi-step extraction process
 - State management via LangGraph
-- Conditional routing between extraction tasks
 - Full reasoning trace capture
-- Checkpoint/rollback capabilities
+- Conditional routing, so clean forms take a single LLM call
+- Per-node checkpoints, so a failed run resumes from the last good node
 """
-from typing import Dict, Any, List, TypedDict
-from langgraph.graph import StateGraph, END
+import hashlib
+import json
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple, TypedDict
+
+from app.agents import cms1500
+from app.agents.checkpoint import CheckpointStore
+from app.agents.codes import code_sets, correction_log
+from app.agents.confidence import score_fields
+from app.agents.validators import validate_fields
+from app.config import settings
+from app.utils.metrics import AGENT_LLM_CALLS, stage
+from app.utils.tracing import tracer
+
+
+NODES = [
+    "validate_form",
+    "identify_fields",
+    "extract_values",
+    "validate_cross_fields",
+    "score_confidence",
+]
+
+END = "__end__"  # langgraph.graph.END, without importing LangGraph
 
 
 class ExtractionState(TypedDict):
@@ -16,13 +37,25 @@ class ExtractionState(TypedDict):
 
     ocr_text: str
     form_type: str
+    document_id: str
+    identified_fields: List[str]
     extracted_fields: Dict[str, Any]
+    validated_fields: List[str]
+    failed_fields: Dict[str, str]
+    reextract_rounds: int
+    raw_response: str
+    token_logprobs: Optional[List[Tuple[str, float]]]
     reasoning_log: List[Dict[str, str]]
     confidence_scores: Dict[str, float]
     current_step: str
+    completed_nodes: List[str]
+    llm_calls: int
     errors: List[str]
 
 
+NodeFn = Callable[[ExtractionState], Awaitable[Dict[str, Any]]]
+
+
 class ExtractionAgent:
     """
     LangGraph-based agent for structured field extraction from medical forms.
@@ -34,20 +67,29 @@ class ExtractionAgent:
     4. Cross-field validation
     5. Confidence scoring
 
-    All steps are logged for transparency and debugging.
+    Deterministic checks (``app.agents.validators``) route the graph: if
+    every field passes, cross-field review needs no LLM call; fields that
+    fail are extracted again (up to ``AGENT_MAX_REEXTRACT_ROUNDS`` times)
+    before an LLM review of just those fields. Confidence is scored locally
+    (``app.agents.confidence``). ``llm_calls`` in the final state counts the
+    calls a form needed.
+
+    All steps are logged for transparency and debugging. With a checkpoint
+    store, the state is saved after every node; running the same document
+    again after a failure resumes after the last node that completed.
     """
 
-    def __init__(self, llm_connector):
+    def __init__(self, llm_connector, checkpoints: Optional[CheckpointStore] = None):
         """
         Initialize extraction agent.
 
         Args:
             llm_connector: LLM connector instance for Kimi K2
+            checkpoints: Optional store for per-node checkpoints
         """
         self.llm = llm_connector
+        self.checkpoints = checkpoints
         self.graph = None
-        # TODO: Build LangGraph workflow
-        # self._build_graph()
 
     def _build_graph(self):
         """
@@ -56,32 +98,64 @@ class ExtractionAgent:
         Nodes:
         - validate_form: Confirm form type and structure
         - identify_fields: Determine which fields are present
-        - extract_values: Extract value for each field
+        - extract_values: Extract value for each field (or only failed ones)
         - validate_cross_fields: Check consistency across fields
         - score_confidence: Calculate confidence per field
 
-        Edges define conditional routing based on validation results.
+        Every edge is conditional (see ``_route_after``), and so is the entry
+        point, which resumes a checkpointed state after its last node.
         """
-        # TODO: Implement LangGraph workflow
-        # workflow = StateGraph(ExtractionState)
-        # workflow.add_node("validate_form", self._validate_form)
-        # workflow.add_node("identify_fields", self._identify_fields)
-        # workflow.add_node("extract_values", self._extract_values)
-        # workflow.add_node("validate_cross_fields", self._validate_cross_fields)
-        # workflow.add_node("score_confidence", self._score_confidence)
-        # workflow.set_entry_point("validate_form")
-        # workflow.add_edge("validate_form", "identify_fields")
-        # workflow.add_edge("identify_fields", "extract_values")
-        # workflow.add_edge("extract_values", "validate_cross_fields")
-        # workflow.add_edge("validate_cross_fields", "score_confidence")
-        # workflow.add_edge("score_confidence", END)
-        # self.graph = workflow.compile()
-        pass
+        # LangGraph is imported here so importing this module stays cheap
+        from langgraph.graph import StateGraph
+
+        workflow = StateGraph(ExtractionState)
+        for name in NODES:
+            workflow.add_node(name, self._checkpointed(name, getattr(self, f"_{name}")))
+            workflow.add_conditional_edges(
+                name, lambda state, name=name: self._route_after(name, state)
+            )
+        workflow.set_conditional_entry_point(self._resume_point)
+        return workflow.compile()
+
+    @staticmethod
+    def _route_after(name: str, state: ExtractionState) -> str:
+        """Return the node that follows ``name`` for this state."""
+        if name == "validate_cross_fields":
+            return "extract_values" if state["failed_fields"] else "score_confidence"
+        if name == NODES[-1]:
+            return END
+        return NODES[NODES.index(name) + 1]
+
+    def _resume_point(self, state: ExtractionState) -> str:
+        """Entry router: the first node, or the one after the last checkpointed node."""
+        if not state["completed_nodes"]:
+            return NODES[0]
+        return self._route_after(state["completed_nodes"][-1], state)
+
+    def _checkpointed(self, name: str, node: NodeFn) -> NodeFn:
+        """Wrap a node so its state is checkpointed after it runs."""
+
+        async def run(state: ExtractionState) -> Dict[str, Any]:
+            with tracer.span(f"agent.{name}", {"document_id": state["document_id"]}):
+                update = await node(state)
+            update["completed_nodes"] = state["completed_nodes"] + [name]
+            update["current_step"] = name
+            if self.checkpoints is not None:
+                await self.checkpoints.save(state["document_id"], {**state, **update})
+            return update
+
+        return run
+
+    def _thread_id(self, ocr_text: str, form_type: str, document_id: Optional[str]) -> str:
+        """Checkpoint key: the document, form type and model that produced the state."""
+        document = document_id or hashlib.sha256(ocr_text.encode("utf-8")).hexdigest()
+        return f"{document}:{form_type}:{self.llm.model}"
 
     async def extract(
         self,
         ocr_text: str,
-        form_type: str = "CMS-1500"
+        form_type: str = "CMS-1500",
+        document_id: Optional[str] = None
     ) -> ExtractionState:
         """
         Execute the extraction workflow on OCR text.
@@ -89,55 +163,218 @@ class ExtractionAgent:
         Args:
             ocr_text: Text extracted from medical form
             form_type: Type of form being processed
+            document_id: Stable id for checkpoints, normally the document
+                SHA-256 (defaults to a hash of the OCR text)
 
         Returns:
             Final extraction state with all fields and metadata
         """
-        # TODO: Implement agent execution
-        # initial_state = ExtractionState(
-        #     ocr_text=ocr_text,
-        #     form_type=form_type,
-        #     extracted_fields={},
-        #     reasoning_log=[],
-        #     confidence_scores={},
-        #     current_step="start",
-        #     errors=[]
-        # )
-        # final_state = await self.graph.ainvoke(initial_state)
-        # return final_state
-
-        # Placeholder implementation
-        return ExtractionState(
-            ocr_text=ocr_text,
-            form_type=form_type,
-            extracted_fields={},
-            reasoning_log=[{"step": "placeholder", "reasoning": "Agent not implemented"}],
-            confidence_scores={},
-            current_step="complete",
-            errors=[]
-        )
+        if self.graph is None:
+            self.graph = self._build_graph()
+
+        thread_id = self._thread_id(ocr_text, form_type, document_id)
+        state = None
+        if self.checkpoints is not None:
+            state = await self.checkpoints.load(thread_id)
+        if state is None:
+            state = ExtractionState(
+                ocr_text=ocr_text,
+                form_type=form_type,
+                document_id=thread_id,
+                identified_fields=[],
+                extracted_fields={},
+                validated_fields=[],
+                failed_fields={},
+                reextract_rounds=0,
+                raw_response="",
+                token_logprobs=None,
+                reasoning_log=[],
+                confidence_scores={},
+                current_step="start",
+                completed_nodes=[],
+                llm_calls=0,
+                errors=[]
+            )
+
+        with tracer.span(
+            "agent.extract",
+            {
+                "form_type": form_type,
+                "ocr.chars": len(ocr_text),
+                "agent.resumed_nodes": len(state["completed_nodes"]),
+            },
+        ):
+            final_state = await self.graph.ainvoke(state)
+
+        if self.checkpoints is not None:
+            await self.checkpoints.clear(thread_id)
+        AGENT_LLM_CALLS.observe(final_state["llm_calls"], form_type=form_type)
+        final_state["current_step"] = "complete"
+        return final_state
 
-    async def _validate_form(self, state: ExtractionState) -> ExtractionState:
+    async def _validate_form(self, state: ExtractionState) -> Dict[str, Any]:
         """Validate form type and structure."""
-        # TODO: Implement form validation node
-        pass
+        errors = list(state["errors"])
+        if state["form_type"] != cms1500.FORM_TYPE:
+            reasoning = f"No structural checks for {state['form_type']}"
+        elif cms1500.looks_like_form(state["ocr_text"]):
+            reasoning = "Found CMS-1500 header markers"
+        else:
+            reasoning = "No CMS-1500 header markers; continuing with generic extraction"
+            errors.append("Text does not look like a CMS-1500 form")
+        return {
+            "errors": errors,
+            "reasoning_log": state["reasoning_log"]
+            + [{"step": "validate_form", "reasoning": reasoning}],
+        }
 
-    async def _identify_fields(self, state: ExtractionState) -> ExtractionState:
+    async def _identify_fields(self, state: ExtractionState) -> Dict[str, Any]:
         """Identify which fields are present in the form."""
-        # TODO: Implement field identification node
-        pass
+        fields = []
+        if state["form_type"] == cms1500.FORM_TYPE:
+            fields = cms1500.identify_fields(state["ocr_text"])
+        return {
+            "identified_fields": fields,
+            "reasoning_log": state["reasoning_log"]
+            + [{"step": "identify_fields", "reasoning": f"Found labels for {len(fields)} fields"}],
+        }
 
-    async def _extract_values(self, state: ExtractionState) -> ExtractionState:
-        """Extract values for each identified field."""
-        # TODO: Implement value extraction node
-        pass
+    async def _extract_values(self, state: ExtractionState) -> Dict[str, Any]:
+        """Extract values for each identified field, or re-extract failed ones."""
+        failed = state["failed_fields"]
+        if failed:
+            return await self._reextract_values(state, failed)
 
-    async def _validate_cross_fields(self, state: ExtractionState) -> ExtractionState:
+        result = await self.llm.extract_fields(
+            state["ocr_text"], state["form_type"], field_names=state["identified_fields"] or None
+        )
+        fields, corrections = code_sets.correct_fields(result.get("fields", {}))
+        return {
+            "extracted_fields": fields,
+            "raw_response": result.get("raw_response") or "",
+            "token_logprobs": result.get("token_logprobs"),
+            "llm_calls": state["llm_calls"] + 1,
+            "reasoning_log": state["reasoning_log"]
+            + result.get("reasoning", [])
+            + [{"step": "extract_values", "reasoning": f"Extracted {len(fields)} fields"}]
+            + ([correction_log(corrections)] if corrections else []),
+        }
+
+    async def _reextract_values(
+        self,
+        state: ExtractionState,
+        failed: Dict[str, str]
+    ) -> Dict[str, Any]:
+        """Ask again for only the fields that failed validation."""
+        messages = [
+            {
+                "role": "system",
+                "content": (
+                    f"You extract fields from {state['form_type']} forms. Earlier values "
+                    "for some fields failed validation. Read the OCR text again and "
+                    "return a JSON object with only these fields, using null if a field "
+                    "is not on the form."
+                ),
+            },
+            {
+                "role": "user",
+                "content": f"OCR text:\n{state['ocr_text']}\n\nFailed fields:\n"
+                + "\n".join(f"- {name}: {reason}" for name, reason in failed.items()),
+            },
+        ]
+        values = self.llm.parse_response(await self.llm.chat(messages))
+        updates = {name: values[name] for name in failed if name in values}
+        fields, corrections = code_sets.correct_fields({**state["extracted_fields"], **updates})
+        return {
+            "extracted_fields": fields,
+            "failed_fields": {},
+            "reextract_rounds": state["reextract_rounds"] + 1,
+            "llm_calls": state["llm_calls"] + 1,
+            "reasoning_log": state["reasoning_log"]
+            + [{
+                "step": "extract_values",
+                "reasoning": f"Re-extracted {len(updates)} of {len(failed)} failed fields",
+            }]
+            + ([correction_log(corrections)] if corrections else []),
+        }
+
+    async def _validate_cross_fields(self, state: ExtractionState) -> Dict[str, Any]:
         """Validate consistency across multiple fields."""
-        # TODO: Implement cross-field validation node
-        pass
+        fields = state["extracted_fields"]
+        report = validate_fields(fields, state["ocr_text"])
+        if report.passed:
+            return {
+                "validated_fields": report.validated,
+                "failed_fields": {},
+                "reasoning_log": state["reasoning_log"]
+                + [{
+                    "step": "validate_cross_fields",
+                    "reasoning": f"Deterministic checks passed ({len(report.validated)} validated)",
+                }],
+            }
+
+        if state["reextract_rounds"] < settings.agent_max_reextract_rounds:
+            # Route back to extract_values for just these fields
+            return {
+                "validated_fields": report.validated,
+                "failed_fields": report.failed,
+                "reasoning_log": state["reasoning_log"]
+                + [{
+                    "step": "validate_cross_fields",
+                    "reasoning": "Failed checks: " + "; ".join(report.failed.values()),
+                }],
+            }
+
+        messages = [
+            {
+                "role": "system",
+                "content": (
+                    "You review fields extracted from a medical claim form. Some of them "
+                    "failed validation. Check them against the OCR text and the other "
+                    "fields. Return a JSON object with \"corrections\" (field name to "
+                    "corrected value, only for fields that are wrong) and \"issues\" "
+                    "(a list of short descriptions)."
+                ),
+            },
+            {
+                "role": "user",
+                "content": f"OCR text:\n{state['ocr_text']}\n\nExtracted fields:\n"
+                + json.dumps(fields, default=str)
+                + "\n\nFailed checks:\n"
+                + "\n".join(f"- {name}: {reason}" for name, reason in report.failed.items()),
+            },
+        ]
+        review = self.llm.parse_response(await self.llm.chat(messages))
+        corrections = review.get("corrections") or {}
+        if not isinstance(corrections, dict):
+            corrections = {}
+        issues = [str(issue) for issue in review.get("issues") or []]
+        fields = {**fields, **corrections}
+        report = validate_fields(fields, state["ocr_text"])
+        return {
+            "extracted_fields": fields,
+            "validated_fields": report.validated,
+            "failed_fields": {},
+            "errors": state["errors"] + issues + list(report.failed.values()),
+            "llm_calls": state["llm_calls"] + 1,
+            "reasoning_log": state["reasoning_log"]
+            + [{
+                "step": "validate_cross_fields",
+                "reasoning": f"{len(corrections)} corrections, {len(report.failed)} fields still failing",
+            }],
+        }
 
-    async def _score_confidence(self, state: ExtractionState) -> ExtractionState:
+    async def _score_confidence(self, state: ExtractionState) -> Dict[str, Any]:
         """Calculate confidence scores for each extracted field."""
-        # TODO: Implement confidence scoring node
-        pass
+        with stage("confidence"):
+            confidence = score_fields(
+                state["extracted_fields"],
+                state["ocr_text"],
+                state["raw_response"],
+                state["token_logprobs"],
+            )
+        return {
+            "confidence_scores": confidence,
+            "reasoning_log": state["reasoning_log"]
+            + [{"step": "score_confidence", "reasoning": f"Scored {len(confidence)} fields locally"}],
+        }
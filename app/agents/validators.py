@@ -0,0 +1,245 @@
+"""Deterministic field checks used to route the extraction agent.
+
+Checks are cheap rules (formats, check digits, arithmetic between fields and
+presence of the value in the OCR text). The agent uses them to decide which
+LLM steps a form actually needs: fields that pass are trusted without an LLM
+review, and only fields that fail are extracted again.
+"""
+import re
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+
+_NON_ALNUM = re.compile(r"[^0-9A-Z]+")
+_ICD10 = re.compile(
+    r"^(?:[A-TV-Z][0-9]{2}|C4A|C7[AB]|D3A|M1A|O9A|Z3A)(?:\.?[0-9A-Z]{1,4})?$"
+)
+_DATE_FORMATS = ("%m %d %Y", "%m %d %y", "%m/%d/%Y", "%m/%d/%y", "%Y-%m-%d", "%m%d%Y", "%m%d%y")
+# CMS-1500 prints cents in a separate column: "150 00"
+_SPLIT_CENTS = re.compile(r"^(\d+)\s+(\d{2})$")
+_DATE_LIKE = re.compile(r"^\d{1,4}[-/ .]\d{1,2}[-/ .]\d{2,4}$")
+_MONEY_LIKE = re.compile(r"^\$?[\d,]+\.\d{2}$")
+# Dates as printed in the form boxes
+_FORM_DATE_FORMATS = ("%m %d %Y", "%m %d %y")
+
+
+@dataclass
+class ValidationReport:
+    """Outcome of the deterministic checks for one set of extracted fields."""
+
+    validated: List[str] = field(default_factory=list)
+    failed: Dict[str, str] = field(default_factory=dict)
+    unverified: List[str] = field(default_factory=list)
+
+    @property
+    def passed(self) -> bool:
+        """True if no field failed a check."""
+        return not self.failed
+
+
+def normalise(text: str) -> str:
+    """Upper-case text and collapse everything but letters and digits to single spaces."""
+    return _NON_ALNUM.sub(" ", text.upper()).strip()
+
+
+def is_empty(value: Any) -> bool:
+    """Return True for values that mean "not present on the form"."""
+    return value is None or value == "" or value == [] or value == {}
+
+
+def leaves(value: Any) -> Iterable[Any]:
+    """Yield the non-empty scalars of a (possibly nested) field value."""
+    if isinstance(value, dict):
+        for item in value.values():
+            yield from leaves(item)
+    elif isinstance(value, list):
+        for item in value:
+            yield from leaves(item)
+    elif not is_empty(value):
+        yield value
+
+
+def value_variants(scalar: Any) -> List[str]:
+    """
+    Return normalised spellings of a value as it may be printed on the form.
+
+    LLMs reformat dates (``1979-04-17``) and charges (``225.0``); the form
+    prints ``04 17 1979`` and ``225 00``.
+    """
+    variants = [normalise(str(scalar))]
+    if isinstance(scalar, (int, float)) and not isinstance(scalar, bool):
+        variants.append(normalise(f"{scalar:.2f}"))
+    elif isinstance(scalar, str):
+        text = scalar.strip()
+        if _DATE_LIKE.match(text):
+            parsed = parse_date(text)
+            if parsed is not None:
+                variants.extend(normalise(parsed.strftime(fmt)) for fmt in _FORM_DATE_FORMATS)
+        elif _MONEY_LIKE.match(text):
+            variants.append(normalise(f"{parse_money(text):.2f}"))
+    return [v for v in dict.fromkeys(variants) if v]
+
+
+def grounded(value: Any, ocr_text: str) -> bool:
+    """Return True if every scalar in the value (nested or not) appears in the OCR text."""
+    haystack = f" {normalise(ocr_text)} "
+    for scalar in leaves(value):
+        variants = value_variants(scalar)
+        if variants and not any(f" {v} " in haystack for v in variants):
+            return False
+    return True
+
+
+def npi_valid(value: Any) -> bool:
+    """Check a 10-digit NPI with the Luhn check digit (prefix 80840)."""
+    digits = re.sub(r"\D", "", str(value))
+    if len(digits) != 10:
+        return False
+    total = 24  # Contribution of the 80840 prefix
+    for index, digit in enumerate(reversed(digits[:-1])):
+        n = int(digit)
+        if index % 2 == 0:
+            n *= 2
+            if n > 9:
+                n -= 9
+        total += n
+    return (10 - total % 10) % 10 == int(digits[-1])
+
+
+def icd10_valid(value: Any) -> bool:
+    """Check the shape of an ICD-10-CM code (``E11.9``, ``E119``)."""
+    return bool(_ICD10.match(str(value).strip().upper()))
+
+
+def parse_date(value: Any) -> Optional[date]:
+    """Parse a form date, or return None if it is not a plausible date."""
+    text = re.sub(r"[\s.\-/]+", " ", str(value).strip())
+    candidates = {text, text.replace(" ", "/"), text.replace(" ", "-"), text.replace(" ", "")}
+    for fmt in _DATE_FORMATS:
+        for candidate in candidates:
+            try:
+                parsed = datetime.strptime(candidate, fmt).date()
+            except ValueError:
+                continue
+            if date(1900, 1, 1) <= parsed <= date.today():
+                return parsed
+    return None
+
+
+def parse_money(value: Any) -> Optional[float]:
+    """Parse a charge such as ``$1,250.00`` or ``150 00``."""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    text = str(value).replace("$", "").replace(",", "").strip()
+    split = _SPLIT_CENTS.match(text)
+    if split:
+        text = f"{split.group(1)}.{split.group(2)}"
+    try:
+        return float(text)
+    except ValueError:
+        return None
+
+
+def _all(check: Callable[[Any], Any]) -> Callable[[Any], bool]:
+    def run(value: Any) -> bool:
+        values = value if isinstance(value, list) else [value]
+        return all(check(v) for v in values)
+
+    return run
+
+
+# Format rule per CMS-1500 field (see app.agents.cms1500.FIELD_LABELS)
+FIELD_RULES: Dict[str, Callable[[Any], bool]] = {
+    "referring_provider_npi": npi_valid,
+    "billing_provider_npi": npi_valid,
+    "patient_dob": lambda v: parse_date(v) is not None,
+    "diagnosis_codes": _all(icd10_valid),
+    "total_charge": lambda v: parse_money(v) is not None,
+    "amount_paid": lambda v: parse_money(v) is not None,
+    "federal_tax_id": lambda v: len(re.sub(r"\D", "", str(v))) == 9,
+    "patient_sex": lambda v: str(v).strip().upper() in {"M", "F", "MALE", "FEMALE"},
+}
+
+
+def _line_charges(service_lines: Any) -> List[float]:
+    charges = []
+    if not isinstance(service_lines, list):
+        return charges
+    for line in service_lines:
+        if not isinstance(line, dict):
+            continue
+        for key, value in line.items():
+            if "charge" in key.lower():
+                amount = parse_money(value)
+                if amount is not None:
+                    charges.append(amount)
+                break
+    return charges
+
+
+def _money_field(fields: Dict[str, Any], name: str) -> Optional[float]:
+    value = fields.get(name)
+    return None if is_empty(value) else parse_money(value)
+
+
+def cross_field_failures(fields: Dict[str, Any]) -> Dict[str, str]:
+    """Check the arithmetic between charge fields and the NPIs on service lines."""
+    failures: Dict[str, str] = {}
+
+    total = _money_field(fields, "total_charge")
+    charges = _line_charges(fields.get("service_lines"))
+    if total is not None and charges and abs(sum(charges) - total) > 0.01:
+        failures["total_charge"] = (
+            f"total {total:.2f} does not match line charges {sum(charges):.2f}"
+        )
+
+    paid = _money_field(fields, "amount_paid")
+    if total is not None and paid is not None and paid > total + 0.01:
+        failures["amount_paid"] = f"amount paid {paid:.2f} exceeds total {total:.2f}"
+
+    lines = fields.get("service_lines")
+    for i, line in enumerate(lines if isinstance(lines, list) else []):
+        if not isinstance(line, dict):
+            continue
+        for key, value in line.items():
+            if "npi" in key.lower() and not is_empty(value) and not npi_valid(value):
+                failures["service_lines"] = f"line {i + 1} {key} {value!r} is not a valid NPI"
+                break
+        if "service_lines" in failures:
+            break
+
+    return failures
+
+
+def validate_fields(fields: Dict[str, Any], ocr_text: str) -> ValidationReport:
+    """
+    Run the deterministic checks over extracted fields.
+
+    A field is validated when it passes its format rule (if it has one) and
+    its value appears in the OCR text. A field fails when a format rule or a
+    cross-field check rejects it. Anything else is unverified: plausible, but
+    not confirmed by a rule.
+
+    Args:
+        fields: Extracted field values
+        ocr_text: Text the fields were extracted from
+
+    Returns:
+        Validation report
+    """
+    report = ValidationReport()
+    cross = cross_field_failures(fields)
+    for name, value in fields.items():
+        if is_empty(value):
+            continue
+        rule = FIELD_RULES.get(name)
+        if rule is not None and not rule(value):
+            report.failed[name] = f"{value!r} is not a valid {name}"
+        elif name in cross:
+            report.failed[name] = cross[name]
+        elif grounded(value, ocr_text):
+            report.validated.append(name)
+        else:
+            report.unverified.append(name)
+    return report
@@ -1,6 +1,6 @@
 """Application configuration management."""
 from pydantic_settings import BaseSettings
-from typing import List
+from typing import Dict, List
 
 
 class Settings(BaseSettings):
@@ -8,6 +8,7 @@ class Settings(BaseSettings):
 
     # HuggingFace Configuration
     hf_token: str
+    hf_api_base: str = "https://router.huggingface.co/v1"
 
     # Moonshot (Kimi K2) Configuration
     moonshot_api_key: str
@@ -17,19 +18,108 @@ class Settings(BaseSettings):
     app_host: str = "0.0.0.0"
     app_port: int = 8000
     debug: bool = True
+    web_concurrency: int = 1  # uvicorn worker processes
 
     # File Upload Configuration
     max_upload_size_mb: int = 10
+    upload_chunk_size_kb: int = 256
+    upload_quota_mb: int = 2048
+    min_free_disk_mb: int = 512
+    workspace_ttl_seconds: int = 3600
+    workspace_sweep_interval_seconds: int = 300
     allowed_extensions: List[str] = ["pdf", "png", "jpg", "jpeg"]
 
+    # URL Downloads (/process/url and batch URLs are fetched by the server)
+    url_fetch_timeout: float = 30.0
+    url_fetch_max_mb: int = 10
+    url_fetch_max_connections: int = 20
+    url_fetch_allow_private: bool = False  # allow loopback/private hosts
+    url_fetch_max_redirects: int = 5  # each hop is checked like the original URL
+    url_cache_dir: str = "data/url_cache"  # conditional-GET cache (ETag/Last-Modified)
+    url_cache_max_mb: int = 512
+
+    # Admission Control (MAX_CONCURRENT_PIPELINES=0 disables it)
+    max_concurrent_pipelines: int = 4
+    admission_queue_size: int = 16
+    admission_queue_timeout: float = 10.0
+    admission_retry_after: int = 5
+    interactive_reserved_slots: int = 1
+
+    # Shared State (memory is per-process; use sqlite or redis with several workers)
+    state_backend: str = "memory"  # memory, sqlite or redis
+    state_sqlite_path: str = "data/state.db"
+    state_redis_url: str = "redis://localhost:6379/0"
+    result_cache_ttl_seconds: int = 86400  # 0 disables the result cache
+    ocr_cache_ttl_seconds: int = 86400  # 0 disables the OCR text cache
+
+    # Request Coalescing (identical in-flight documents share one pipeline run)
+    coalesce_lease_seconds: float = 600.0  # cross-worker lease; renewed while the leader runs
+    coalesce_poll_interval: float = 0.25
+
+    # Results Store (columnar export of completed extractions; needs pandas + pyarrow)
+    results_store_enabled: bool = True
+    results_store_dir: str = "data/results"
+    results_flush_rows: int = 500
+    results_flush_interval_seconds: float = 60.0
+
+    # PDF Rasterisation
+    pdf_dpi: int = 200
+
+    # Executors (CPU_WORKERS=0 runs CPU-bound work on the thread pool)
+    io_workers: int = 8
+    cpu_workers: int = 2
+    cpu_start_method: str = "spawn"
+    cpu_max_tasks_per_child: int = 200
+    loop_lag_interval: float = 0.25
+
+    # Provider Rate Limits per API key (0 = unlimited)
+    hf_rpm: int = 0
+    hf_tpm: int = 0
+    moonshot_rpm: int = 0
+    moonshot_tpm: int = 0
+    quota_target_ratio: float = 0.95
+    quota_batch_ratio: float = 0.8
+    quota_max_wait_seconds: float = 30.0
+
     # OCR Configuration
     ocr_model: str = "deepseek-ai/DeepSeek-OCR:novita"
     ocr_timeout: int = 300
+    ocr_max_pages: int = 1  # PDF pages OCR'd per document; 0 = all
 
     # LLM Configuration
     llm_model: str = "moonshot-v1-128k"
     llm_temperature: float = 0.1
     llm_max_tokens: int = 4096
+    llm_logprobs: bool = False  # request token logprobs for confidence scoring
+    # Models tried in order for single-mode extraction, cheapest first
+    # (e.g. moonshot-v1-8k,moonshot-v1-128k); empty uses LLM_MODEL alone
+    llm_cascade: str = ""
+    llm_cascade_min_confidence: float = 0.6
+    # Price per million input and output tokens, as JSON:
+    # {"moonshot-v1-8k": [0.17, 0.17]}
+    llm_model_prices: Dict[str, List[float]] = {}
+
+    # Extraction Configuration
+    extraction_mode: str = "single"  # single (one LLM call), agent or chunked
+    extraction_chunk_chars: int = 12000  # chunked: largest chunk of OCR text
+    extraction_chunk_concurrency: int = 4  # chunked: chunks extracted at once
+    agent_checkpoint_ttl_seconds: int = 86400
+    agent_max_reextract_rounds: int = 1
+    code_sets_dir: str = "data/codes"  # icd10cm.txt, hcpcs.txt
+    code_index_strict: bool = False  # treat codes missing from the code sets as errors
+
+    # Tracing Configuration
+    tracing_enabled: bool = False
+    tracing_sample_ratio: float = 1.0
+    tracing_exporter: str = "console"  # console, file or otlp
+    tracing_file_path: str = "logs/traces.jsonl"
+    tracing_otlp_endpoint: str = "http://localhost:4318"
+
+    # Profiling Configuration
+    profiling_mode: str = "off"  # off, header (X-Profile: 1) or always
+    profiling_slow_ms: float = 1000.0
+    profiling_dir: str = "logs/profiles"
+    profiler: str = "cprofile"  # cprofile or pyinstrument
 
     class Config:
         env_file = ".env"
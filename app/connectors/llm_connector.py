@@ -1,7 +1,46 @@
 """LLM connector for Kimi K2 via Moonshot AI API."""
-from typing import Optional, List, Dict, Any
-from openai import OpenAI
+import json
+import re
+import time
+from typing import Optional, List, Dict, Any, Callable, Tuple
 from app.config import settings
+from app.utils.metrics import (
+    CASCADE_ESCALATIONS,
+    LLM_COST,
+    LLM_MODEL_SECONDS,
+    record_provider_call,
+    stage,
+)
+from app.utils.quota import (
+    COMPLETION_TOKEN_ESTIMATE,
+    ProviderQuotaExceededError,
+    estimate_tokens,
+    quota,
+    usage_tokens,
+)
+from app.utils.tracing import tracer
+
+
+PROVIDER = "moonshot"
+
+_JSON_FENCE = re.compile(r"```(?:json)?\s*(.*?)```", re.DOTALL)
+# Context size encoded in Moonshot model names (moonshot-v1-8k, -32k, -128k)
+_CONTEXT_SUFFIX = re.compile(r"-(\d+)k\b", re.IGNORECASE)
+
+
+def context_window(model: str) -> Optional[int]:
+    """Return the context size in tokens a model name advertises, if any."""
+    match = _CONTEXT_SUFFIX.search(model)
+    return int(match.group(1)) * 1024 if match else None
+
+
+def call_cost(model: str, prompt_tokens: int, completion_tokens: int) -> Optional[float]:
+    """Estimate the price of a call from LLM_MODEL_PRICES, or None if the model has no price."""
+    price = settings.llm_model_prices.get(model)
+    if not price:
+        return None
+    input_price, output_price = (list(price) + list(price))[:2]
+    return (prompt_tokens * input_price + completion_tokens * output_price) / 1_000_000
 
 
 class LLMConnector:
@@ -9,19 +48,39 @@ class LLMConnector:
 
     def __init__(self):
         """Initialize the LLM connector with Moonshot AI configuration."""
-        self.client = OpenAI(
-            base_url=settings.moonshot_api_base,
-            api_key=settings.moonshot_api_key,
-        )
+        self._client = None
         self.model = settings.llm_model
         self.temperature = settings.llm_temperature
         self.max_tokens = settings.llm_max_tokens
+        self.cascade = [m.strip() for m in settings.llm_cascade.split(",") if m.strip()] or [
+            self.model
+        ]
+
+    @property
+    def client(self):
+        """OpenAI-compatible client, created (and ``openai`` imported) on first use."""
+        if self._client is None:
+            from openai import AsyncOpenAI
+
+            self._client = AsyncOpenAI(
+                base_url=settings.moonshot_api_base,
+                api_key=settings.moonshot_api_key,
+            )
+        return self._client
+
+    async def aclose(self) -> None:
+        """Close the HTTP connection pool if the client was created."""
+        if self._client is not None:
+            await self._client.close()
+            self._client = None
 
     async def extract_fields(
         self,
         ocr_text: str,
         form_type: str = "CMS-1500",
-        system_prompt: Optional[str] = None
+        system_prompt: Optional[str] = None,
+        field_names: Optional[List[str]] = None,
+        model: Optional[str] = None
     ) -> Dict[str, Any]:
         """
         Extract structured fields from OCR text using Kimi K2.
@@ -30,45 +89,66 @@ class LLMConnector:
             ocr_text: Text extracted from the medical form
             form_type: Type of medical form (e.g., CMS-1500)
             system_prompt: Optional custom system prompt
+            field_names: Optional keys for a flat JSON response
+            model: Optional model override (defaults to LLM_MODEL)
 
         Returns:
             Dictionary containing extracted fields and metadata
 
         Note:
-            TODO: Integrate with LangGraph agent for multi-step extraction
-            TODO: Add field-specific validation and error handling
-            TODO: Implement confidence scoring per field
+            ``token_logprobs`` is set when LLM_LOGPROBS is enabled and the
+            provider returns log-probabilities. ``usage`` carries the call's
+            model, latency, token counts and estimated cost.
         """
-        if system_prompt is None:
-            system_prompt = self._get_default_system_prompt(form_type)
-
-        user_prompt = self._build_extraction_prompt(ocr_text, form_type)
+        model = model or self.model
+        messages = self._extraction_messages(ocr_text, form_type, system_prompt, field_names)
+        max_tokens = self._max_tokens(model, messages)
 
         try:
-            completion = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                temperature=self.temperature,
-                max_tokens=self.max_tokens,
-            )
+            # Waiting for quota is not LLM latency, so reserve outside the stage
+            reservation = await self._reserve(messages, max_tokens)
+            try:
+                start = time.perf_counter()
+                with stage("llm"), tracer.span(
+                    "llm.extract_fields",
+                    {"provider": PROVIDER, "model": model, "form_type": form_type},
+                ):
+                    raw = await self.client.chat.completions.with_raw_response.create(
+                        model=model,
+                        messages=messages,
+                        temperature=self.temperature,
+                        max_tokens=max_tokens,
+                        **({"logprobs": True} if settings.llm_logprobs else {}),
+                    )
+                    completion = raw.parse()
+                    record_provider_call(PROVIDER, messages, completion, raw.retries_taken)
+                    await reservation.settle(usage_tokens(completion))
+            finally:
+                # A failed call hands its estimate back (no-op once settled)
+                await reservation.settle(0)
+            usage = self._record_model_call(model, time.perf_counter() - start, completion)
 
-            response_text = completion.choices[0].message.content
+            choice = completion.choices[0]
+            response_text = choice.message.content
+
+            with stage("parse"):
+                fields = self.parse_response(response_text)
 
-            # TODO: Parse response into structured format
             # TODO: Extract reasoning steps from Kimi K2 thinking output
-            # TODO: Calculate confidence scores
 
             return {
                 "raw_response": response_text,
-                "fields": {},  # Placeholder for parsed fields
+                "fields": fields,
                 "reasoning": [],  # Placeholder for reasoning steps
-                "confidence_scores": {}  # Placeholder for confidence
+                "confidence_scores": {},  # Scored locally by app.agents.confidence
+                "token_logprobs": self._token_logprobs(choice),
+                "usage": usage,
             }
 
+        except ProviderQuotaExceededError:
+            raise
         except Exception as e:
+            record_provider_call(PROVIDER, messages, None, 0, outcome="error")
             raise Exception(f"Field extraction failed: {str(e)}")
 
     async def chat(
@@ -89,18 +169,203 @@ class LLMConnector:
             Generated response text
         """
         try:
-            completion = self.client.chat.completions.create(
-                model=self.model,
-                messages=messages,
-                temperature=temperature or self.temperature,
-                max_tokens=max_tokens or self.max_tokens,
-            )
+            reservation = await self._reserve(messages, max_tokens or self.max_tokens)
+            try:
+                start = time.perf_counter()
+                with stage("llm"), tracer.span("llm.chat", {"provider": PROVIDER, "model": self.model}):
+                    raw = await self.client.chat.completions.with_raw_response.create(
+                        model=self.model,
+                        messages=messages,
+                        temperature=temperature or self.temperature,
+                        max_tokens=max_tokens or self.max_tokens,
+                    )
+                    completion = raw.parse()
+                    record_provider_call(PROVIDER, messages, completion, raw.retries_taken)
+                    await reservation.settle(usage_tokens(completion))
+            finally:
+                await reservation.settle(0)
+            self._record_model_call(self.model, time.perf_counter() - start, completion)
 
             return completion.choices[0].message.content
 
+        except ProviderQuotaExceededError:
+            raise
         except Exception as e:
+            record_provider_call(PROVIDER, messages, None, 0, outcome="error")
             raise Exception(f"Chat completion failed: {str(e)}")
 
+    async def extract_fields_cascade(
+        self,
+        ocr_text: str,
+        form_type: str = "CMS-1500",
+        review: Optional[Callable[[Dict[str, Any]], Optional[str]]] = None,
+        field_names: Optional[List[str]] = None
+    ) -> Dict[str, Any]:
+        """
+        Extract fields with the cheapest model in LLM_CASCADE that does the job.
+
+        Models are tried in order. A model is skipped when the prompt cannot
+        fit its context window, and its result is passed on to the next model
+        when the call fails, the response has no parseable JSON, or ``review``
+        returns a reason. The last model's result is always returned.
+
+        Args:
+            ocr_text: Text extracted from the medical form
+            form_type: Type of medical form
+            review: Called with each parsed extraction (it may add to it, e.g.
+                confidence scores); returns a reason to escalate, or None
+            field_names: Optional keys for a flat JSON response
+
+        Returns:
+            The accepted extraction, plus ``model``, ``model_attempts`` (one
+            record per model tried, with latency, tokens, cost and the
+            escalation reason) and ``llm_calls``
+        """
+        attempts: List[Dict[str, Any]] = []
+        extraction: Dict[str, Any] = {}
+        for index, model in enumerate(self.cascade):
+            last = index == len(self.cascade) - 1
+            attempt: Dict[str, Any] = {"model": model}
+            attempts.append(attempt)
+
+            reason = None
+            if not last and not self._fits(model, ocr_text, form_type, field_names):
+                reason = "context window"
+            else:
+                start = time.perf_counter()
+                try:
+                    extraction = await self.extract_fields(
+                        ocr_text, form_type, field_names=field_names, model=model
+                    )
+                except ProviderQuotaExceededError:
+                    raise
+                except Exception as e:
+                    if last:
+                        raise
+                    attempt["latency_ms"] = (time.perf_counter() - start) * 1000
+                    reason = f"error: {e}"
+                else:
+                    attempt.update(extraction.pop("usage", None) or {})
+                    attempt.setdefault("latency_ms", (time.perf_counter() - start) * 1000)
+                    reason = review(extraction) if review is not None else None
+                    if not extraction.get("fields"):
+                        reason = "parse failure"
+
+            if reason is None or last:
+                break
+            attempt["escalation"] = reason
+            CASCADE_ESCALATIONS.inc(model=model, reason=reason.split(":")[0])
+            print(f"LLM cascade: escalating from {model} ({reason})")
+
+        return {
+            **extraction,
+            "model": attempts[-1]["model"],
+            "model_attempts": attempts,
+            "llm_calls": sum(1 for attempt in attempts if "latency_ms" in attempt),
+        }
+
+    def _extraction_messages(
+        self,
+        ocr_text: str,
+        form_type: str,
+        system_prompt: Optional[str] = None,
+        field_names: Optional[List[str]] = None
+    ) -> List[Dict[str, str]]:
+        if system_prompt is None:
+            system_prompt = self._get_default_system_prompt(form_type)
+        user_prompt = self._build_extraction_prompt(ocr_text, form_type, field_names)
+        return [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt},
+        ]
+
+    def _fits(
+        self,
+        model: str,
+        ocr_text: str,
+        form_type: str,
+        field_names: Optional[List[str]] = None
+    ) -> bool:
+        """Return True if the extraction prompt plus a typical completion fits the model."""
+        window = context_window(model)
+        if window is None:
+            return True
+        messages = self._extraction_messages(ocr_text, form_type, field_names=field_names)
+        return estimate_tokens(messages) + COMPLETION_TOKEN_ESTIMATE <= window
+
+    def _max_tokens(self, model: str, messages: List[Dict[str, Any]]) -> int:
+        """Cap the completion so prompt and completion fit the model's context window."""
+        window = context_window(model)
+        if window is None:
+            return self.max_tokens
+        return max(1, min(self.max_tokens, window - estimate_tokens(messages)))
+
+    @staticmethod
+    def _record_model_call(model: str, seconds: float, completion: Any) -> Dict[str, Any]:
+        """Record per-model latency and cost; return them with the token counts."""
+        LLM_MODEL_SECONDS.observe(seconds, model=model)
+        usage = getattr(completion, "usage", None)
+        prompt_tokens = (getattr(usage, "prompt_tokens", None) or 0) if usage else 0
+        completion_tokens = (getattr(usage, "completion_tokens", None) or 0) if usage else 0
+        record = {
+            "latency_ms": seconds * 1000,
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+        }
+        cost = call_cost(model, prompt_tokens, completion_tokens)
+        if cost is not None:
+            LLM_COST.inc(cost, model=model)
+            record["cost"] = cost
+        return record
+
+    async def _reserve(self, messages: List[Dict[str, Any]], max_tokens: int):
+        """Reserve shared Moonshot budget for a call of at most ``max_tokens``."""
+        return await quota.acquire(
+            PROVIDER,
+            settings.moonshot_api_key,
+            estimate_tokens(messages) + min(max_tokens, COMPLETION_TOKEN_ESTIMATE),
+        )
+
+    @staticmethod
+    def _token_logprobs(choice) -> Optional[List[Tuple[str, float]]]:
+        """Return ``(token, logprob)`` pairs if the provider sent them."""
+        logprobs = getattr(choice, "logprobs", None)
+        if logprobs is None or not logprobs.content:
+            return None
+        return [(item.token, item.logprob) for item in logprobs.content]
+
+    @staticmethod
+    def parse_response(response_text: Optional[str]) -> Dict[str, Any]:
+        """
+        Parse the JSON object out of a model response.
+
+        Accepts bare JSON, JSON inside a Markdown code fence, or JSON
+        surrounded by prose (the outermost ``{...}`` span is used).
+
+        Args:
+            response_text: Raw completion text
+
+        Returns:
+            Parsed fields, or an empty dict if no JSON object is found
+        """
+        if not response_text:
+            return {}
+
+        candidates = [m.group(1) for m in _JSON_FENCE.finditer(response_text)]
+        start, end = response_text.find("{"), response_text.rfind("}")
+        if start != -1 and end > start:
+            candidates.append(response_text[start:end + 1])
+        candidates.append(response_text)
+
+        for candidate in candidates:
+            try:
+                parsed = json.loads(candidate)
+            except (ValueError, TypeError):
+                continue
+            if isinstance(parsed, dict):
+                return parsed
+        return {}
+
     def _get_default_system_prompt(self, form_type: str) -> str:
         """Generate default system prompt for form extraction."""
         return f"""You are an expert medical document information extraction assistant.
@@ -115,11 +380,24 @@ Guidelines:
 
 Think step-by-step about each field extraction."""
 
-    def _build_extraction_prompt(self, ocr_text: str, form_type: str) -> str:
+    def _build_extraction_prompt(
+        self,
+        ocr_text: str,
+        form_type: str,
+        field_names: Optional[List[str]] = None
+    ) -> str:
         """Build the user prompt for field extraction."""
         # TODO: Customize prompt based on form_type
         # TODO: Add examples of expected output format
         # TODO: Include TOON format handling if applicable
+        if field_names:
+            return f"""Extract these fields from this {form_type} form:
+
+{ocr_text}
+
+Return a flat JSON object with exactly these keys: {", ".join(field_names)}.
+Use a list for fields with several values (diagnosis codes, service lines).
+For each field, provide the extracted value. If a field is not present or unclear, use null."""
 
         return f"""Extract all fields from this {form_type} form:
 
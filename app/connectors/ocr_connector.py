@@ -1,8 +1,18 @@
 """OCR connector for DeepSeek-OCR via HuggingFace Inference API."""
-import os
 from typing import Optional
-from openai import OpenAI
 from app.config import settings
+from app.utils.metrics import record_provider_call, stage
+from app.utils.quota import (
+    COMPLETION_TOKEN_ESTIMATE,
+    ProviderQuotaExceededError,
+    estimate_tokens,
+    quota,
+    usage_tokens,
+)
+from app.utils.tracing import tracer
+
+
+PROVIDER = "huggingface"
 
 
 class OCRConnector:
@@ -10,13 +20,28 @@ class OCRConnector:
 
     def __init__(self):
         """Initialize the OCR connector with HuggingFace configuration."""
-        self.client = OpenAI(
-            base_url="https://router.huggingface.co/v1",
-            api_key=settings.hf_token,
-        )
+        self._client = None
         self.model = settings.ocr_model
         self.timeout = settings.ocr_timeout
 
+    @property
+    def client(self):
+        """OpenAI-compatible client, created (and ``openai`` imported) on first use."""
+        if self._client is None:
+            from openai import AsyncOpenAI
+
+            self._client = AsyncOpenAI(
+                base_url=settings.hf_api_base,
+                api_key=settings.hf_token,
+            )
+        return self._client
+
+    async def aclose(self) -> None:
+        """Close the HTTP connection pool if the client was created."""
+        if self._client is not None:
+            await self._client.close()
+            self._client = None
+
     async def extract_text(
         self,
         image_url: str,
@@ -38,32 +63,53 @@ class OCRConnector:
         if prompt is None:
             prompt = "Extract all text from this medical form. Preserve the structure and layout."
 
-        try:
-            completion = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
+        messages = [
+            {
+                "role": "user",
+                "content": [
+                    {
+                        "type": "text",
+                        "text": prompt
+                    },
                     {
-                        "role": "user",
-                        "content": [
-                            {
-                                "type": "text",
-                                "text": prompt
-                            },
-                            {
-                                "type": "image_url",
-                                "image_url": {
-                                    "url": image_url
-                                }
-                            }
-                        ]
+                        "type": "image_url",
+                        "image_url": {
+                            "url": image_url
+                        }
                     }
-                ],
-                timeout=self.timeout,
+                ]
+            }
+        ]
+
+        try:
+            # Waiting for quota is not OCR latency, so reserve outside the stage
+            reservation = await quota.acquire(
+                PROVIDER,
+                settings.hf_token,
+                estimate_tokens(messages) + COMPLETION_TOKEN_ESTIMATE,
             )
+            try:
+                with stage("ocr"), tracer.span(
+                    "ocr.extract_text", {"provider": PROVIDER, "model": self.model}
+                ):
+                    raw = await self.client.chat.completions.with_raw_response.create(
+                        model=self.model,
+                        messages=messages,
+                        timeout=self.timeout,
+                    )
+                    completion = raw.parse()
+                    record_provider_call(PROVIDER, messages, completion, raw.retries_taken)
+                    await reservation.settle(usage_tokens(completion))
+            finally:
+                # A failed call hands its estimate back (no-op once settled)
+                await reservation.settle(0)
 
             return completion.choices[0].message.content
 
+        except ProviderQuotaExceededError:
+            raise
         except Exception as e:
+            record_provider_call(PROVIDER, messages, None, 0, outcome="error")
             raise Exception(f"OCR processing failed: {str(e)}")
 
     async def extract_text_batch(
@@ -1,8 +1,61 @@
 """FastAPI main application entry point."""
-from fastapi import FastAPI
+import asyncio
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
+from app.agents.codes import code_sets
+from app.pipeline import llm_connector, ocr_connector, workspaces
 from app.routes import router
 from app.config import settings
+from app.utils.admission import AdmissionController, AdmissionMiddleware
+from app.utils.executors import executors, monitor_loop_lag
+from app.utils.metrics import CONTENT_TYPE, registry
+from app.utils.profiling import RequestProfiler
+from app.utils.state import run_purger, state_backend
+from app.utils.request_limits import RequestSizeLimitMiddleware
+from app.utils.results_store import results_store
+from app.utils.tracing import configure_from_settings, tracer
+from app.utils.url_fetcher import url_fetcher
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start and stop process-wide subsystems."""
+    configure_from_settings(settings)
+    if settings.web_concurrency > 1 and state_backend.name == "memory":
+        print(
+            "Warning: STATE_BACKEND=memory with several workers; cached results "
+            "and provider rate-limit budgets will not be shared between them. "
+            "Use sqlite or redis."
+        )
+    # Map the code-set indexes off the event loop (rebuilds only if stale)
+    await executors.run_io(code_sets.load)
+    lag_monitor = asyncio.create_task(monitor_loop_lag(settings.loop_lag_interval))
+    sweeper = asyncio.create_task(
+        workspaces.run_sweeper(settings.workspace_sweep_interval_seconds)
+    )
+    purger = asyncio.create_task(
+        run_purger(state_backend, settings.workspace_sweep_interval_seconds)
+    )
+    flusher = asyncio.create_task(
+        results_store.run_flusher(settings.results_flush_interval_seconds)
+    )
+    yield
+    flusher.cancel()
+    purger.cancel()
+    sweeper.cancel()
+    lag_monitor.cancel()
+    await ocr_connector.aclose()
+    await llm_connector.aclose()
+    await url_fetcher.aclose()
+    try:
+        await executors.run_io(results_store.flush)
+    except Exception as e:
+        print(f"Error flushing results store: {e}")
+    executors.shutdown(wait=True)
+    tracer.shutdown()
+    state_backend.close()
 
 
 app = FastAPI(
@@ -11,6 +64,7 @@ app = FastAPI(
     version="0.1.0",
     docs_url="/docs",
     redoc_url="/redoc",
+    lifespan=lifespan,
 )
 
 # CORS middleware for web access
@@ -22,6 +76,59 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.middleware("http")
+async def trace_requests(request: Request, call_next):
+    """Wrap every request in a root span, continuing any incoming W3C trace."""
+    if not tracer.enabled:
+        return await call_next(request)
+
+    with tracer.span(
+        f"{request.method} {request.url.path}",
+        {"http.method": request.method, "http.target": request.url.path},
+        traceparent=request.headers.get("traceparent"),
+    ) as span:
+        response = await call_next(request)
+        span.set_attribute("http.status_code", response.status_code)
+        if span.is_recording:
+            response.headers["traceparent"] = span.traceparent()
+        return response
+
+
+if settings.profiling_mode != "off":
+    app.middleware("http")(
+        RequestProfiler(
+            settings.profiling_mode,
+            settings.profiling_slow_ms,
+            settings.profiling_dir,
+            settings.profiler,
+        )
+    )
+
+
+# Reject oversized uploads before the multipart body is spooled
+app.add_middleware(
+    RequestSizeLimitMiddleware,
+    max_bytes=settings.max_upload_size_mb * 1024 * 1024 + 64 * 1024,
+    path_prefixes=("/api/v1/process/upload",),
+)
+
+# Cap concurrent pipelines; added last so it runs first and sheds load
+# before any upload body is read
+admission = AdmissionController(
+    max_concurrent=settings.max_concurrent_pipelines,
+    max_queue=settings.admission_queue_size,
+    queue_timeout=settings.admission_queue_timeout,
+    retry_after=settings.admission_retry_after,
+    interactive_reserved=settings.interactive_reserved_slots,
+)
+if settings.max_concurrent_pipelines > 0:
+    app.add_middleware(
+        AdmissionMiddleware,
+        controller=admission,
+        path_prefixes=("/api/v1/process/",),
+    )
+
+
 # Include API routes
 app.include_router(router, prefix="/api/v1")
 
@@ -33,10 +140,17 @@ async def root():
         "message": "Medical OCR Information Extraction API",
         "version": "0.1.0",
         "docs": "/docs",
-        "health": "/api/v1/health"
+        "health": "/api/v1/health",
+        "metrics": "/metrics"
     }
 
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Expose collected metrics in Prometheus text format."""
+    return PlainTextResponse(registry.render(), media_type=CONTENT_TYPE)
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(
@@ -37,6 +37,14 @@ class ExtractionResponse(BaseModel):
         default_factory=dict, description="Confidence score per field"
     )
     processing_time_ms: float = Field(..., description="Extraction processing time in milliseconds")
+    llm_calls: Optional[int] = Field(None, description="LLM calls made for this extraction")
+    model: Optional[str] = Field(None, description="Model whose extraction was returned")
+    field_pages: Optional[Dict[str, List[int]]] = Field(
+        None, description="Source pages of each field, for chunked extraction"
+    )
+    model_attempts: Optional[List[Dict[str, Any]]] = Field(
+        None, description="Models tried in the cascade, with latency, tokens, cost and escalation"
+    )
 
 
 class ProcessFormRequest(BaseModel):
@@ -55,6 +63,23 @@ class ProcessFormResponse(BaseModel):
     reasoning_log: List[Dict[str, str]]
     confidence_scores: Dict[str, float]
     total_processing_time_ms: float
+    stage_timings_ms: Optional[Dict[str, float]] = Field(
+        None, description="Per-stage durations in milliseconds, when requested"
+    )
+    document_sha256: Optional[str] = Field(
+        None, description="SHA-256 of the processed document, when available"
+    )
+    cached: bool = Field(False, description="Result was served from the shared result cache")
+    llm_calls: Optional[int] = Field(
+        None, description="LLM calls made for this form (0 when served from cache)"
+    )
+    model: Optional[str] = Field(None, description="Model whose extraction was returned")
+    field_pages: Optional[Dict[str, List[int]]] = Field(
+        None, description="Source pages of each field, for chunked extraction"
+    )
+    model_attempts: Optional[List[Dict[str, Any]]] = Field(
+        None, description="Models tried in the cascade, with latency, tokens, cost and escalation"
+    )
     timestamp: datetime = Field(default_factory=datetime.utcnow)
 
 
@@ -0,0 +1,385 @@
+"""End-to-end document pipeline shared by the API and batch scripts.
+
+The HTTP routes and ``scripts/batch_process.py`` both go through these
+functions, so a document processed offline is handled exactly like an
+upload: same workspace lifecycle, result cache, provider rate-limit budgets
+and stage timings.
+
+Callers activate the request's :class:`StageTimer` (``timer.activate()``)
+so connector stages are attributed to it.
+"""
+import asyncio
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from app.agents import cms1500
+from app.agents.checkpoint import CheckpointStore
+from app.agents.chunking import PAGE_BREAK, Chunk, merge_extractions, split_transcript
+from app.agents.codes import code_sets, correction_log
+from app.agents.confidence import FormFields, score_fields, score_forms
+from app.agents.extraction_agent import ExtractionAgent
+from app.agents.validators import validate_fields
+from app.config import settings
+from app.connectors.llm_connector import LLMConnector
+from app.connectors.ocr_connector import OCRConnector
+from app.utils.file_handler import FileHandler
+from app.utils.metrics import StageTimer, stage
+from app.utils.result_cache import ResultCache
+from app.utils.results_store import results_store
+from app.utils.single_flight import SingleFlight
+from app.utils.state import state_backend
+from app.utils.url_fetcher import url_fetcher
+from app.utils.workspace import WorkspaceManager
+
+
+file_handler = FileHandler()
+ocr_connector = OCRConnector()
+llm_connector = LLMConnector()
+workspaces = WorkspaceManager(
+    file_handler.upload_dir,
+    ttl_seconds=settings.workspace_ttl_seconds,
+    quota_mb=settings.upload_quota_mb,
+    min_free_mb=settings.min_free_disk_mb,
+)
+result_cache = ResultCache(state_backend, settings.result_cache_ttl_seconds)
+# OCR text outlives a failed extraction, so a retry only repeats the LLM work
+ocr_cache = ResultCache(state_backend, settings.ocr_cache_ttl_seconds, name="ocr")
+# Concurrent requests for one document share a single OCR + LLM run
+inflight = SingleFlight(
+    state_backend, settings.coalesce_lease_seconds, settings.coalesce_poll_interval
+)
+extraction_agent = ExtractionAgent(
+    llm_connector,
+    CheckpointStore(state_backend, settings.agent_checkpoint_ttl_seconds),
+)
+
+
+@dataclass
+class PipelineResult:
+    """OCR text and extraction result for one document."""
+
+    ocr_text: str
+    extraction: Dict[str, Any]
+    document_sha256: Optional[str] = None
+    cached: bool = False
+
+
+async def extract_fields(
+    ocr_text: str,
+    form_type: str,
+    document_id: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Extract structured fields from OCR text with the configured extraction mode.
+
+    ``EXTRACTION_MODE=single`` makes one LLM call per model of the
+    LLM_CASCADE, stopping at the first model whose result passes the
+    deterministic checks with confident required fields; ``agent`` runs the
+    checkpointed multi-step agent, which resumes a failed run of the same
+    document instead of starting over; ``chunked`` extracts from chunks of
+    a long transcript concurrently and merges the results (short
+    transcripts are extracted as in single mode). In every mode, OCR
+    confusions in codes and NPIs are corrected against the local code sets,
+    and confidence is scored locally.
+
+    Args:
+        ocr_text: Text extracted from the form
+        form_type: Type of medical form
+        document_id: Stable document id (SHA-256) for agent checkpoints
+
+    Returns:
+        Dictionary with ``fields``, ``reasoning``, ``confidence_scores``,
+        ``raw_response`` and ``llm_calls`` (plus ``model`` and
+        ``model_attempts`` in single mode, and ``field_pages`` when chunked)
+    """
+    if settings.extraction_mode == "chunked":
+        chunks = split_transcript(ocr_text, settings.extraction_chunk_chars)
+        if len(chunks) > 1:
+            return await _extract_chunked(ocr_text, form_type, chunks)
+
+    if settings.extraction_mode != "agent":
+        def review(extraction: Dict[str, Any]) -> Optional[str]:
+            token_logprobs = extraction.pop("token_logprobs", None)
+            extraction["fields"], corrections = code_sets.correct_fields(
+                extraction.get("fields", {})
+            )
+            if corrections:
+                extraction["reasoning"] = extraction.get("reasoning", []) + [
+                    correction_log(corrections)
+                ]
+            with stage("confidence"):
+                extraction["confidence_scores"] = score_fields(
+                    extraction["fields"],
+                    ocr_text,
+                    extraction.get("raw_response"),
+                    token_logprobs,
+                )
+            return _escalation_reason(extraction, ocr_text, form_type)
+
+        # With a cascade, CMS-1500 fields are requested under their catalogue
+        # names so required fields can be checked
+        field_names = None
+        if len(llm_connector.cascade) > 1 and form_type == cms1500.FORM_TYPE:
+            field_names = cms1500.identify_fields(ocr_text) or None
+        return await llm_connector.extract_fields_cascade(
+            ocr_text, form_type, review, field_names
+        )
+
+    state = await extraction_agent.extract(ocr_text, form_type, document_id)
+    return {
+        "raw_response": state["raw_response"],
+        "fields": state["extracted_fields"],
+        "reasoning": state["reasoning_log"],
+        "confidence_scores": state["confidence_scores"],
+        "errors": state["errors"],
+        "llm_calls": state["llm_calls"],
+    }
+
+
+async def _extract_chunked(
+    ocr_text: str,
+    form_type: str,
+    chunks: List[Chunk]
+) -> Dict[str, Any]:
+    """Extract fields from every chunk concurrently and merge them with page provenance."""
+    # Every chunk is asked for the same CMS-1500 keys so the results line up
+    field_names = None
+    if form_type == cms1500.FORM_TYPE:
+        field_names = cms1500.identify_fields(ocr_text) or None
+    limit = asyncio.Semaphore(max(1, settings.extraction_chunk_concurrency))
+
+    async def extract(chunk: Chunk) -> Dict[str, Any]:
+        async with limit:
+            return await llm_connector.extract_fields(
+                chunk.text, form_type, field_names=field_names
+            )
+
+    extractions = await asyncio.gather(*(extract(chunk) for chunk in chunks))
+    # Every chunk's fields are scored in one batch
+    with stage("confidence"):
+        chunk_confidence = score_forms([
+            FormFields(
+                extraction.get("fields", {}),
+                chunk.text,
+                extraction.get("raw_response"),
+                extraction.get("token_logprobs"),
+            )
+            for chunk, extraction in zip(chunks, extractions)
+        ])
+    with stage("merge"):
+        fields, provenance, reasoning = merge_extractions([
+            (chunk, extraction.get("fields", {}), confidence)
+            for chunk, extraction, confidence in zip(chunks, extractions, chunk_confidence)
+        ])
+        fields, corrections = code_sets.correct_fields(fields)
+        if corrections:
+            reasoning.append(correction_log(corrections))
+    with stage("confidence"):
+        confidence = score_fields(fields, ocr_text)
+    return {
+        "raw_response": PAGE_BREAK.join(e.get("raw_response") or "" for e in extractions),
+        "fields": fields,
+        "reasoning": reasoning,
+        "confidence_scores": confidence,
+        "field_pages": provenance,
+        "llm_calls": len(chunks),
+    }
+
+
+def _escalation_reason(
+    extraction: Dict[str, Any],
+    ocr_text: str,
+    form_type: str
+) -> Optional[str]:
+    """Return why a cascade model's extraction should go to the next model, if it should."""
+    fields = extraction.get("fields", {})
+    report = validate_fields(fields, ocr_text)
+    if report.failed:
+        return f"validation failed: {', '.join(sorted(report.failed))}"
+    if form_type != cms1500.FORM_TYPE:
+        return None
+    present = set(cms1500.identify_fields(ocr_text))
+    confidence = extraction.get("confidence_scores", {})
+    weak = [
+        name for name in cms1500.REQUIRED_FIELDS
+        if name in present and confidence.get(name, 0.0) < settings.llm_cascade_min_confidence
+    ]
+    if weak:
+        return f"low confidence: {', '.join(weak)}"
+    return None
+
+
+async def _ocr_page(image_path: Path, timer: StageTimer) -> str:
+    """Validate, encode and OCR one page image."""
+    with timer.stage("preprocess"):
+        is_valid = await file_handler.validate_image_async(image_path)
+    if not is_valid:
+        raise ValueError("Invalid image file")
+
+    # Convert to base64 for OCR API
+    with timer.stage("base64"):
+        image_data = await file_handler.image_to_base64_async(image_path)
+
+    return await ocr_connector.extract_text(image_data)
+
+
+async def _ocr(
+    file_path: Path,
+    document_sha256: str,
+    timer: StageTimer,
+    output_dir: Path
+) -> str:
+    """Rasterise and OCR a local document, reusing OCR text from an earlier attempt."""
+    cache_key = ocr_cache.key(document_sha256, settings.ocr_model, str(settings.ocr_max_pages))
+    cached = await ocr_cache.get(cache_key)
+    if cached is not None:
+        return cached["ocr_text"]
+
+    # Convert PDF to images if needed
+    if file_path.suffix.lower() == ".pdf":
+        # Only the pages that will be OCR'd are rendered
+        with timer.stage("rasterise"):
+            image_paths = await file_handler.pdf_to_images_async(
+                file_path, output_dir=output_dir, max_pages=settings.ocr_max_pages
+            )
+    else:
+        image_paths = [file_path]
+
+    # Pages are OCR'd concurrently and joined with form feeds, which chunked
+    # extraction splits on
+    pages = await asyncio.gather(*(_ocr_page(path, timer) for path in image_paths))
+    ocr_text = PAGE_BREAK.join(pages)
+    await ocr_cache.set(cache_key, {"ocr_text": ocr_text})
+    return ocr_text
+
+
+async def process_document(
+    file_path: Path,
+    document_sha256: str,
+    form_type: str,
+    timer: StageTimer,
+    output_dir: Path
+) -> PipelineResult:
+    """
+    Process a document already on disk, answering from the result cache if possible.
+
+    Concurrent calls for the same document and settings are coalesced: one
+    runs OCR and extraction, and the others receive its result.
+
+    Args:
+        file_path: PDF or image inside a request workspace (or any local path)
+        document_sha256: SHA-256 of the file contents
+        form_type: Type of medical form
+        timer: Stage timer for the request
+        output_dir: Workspace directory for derived files (rendered pages)
+
+    Returns:
+        Pipeline result
+
+    Raises:
+        ValueError: If the document is not a readable image or PDF
+    """
+    # Identical documents are processed once across all workers
+    cache_key = result_cache.key(
+        document_sha256,
+        form_type,
+        settings.ocr_model,
+        settings.llm_model,
+        settings.llm_cascade,
+        settings.extraction_mode,
+        str(settings.ocr_max_pages),
+    )
+    cached = await result_cache.get(cache_key)
+    if cached is not None:
+        return PipelineResult(
+            ocr_text=cached["ocr_text"],
+            extraction=cached["extraction"],
+            document_sha256=document_sha256,
+            cached=True,
+        )
+
+    async def compute() -> Dict[str, Any]:
+        ocr_text = await _ocr(file_path, document_sha256, timer, output_dir)
+        extraction = await extract_fields(ocr_text, form_type, document_sha256)
+        value = {"ocr_text": ocr_text, "extraction": extraction}
+        await result_cache.set(cache_key, value)
+        try:
+            await results_store.append(document_sha256, form_type, extraction)
+        except Exception as e:
+            print(f"Error recording result for {document_sha256}: {e}")
+        return value
+
+    # Duplicates arriving before the result is cached join the run in flight
+    start = time.perf_counter()
+    value, shared = await inflight.run(cache_key, compute, lambda: result_cache.peek(cache_key))
+    if shared:
+        timer.record("coalesce", time.perf_counter() - start)
+    return PipelineResult(
+        ocr_text=value["ocr_text"],
+        extraction=value["extraction"],
+        document_sha256=document_sha256,
+        cached=shared,
+    )
+
+
+async def process_file(file_path: Path, form_type: str, timer: StageTimer) -> PipelineResult:
+    """
+    Process a local PDF or image without copying it.
+
+    Rendered pages go to a fresh workspace that is removed afterwards, so the
+    source directory is never written to.
+
+    Args:
+        file_path: Local PDF or image
+        form_type: Type of medical form
+        timer: Stage timer for the document
+
+    Returns:
+        Pipeline result
+
+    Raises:
+        ValueError: If the file type is not allowed or the file is unreadable
+        DiskQuotaExceededError: If the upload volume is over quota
+    """
+    file_path = Path(file_path)
+    file_ext = file_path.suffix.lstrip(".").lower()
+    if file_ext not in settings.allowed_extensions:
+        raise ValueError(f"File type .{file_ext} not allowed")
+
+    async with workspaces.workspace() as workspace:
+        with timer.stage("hash"):
+            document_sha256 = await file_handler.hash_file_async(file_path)
+        return await process_document(
+            file_path, document_sha256, form_type, timer, workspace.path
+        )
+
+
+async def process_url(image_url: str, form_type: str, timer: StageTimer) -> PipelineResult:
+    """
+    Download a PDF or image and process it like an upload.
+
+    The document is fetched by the server into a request workspace, so PDFs
+    are rasterised and the OCR and result caches apply as for uploads.
+
+    Args:
+        image_url: http(s) URL of the document
+        form_type: Type of medical form
+        timer: Stage timer for the request
+
+    Returns:
+        Pipeline result
+
+    Raises:
+        ValueError: If the URL or the document type is not supported
+        UploadTooLargeError: If the document exceeds URL_FETCH_MAX_MB
+        RemoteFetchError: If the download fails
+        DiskQuotaExceededError: If the upload volume is over quota
+    """
+    async with workspaces.workspace() as workspace:
+        with timer.stage("download"):
+            document = await url_fetcher.fetch(image_url, workspace.path)
+        return await process_document(
+            document.path, document.sha256, form_type, timer, workspace.path
+        )
@@ -1,7 +1,8 @@
 """FastAPI route definitions."""
 import time
-from pathlib import Path
-from fastapi import APIRouter, UploadFile, File, HTTPException, BackgroundTasks
+from datetime import date
+from typing import Optional
+from fastapi import APIRouter, UploadFile, File, HTTPException, Response
 from app.models import (
     OCRRequest,
     OCRResponse,
@@ -11,16 +12,27 @@ from app.models import (
     ProcessFormResponse,
     HealthResponse,
 )
-from app.connectors.ocr_connector import OCRConnector
-from app.connectors.llm_connector import LLMConnector
-from app.utils.file_handler import FileHandler
+from app.pipeline import (
+    PipelineResult,
+    extract_fields as run_extraction,
+    file_handler,
+    ocr_connector,
+    process_document,
+    process_url,
+    result_cache,
+    workspaces,
+)
+from app.utils.file_handler import UploadTooLargeError
 from app.utils.toon_converter import TOONConverter
+from app.utils.metrics import REQUEST_SECONDS, StageTimer
+from app.utils.executors import executors
+from app.utils.quota import ProviderQuotaExceededError
+from app.utils.results_store import FORMATS, results_store
+from app.utils.url_fetcher import RemoteFetchError
+from app.utils.workspace import DiskQuotaExceededError
 
 
 router = APIRouter()
-file_handler = FileHandler()
-ocr_connector = OCRConnector()
-llm_connector = LLMConnector()
 toon_converter = TOONConverter()
 
 
@@ -44,7 +56,7 @@ async def extract_text(request: OCRRequest):
     if not request.image_url:
         raise HTTPException(status_code=400, detail="image_url is required")
 
-    start_time = time.time()
+    start_time = time.perf_counter()
 
     try:
         text = await ocr_connector.extract_text(request.image_url)
@@ -58,7 +70,7 @@ async def extract_text(request: OCRRequest):
             formatted_text = text
             output_format = "text"
 
-        processing_time = (time.time() - start_time) * 1000
+        processing_time = (time.perf_counter() - start_time) * 1000
 
         return OCRResponse(
             text=formatted_text,
@@ -66,6 +78,10 @@ async def extract_text(request: OCRRequest):
             processing_time_ms=processing_time
         )
 
+    except ProviderQuotaExceededError as e:
+        raise HTTPException(
+            status_code=503, detail=str(e), headers={"Retry-After": str(e.retry_after)}
+        )
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -82,44 +98,65 @@ async def extract_fields(request: ExtractionRequest):
         Extracted fields with reasoning logs
 
     Note:
-        TODO: Integrate LangGraph agent for multi-step extraction workflow
-        TODO: Add checkpointing and error recovery
-        TODO: Implement confidence scoring per field
+        With EXTRACTION_MODE=agent this runs the multi-step agent, which
+        checkpoints per node and resumes a failed run of the same text.
     """
-    start_time = time.time()
+    start_time = time.perf_counter()
 
     try:
-        # Placeholder for LangGraph agent integration
-        # The agent will orchestrate:
-        # 1. Field identification
-        # 2. Value extraction with validation
-        # 3. Cross-field consistency checks
-        # 4. Confidence scoring
-        # All with full reasoning trace capture
-
-        result = await llm_connector.extract_fields(
-            request.ocr_text,
-            request.form_type
-        )
+        result = await run_extraction(request.ocr_text, request.form_type)
 
-        processing_time = (time.time() - start_time) * 1000
+        processing_time = (time.perf_counter() - start_time) * 1000
 
         return ExtractionResponse(
             fields=result.get("fields", {}),
             reasoning_log=result.get("reasoning", []),
             confidence_scores=result.get("confidence_scores", {}),
-            processing_time_ms=processing_time
+            processing_time_ms=processing_time,
+            llm_calls=result.get("llm_calls"),
+            model=result.get("model"),
+            model_attempts=result.get("model_attempts"),
+            field_pages=result.get("field_pages")
         )
 
+    except ProviderQuotaExceededError as e:
+        raise HTTPException(
+            status_code=503, detail=str(e), headers={"Retry-After": str(e.retry_after)}
+        )
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def _form_response(
+    form_type: str,
+    result: PipelineResult,
+    elapsed: float,
+    timer: StageTimer,
+    include_timings: bool
+) -> ProcessFormResponse:
+    """Build the processing response from a pipeline result."""
+    return ProcessFormResponse(
+        form_type=form_type,
+        ocr_text=result.ocr_text,
+        extracted_fields=result.extraction.get("fields", {}),
+        reasoning_log=result.extraction.get("reasoning", []),
+        confidence_scores=result.extraction.get("confidence_scores", {}),
+        total_processing_time_ms=elapsed * 1000,
+        stage_timings_ms=timer.as_ms() if include_timings else None,
+        document_sha256=result.document_sha256,
+        cached=result.cached,
+        llm_calls=0 if result.cached else result.extraction.get("llm_calls"),
+        model=result.extraction.get("model"),
+        model_attempts=result.extraction.get("model_attempts"),
+        field_pages=result.extraction.get("field_pages")
+    )
+
+
 @router.post("/process/upload")
 async def process_uploaded_form(
-    background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
-    form_type: str = "CMS-1500"
+    form_type: str = "CMS-1500",
+    include_timings: bool = False
 ):
     """
     Process an uploaded medical form (end-to-end).
@@ -129,67 +166,58 @@ async def process_uploaded_form(
     Args:
         file: Uploaded file (PDF or image)
         form_type: Type of medical form
+        include_timings: Include the per-stage timing breakdown in the response
 
     Returns:
         Complete processing results
     """
-    start_time = time.time()
+    start_time = time.perf_counter()
+    timer = StageTimer()
 
     try:
-        # Save uploaded file
-        file_path = await file_handler.save_upload(file)
-
-        # Convert PDF to images if needed
-        if file_path.suffix.lower() == ".pdf":
-            image_paths = file_handler.pdf_to_images(file_path)
-            image_path = image_paths[0]  # Process first page for now
-            # TODO: Handle multi-page PDFs
-        else:
-            image_path = file_path
+        # The workspace owns the upload and every page rendered from it, and
+        # is removed when the block exits, whether or not processing succeeded
+        async with workspaces.workspace() as workspace:
+            with timer.activate():
+                # Save uploaded file
+                with timer.stage("upload"):
+                    upload = await file_handler.save_upload(file, workspace.path)
 
-        # Validate image
-        if not file_handler.validate_image(image_path):
-            raise HTTPException(status_code=400, detail="Invalid image file")
+                result = await process_document(
+                    upload.path, upload.sha256, form_type, timer, workspace.path
+                )
 
-        # Convert to base64 for OCR API
-        image_data = file_handler.image_to_base64(image_path)
+        elapsed = time.perf_counter() - start_time
+        REQUEST_SECONDS.observe(elapsed, endpoint="process_upload")
 
-        # Extract text via OCR
-        ocr_text = await ocr_connector.extract_text(image_data)
-
-        # Extract fields via LLM
-        # TODO: Replace with LangGraph agent workflow
-        extraction_result = await llm_connector.extract_fields(ocr_text, form_type)
-
-        total_time = (time.time() - start_time) * 1000
-
-        # Schedule cleanup
-        background_tasks.add_task(file_handler.cleanup_file, file_path)
-        if image_path != file_path:
-            background_tasks.add_task(file_handler.cleanup_file, image_path)
-
-        return ProcessFormResponse(
-            form_type=form_type,
-            ocr_text=ocr_text,
-            extracted_fields=extraction_result.get("fields", {}),
-            reasoning_log=extraction_result.get("reasoning", []),
-            confidence_scores=extraction_result.get("confidence_scores", {}),
-            total_processing_time_ms=total_time
-        )
+        return _form_response(form_type, result, elapsed, timer, include_timings)
 
     except HTTPException:
         raise
+    except DiskQuotaExceededError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "30"})
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except ProviderQuotaExceededError as e:
+        raise HTTPException(
+            status_code=503, detail=str(e), headers={"Retry-After": str(e.retry_after)}
+        )
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.post("/process/url", response_model=ProcessFormResponse)
-async def process_form_url(request: ProcessFormRequest):
+async def process_form_url(request: ProcessFormRequest, include_timings: bool = False):
     """
     Process a medical form from a URL (end-to-end).
 
+    The server downloads the PDF or image and processes it like an upload.
+
     Args:
         request: Processing request with image URL
+        include_timings: Include the per-stage timing breakdown in the response
 
     Returns:
         Complete processing results
@@ -197,29 +225,70 @@ async def process_form_url(request: ProcessFormRequest):
     if not request.image_url:
         raise HTTPException(status_code=400, detail="image_url is required")
 
-    start_time = time.time()
+    start_time = time.perf_counter()
+    timer = StageTimer()
 
     try:
-        # Extract text via OCR
-        ocr_text = await ocr_connector.extract_text(request.image_url)
-
-        # Extract fields via LLM
-        # TODO: Replace with LangGraph agent workflow
-        extraction_result = await llm_connector.extract_fields(
-            ocr_text,
-            request.form_type
+        with timer.activate():
+            result = await process_url(request.image_url, request.form_type, timer)
+
+        elapsed = time.perf_counter() - start_time
+        REQUEST_SECONDS.observe(elapsed, endpoint="process_url")
+
+        return _form_response(request.form_type, result, elapsed, timer, include_timings)
+
+    except DiskQuotaExceededError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "30"})
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except RemoteFetchError as e:
+        raise HTTPException(status_code=502, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except ProviderQuotaExceededError as e:
+        raise HTTPException(
+            status_code=503, detail=str(e), headers={"Retry-After": str(e.retry_after)}
         )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
-        total_time = (time.time() - start_time) * 1000
 
-        return ProcessFormResponse(
-            form_type=request.form_type,
-            ocr_text=ocr_text,
-            extracted_fields=extraction_result.get("fields", {}),
-            reasoning_log=extraction_result.get("reasoning", []),
-            confidence_scores=extraction_result.get("confidence_scores", {}),
-            total_processing_time_ms=total_time
-        )
+@router.get("/results/export")
+async def export_results(
+    table: str = "forms",
+    fields: Optional[str] = None,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    format: str = "parquet"
+):
+    """
+    Export stored extraction results in bulk.
 
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    With several workers, documents completed within the last
+    ``RESULTS_FLUSH_INTERVAL_SECONDS`` on other workers may not be included yet.
+
+    Args:
+        table: ``forms`` (one row per document) or ``service_lines``
+        fields: Comma-separated columns to return (document hash and
+            processing time are always included); all columns if omitted
+        start: First processing date (UTC) to include
+        end: Last processing date (UTC) to include
+        format: ``parquet``, ``csv`` or ``jsonl``
+
+    Returns:
+        The matching rows in the requested format
+    """
+    columns = [f.strip() for f in fields.split(",") if f.strip()] if fields else None
+    try:
+        content = await executors.run_io(
+            results_store.export, table, columns, start, end, format
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except RuntimeError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    return Response(
+        content=content,
+        media_type=FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="{table}.{format}"'},
+    )
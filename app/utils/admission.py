@@ -0,0 +1,259 @@
+"""Admission control for the processing pipelines.
+
+Each admitted request may hold an upload, rendered pages and in-flight
+provider calls, so the number of concurrent pipelines is capped. Requests
+over the cap wait in a bounded queue, ordered by priority lane, and are shed
+with 429 (queue full) or 503 (waited too long) plus ``Retry-After`` instead
+of piling up until the worker runs out of memory.
+"""
+import asyncio
+import heapq
+import itertools
+import json
+import time
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from typing import AsyncIterator, Dict, Iterator, List, Sequence
+
+from app.utils.metrics import registry
+
+
+PIPELINES_ACTIVE = registry.gauge(
+    "medocr_pipelines_active",
+    "Processing pipelines currently admitted",
+)
+ADMISSION_QUEUE_DEPTH = registry.gauge(
+    "medocr_admission_queue_depth",
+    "Requests waiting for a pipeline slot",
+    ["lane"],
+)
+ADMISSION_WAIT_SECONDS = registry.histogram(
+    "medocr_admission_wait_seconds",
+    "Time spent waiting for a pipeline slot",
+    ["lane"],
+)
+ADMISSION_REJECTIONS = registry.counter(
+    "medocr_admission_rejections_total",
+    "Requests shed by admission control",
+    ["lane", "reason"],
+)
+
+# Lower rank is served first
+LANES: Dict[str, int] = {"interactive": 0, "batch": 1}
+DEFAULT_LANE = "interactive"
+
+_current_lane: ContextVar[str] = ContextVar("priority_lane", default=DEFAULT_LANE)
+
+
+def current_lane() -> str:
+    """Return the priority lane of the request being handled."""
+    return _current_lane.get()
+
+
+@contextmanager
+def priority_lane(lane: str) -> Iterator[None]:
+    """Run the block (and anything it awaits) in ``lane``."""
+    token = _current_lane.set(lane)
+    try:
+        yield
+    finally:
+        _current_lane.reset(token)
+
+
+class AdmissionRejectedError(Exception):
+    """Raised when a request cannot be admitted."""
+
+    def __init__(self, status_code: int, detail: str, retry_after: int):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """
+    Cap concurrent pipelines with a bounded, prioritised wait queue.
+
+    Waiters are served strictly by lane rank, then arrival order. Batch work
+    can be kept out of the last ``interactive_reserved`` slots so a bulk job
+    never starves interactive users.
+    """
+
+    def __init__(
+        self,
+        max_concurrent: int = 4,
+        max_queue: int = 16,
+        queue_timeout: float = 10.0,
+        retry_after: int = 5,
+        interactive_reserved: int = 0,
+    ):
+        """
+        Initialize the controller.
+
+        Args:
+            max_concurrent: Pipelines allowed to run at once
+            max_queue: Requests allowed to wait; further requests get 429
+            queue_timeout: Seconds a request may wait before it gets 503
+            retry_after: Value of the ``Retry-After`` header on rejections
+            interactive_reserved: Slots batch requests may not use
+        """
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.retry_after = retry_after
+        self.interactive_reserved = min(interactive_reserved, max(max_concurrent - 1, 0))
+        self.active = 0
+        self._waiters: List[list] = []
+        self._sequence = itertools.count()
+
+    @property
+    def queued(self) -> int:
+        """Number of requests waiting for a slot."""
+        return len(self._waiters)
+
+    def _capacity(self, lane: str) -> int:
+        if lane == DEFAULT_LANE:
+            return self.max_concurrent
+        return self.max_concurrent - self.interactive_reserved
+
+    def _update_gauges(self) -> None:
+        PIPELINES_ACTIVE.set(self.active)
+        for lane in LANES:
+            ADMISSION_QUEUE_DEPTH.set(
+                sum(1 for waiter in self._waiters if waiter[3] == lane), lane=lane
+            )
+
+    def _reject(self, lane: str, reason: str, status_code: int, detail: str):
+        ADMISSION_REJECTIONS.inc(lane=lane, reason=reason)
+        return AdmissionRejectedError(status_code, detail, self.retry_after)
+
+    async def acquire(self, lane: str = DEFAULT_LANE) -> None:
+        """
+        Wait for a pipeline slot.
+
+        Args:
+            lane: Priority lane (``interactive`` or ``batch``)
+
+        Raises:
+            ValueError: If the lane is unknown
+            AdmissionRejectedError: If the queue is full or the wait times out
+        """
+        if lane not in LANES:
+            raise ValueError(f"Unknown priority lane: {lane}")
+        rank = LANES[lane]
+
+        # Only take a free slot if nobody of equal or higher priority is waiting
+        nobody_ahead = not self._waiters or self._waiters[0][0] > rank
+        if nobody_ahead and self.active < self._capacity(lane):
+            self.active += 1
+            self._update_gauges()
+            ADMISSION_WAIT_SECONDS.observe(0.0, lane=lane)
+            return
+
+        if len(self._waiters) >= self.max_queue:
+            raise self._reject(lane, "queue_full", 429, "Server busy, admission queue is full")
+
+        future = asyncio.get_running_loop().create_future()
+        waiter = [rank, next(self._sequence), future, lane]
+        heapq.heappush(self._waiters, waiter)
+        self._update_gauges()
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(future, self.queue_timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if future.done() and not future.cancelled():
+                # The slot was handed over as we gave up; pass it on
+                self.release()
+            elif waiter in self._waiters:
+                self._waiters.remove(waiter)
+                heapq.heapify(self._waiters)
+                self._update_gauges()
+            if isinstance(e, asyncio.TimeoutError):
+                raise self._reject(
+                    lane, "timeout", 503, "Server busy, timed out waiting for capacity"
+                )
+            raise
+        ADMISSION_WAIT_SECONDS.observe(time.perf_counter() - start, lane=lane)
+
+    def release(self) -> None:
+        """Free a slot and hand it to the highest-priority eligible waiter."""
+        self.active -= 1
+        while self._waiters:
+            _, _, future, lane = self._waiters[0]
+            if future.done():
+                heapq.heappop(self._waiters)
+                continue
+            if self.active >= self._capacity(lane):
+                break
+            heapq.heappop(self._waiters)
+            self.active += 1
+            future.set_result(None)
+        self._update_gauges()
+
+    @asynccontextmanager
+    async def slot(self, lane: str = DEFAULT_LANE) -> AsyncIterator[None]:
+        """Hold a pipeline slot for the duration of the block."""
+        await self.acquire(lane)
+        try:
+            yield
+        finally:
+            self.release()
+
+
+class AdmissionMiddleware:
+    """
+    Admit requests to the processing endpoints before their bodies are read.
+
+    The lane comes from the ``X-Priority`` header (``interactive`` by
+    default). The slot is held until the response has been sent.
+    """
+
+    def __init__(self, app, controller: AdmissionController, path_prefixes: Sequence[str]):
+        """
+        Initialize the middleware.
+
+        Args:
+            app: Wrapped ASGI application
+            controller: Shared admission controller
+            path_prefixes: Only requests under these paths are admitted
+        """
+        self.app = app
+        self.controller = controller
+        self.path_prefixes = tuple(path_prefixes)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not scope["path"].startswith(self.path_prefixes):
+            await self.app(scope, receive, send)
+            return
+
+        lane = DEFAULT_LANE
+        for name, value in scope.get("headers", ()):
+            if name == b"x-priority":
+                lane = value.decode("latin-1").strip().lower()
+                break
+
+        try:
+            await self.controller.acquire(lane)
+        except ValueError as e:
+            await self._respond(send, 400, str(e))
+            return
+        except AdmissionRejectedError as e:
+            await self._respond(send, e.status_code, e.detail, e.retry_after)
+            return
+
+        try:
+            with priority_lane(lane):
+                await self.app(scope, receive, send)
+        finally:
+            self.controller.release()
+
+    async def _respond(self, send, status: int, detail: str, retry_after: int = 0) -> None:
+        body = json.dumps({"detail": detail}).encode("utf-8")
+        headers = [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode("ascii")),
+        ]
+        if retry_after:
+            headers.append((b"retry-after", str(retry_after).encode("ascii")))
+        await send({"type": "http.response.start", "status": status, "headers": headers})
+        await send({"type": "http.response.body", "body": body})
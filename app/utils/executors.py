@@ -0,0 +1,123 @@
+"""Managed executors for blocking work called from async handlers.
+
+I/O-ish work (file reads, base64 of already-encoded images) goes to a thread
+pool; CPU-bound work (rasterisation, image decoding and re-encoding) goes to
+a process pool so it cannot hold the event loop or the GIL. Pools are
+created on first use and shut down from the application lifespan.
+"""
+import asyncio
+import functools
+import multiprocessing
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+from app.config import settings
+from app.utils.metrics import registry
+
+
+LOOP_LAG_SECONDS = registry.histogram(
+    "medocr_event_loop_lag_seconds",
+    "Delay between when the event loop should have woken a timer and when it did",
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+EXECUTOR_TASKS = registry.counter(
+    "medocr_executor_tasks_total",
+    "Tasks dispatched to the managed executors",
+    ["pool"],
+)
+
+
+class ExecutorManager:
+    """Own the thread and process pools used to keep work off the event loop."""
+
+    def __init__(
+        self,
+        io_workers: int = 8,
+        cpu_workers: int = 2,
+        start_method: str = "spawn",
+        max_tasks_per_child: Optional[int] = None,
+    ):
+        """
+        Initialize the manager without starting any pools.
+
+        Args:
+            io_workers: Thread pool size
+            cpu_workers: Process pool size; 0 runs CPU work on the thread pool
+            start_method: multiprocessing start method for the process pool
+            max_tasks_per_child: Recycle worker processes after this many tasks
+        """
+        self.io_workers = io_workers
+        self.cpu_workers = cpu_workers
+        self.start_method = start_method
+        self.max_tasks_per_child = max_tasks_per_child
+        self._threads: Optional[ThreadPoolExecutor] = None
+        self._processes: Optional[ProcessPoolExecutor] = None
+
+    @property
+    def threads(self) -> ThreadPoolExecutor:
+        if self._threads is None:
+            self._threads = ThreadPoolExecutor(self.io_workers, thread_name_prefix="io")
+        return self._threads
+
+    @property
+    def processes(self) -> Executor:
+        if self.cpu_workers <= 0:
+            return self.threads
+        if self._processes is None:
+            kwargs = {}
+            if self.max_tasks_per_child and self.start_method != "fork":
+                kwargs["max_tasks_per_child"] = self.max_tasks_per_child
+            self._processes = ProcessPoolExecutor(
+                self.cpu_workers,
+                mp_context=multiprocessing.get_context(self.start_method),
+                **kwargs,
+            )
+        return self._processes
+
+    async def run_io(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """Run a blocking, I/O-bound call on the thread pool."""
+        EXECUTOR_TASKS.inc(pool="io")
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.threads, functools.partial(fn, *args, **kwargs))
+
+    async def run_cpu(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """
+        Run a CPU-bound call on the process pool.
+
+        ``fn`` must be a module-level function and its arguments and result
+        must be picklable; pass paths or bytes rather than image objects.
+        """
+        EXECUTOR_TASKS.inc(pool="cpu")
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.processes, functools.partial(fn, *args, **kwargs))
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Finish queued work (if ``wait``) and release both pools."""
+        if self._processes is not None:
+            self._processes.shutdown(wait=wait, cancel_futures=not wait)
+            self._processes = None
+        if self._threads is not None:
+            self._threads.shutdown(wait=wait, cancel_futures=not wait)
+            self._threads = None
+
+
+async def monitor_loop_lag(interval: float = 0.25) -> None:
+    """
+    Record event-loop lag until cancelled.
+
+    Sleeps for ``interval`` and observes how late the wake-up was; a loop
+    blocked by synchronous work shows up directly as lag.
+    """
+    while True:
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        LOOP_LAG_SECONDS.observe(max(0.0, time.perf_counter() - start - interval))
+
+
+executors = ExecutorManager(
+    io_workers=settings.io_workers,
+    cpu_workers=settings.cpu_workers,
+    start_method=settings.cpu_start_method,
+    max_tasks_per_child=settings.cpu_max_tasks_per_child,
+)
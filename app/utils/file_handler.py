@@ -1,12 +1,37 @@
 """File handling utilities for medical forms."""
 import os
-import base64
+import hashlib
+import uuid
+from dataclasses import dataclass
 from pathlib import Path
 from typing import Optional
 from fastapi import UploadFile
-from PIL import Image
-from pdf2image import convert_from_path
 from app.config import settings
+from app.utils import image_ops
+from app.utils.executors import executors
+from app.utils.tracing import tracer
+
+
+class UploadTooLargeError(ValueError):
+    """Raised when an upload exceeds ``settings.max_upload_size_mb``."""
+
+
+@dataclass
+class SavedUpload:
+    """An upload persisted to disk, with its content hash."""
+
+    path: Path
+    sha256: str
+    size_bytes: int
+    original_filename: str
+
+
+def _sha256_file(file_path: Path, chunk_size: int) -> str:
+    hasher = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        while chunk := f.read(chunk_size):
+            hasher.update(chunk)
+    return hasher.hexdigest()
 
 
 class FileHandler:
@@ -17,37 +42,82 @@ class FileHandler:
         self.upload_dir = Path(upload_dir)
         self.upload_dir.mkdir(parents=True, exist_ok=True)
 
-    async def save_upload(self, file: UploadFile) -> Path:
+    async def save_upload(self, file: UploadFile, dest_dir: Optional[Path] = None) -> SavedUpload:
         """
-        Save uploaded file to disk.
+        Stream an uploaded file to disk in fixed-size chunks.
+
+        The file is written under a unique name, so concurrent uploads with
+        the same filename never collide, and its SHA-256 is computed while
+        streaming. At most one chunk is held in memory at a time.
 
         Args:
             file: Uploaded file from FastAPI
+            dest_dir: Directory to write into (defaults to the upload directory)
 
         Returns:
-            Path to saved file
+            The saved upload with its path, content hash and size
 
         Raises:
             ValueError: If file extension is not allowed
+            UploadTooLargeError: If the file exceeds the configured size limit
         """
-        file_ext = file.filename.split(".")[-1].lower()
+        file_ext = (file.filename or "").rsplit(".", 1)[-1].lower()
         if file_ext not in settings.allowed_extensions:
             raise ValueError(f"File type .{file_ext} not allowed")
 
-        file_path = self.upload_dir / file.filename
-        content = await file.read()
-
-        with open(file_path, "wb") as f:
-            f.write(content)
-
-        return file_path
-
-    def pdf_to_images(self, pdf_path: Path) -> list[Path]:
+        max_bytes = settings.max_upload_size_mb * 1024 * 1024
+        if file.size is not None and file.size > max_bytes:
+            raise UploadTooLargeError(f"File exceeds {settings.max_upload_size_mb} MB limit")
+
+        chunk_size = settings.upload_chunk_size_kb * 1024
+        file_path = Path(dest_dir or self.upload_dir) / f"{uuid.uuid4().hex}.{file_ext}"
+        hasher = hashlib.sha256()
+        size = 0
+
+        with tracer.span("file.save_upload", {"file.extension": file_ext}) as span:
+            try:
+                with open(file_path, "wb") as f:
+                    while chunk := await file.read(chunk_size):
+                        size += len(chunk)
+                        if size > max_bytes:
+                            raise UploadTooLargeError(
+                                f"File exceeds {settings.max_upload_size_mb} MB limit"
+                            )
+                        hasher.update(chunk)
+                        f.write(chunk)
+            except BaseException:
+                self.cleanup_file(file_path)
+                raise
+            span.set_attribute("file.size_bytes", size)
+
+        return SavedUpload(
+            path=file_path,
+            sha256=hasher.hexdigest(),
+            size_bytes=size,
+            original_filename=file.filename,
+        )
+
+    async def hash_file_async(self, file_path: Path) -> str:
+        """Return the SHA-256 of a file on disk, read in chunks on the thread pool."""
+        return await executors.run_io(
+            _sha256_file, file_path, settings.upload_chunk_size_kb * 1024
+        )
+
+    def pdf_to_images(
+        self,
+        pdf_path: Path,
+        dpi: Optional[int] = None,
+        output_dir: Optional[Path] = None,
+        max_pages: Optional[int] = None
+    ) -> list[Path]:
         """
         Convert PDF to images.
 
         Args:
             pdf_path: Path to PDF file
+            dpi: Rasterisation resolution (defaults to settings.pdf_dpi)
+            output_dir: Directory for the page images (defaults to the PDF's own)
+            max_pages: Render only the first ``max_pages`` pages (None or 0 for all)
 
         Returns:
             List of paths to converted images
@@ -56,16 +126,37 @@ class FileHandler:
             Requires poppler installed for pdf2image
             TODO: Add error handling for missing poppler
         """
-        images = convert_from_path(pdf_path)
-        image_paths = []
-
-        for i, image in enumerate(images):
-            image_path = pdf_path.parent / f"{pdf_path.stem}_page_{i+1}.png"
-            image.save(image_path, "PNG")
-            image_paths.append(image_path)
+        dpi = dpi or settings.pdf_dpi
+        with tracer.span("file.pdf_to_images", {"pdf.dpi": dpi}) as span:
+            rendered = image_ops.render_pdf_pages(
+                str(pdf_path), dpi, str(output_dir) if output_dir else None, max_pages
+            )
+            image_paths = [Path(p) for p in rendered]
+            span.set_attribute("pdf.page_count", len(image_paths))
 
         return image_paths
 
+    async def pdf_to_images_async(
+        self,
+        pdf_path: Path,
+        dpi: Optional[int] = None,
+        output_dir: Optional[Path] = None,
+        max_pages: Optional[int] = None
+    ) -> list[Path]:
+        """Rasterise a PDF on the process pool; see :meth:`pdf_to_images`."""
+        dpi = dpi or settings.pdf_dpi
+        with tracer.span("file.pdf_to_images", {"pdf.dpi": dpi}) as span:
+            rendered = await executors.run_cpu(
+                image_ops.render_pdf_pages,
+                str(pdf_path),
+                dpi,
+                str(output_dir) if output_dir else None,
+                max_pages,
+            )
+            span.set_attribute("pdf.page_count", len(rendered))
+
+        return [Path(p) for p in rendered]
+
     def image_to_base64(self, image_path: Path) -> str:
         """
         Convert image to base64 string for API transmission.
@@ -76,21 +167,19 @@ class FileHandler:
         Returns:
             Base64 encoded image string with data URI prefix
         """
-        with open(image_path, "rb") as f:
-            image_data = f.read()
+        with tracer.span("file.image_to_base64") as span:
+            data_uri = image_ops.encode_data_uri(str(image_path))
+            span.set_attribute("payload.size_bytes", len(data_uri))
 
-        base64_data = base64.b64encode(image_data).decode("utf-8")
+        return data_uri
 
-        # Determine MIME type
-        ext = image_path.suffix.lower()
-        mime_types = {
-            ".png": "image/png",
-            ".jpg": "image/jpeg",
-            ".jpeg": "image/jpeg",
-        }
-        mime_type = mime_types.get(ext, "image/png")
+    async def image_to_base64_async(self, image_path: Path) -> str:
+        """Encode an image on the thread pool; see :meth:`image_to_base64`."""
+        with tracer.span("file.image_to_base64") as span:
+            data_uri = await executors.run_io(image_ops.encode_data_uri, str(image_path))
+            span.set_attribute("payload.size_bytes", len(data_uri))
 
-        return f"data:{mime_type};base64,{base64_data}"
+        return data_uri
 
     def validate_image(self, image_path: Path) -> bool:
         """
@@ -102,12 +191,19 @@ class FileHandler:
         Returns:
             True if valid image, False otherwise
         """
-        try:
-            with Image.open(image_path) as img:
-                img.verify()
-            return True
-        except Exception:
-            return False
+        with tracer.span("file.validate_image") as span:
+            is_valid = image_ops.verify_image(str(image_path))
+            span.set_attribute("image.valid", is_valid)
+
+        return is_valid
+
+    async def validate_image_async(self, image_path: Path) -> bool:
+        """Validate an image on the process pool; see :meth:`validate_image`."""
+        with tracer.span("file.validate_image") as span:
+            is_valid = await executors.run_cpu(image_ops.verify_image, str(image_path))
+            span.set_attribute("image.valid", is_valid)
+
+        return is_valid
 
     def cleanup_file(self, file_path: Path) -> None:
         """
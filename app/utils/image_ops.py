@@ -0,0 +1,76 @@
+"""CPU-bound image operations safe to run in worker processes.
+
+Functions here take and return only paths, strings and primitives so they
+can be dispatched to a process pool without pickling images. They import
+nothing from ``app`` (and therefore never construct ``Settings``), which
+keeps spawned workers cheap to start.
+"""
+import base64
+import uuid
+from pathlib import Path
+from typing import List, Optional
+
+from PIL import Image
+
+
+MIME_TYPES = {
+    ".png": "image/png",
+    ".jpg": "image/jpeg",
+    ".jpeg": "image/jpeg",
+}
+
+
+def render_pdf_pages(
+    pdf_path: str,
+    dpi: int,
+    output_dir: Optional[str] = None,
+    max_pages: Optional[int] = None,
+) -> List[str]:
+    """
+    Rasterise the pages of a PDF to PNG files.
+
+    pdftoppm writes the PNGs directly, so page pixels never pass through
+    Python; only the output paths are returned to the caller.
+
+    Args:
+        pdf_path: Path to the PDF file
+        dpi: Rasterisation resolution
+        output_dir: Directory for the page images (defaults to the PDF's own)
+        max_pages: Render only the first ``max_pages`` pages (None or 0 for all)
+
+    Returns:
+        Paths of the page images, in page order
+    """
+    from pdf2image import convert_from_path
+
+    source = Path(pdf_path)
+    rendered = convert_from_path(
+        source,
+        dpi=dpi,
+        first_page=1,
+        last_page=max_pages or None,
+        fmt="png",
+        output_folder=output_dir or source.parent,
+        # pdf2image collects outputs by filename prefix, so make it unique
+        output_file=f"{source.stem}_{uuid.uuid4().hex[:8]}_page",
+        paths_only=True,
+    )
+    return [str(path) for path in sorted(rendered)]
+
+
+def verify_image(image_path: str) -> bool:
+    """Return True if the file is a readable, uncorrupted image."""
+    try:
+        with Image.open(image_path) as img:
+            img.verify()
+        return True
+    except Exception:
+        return False
+
+
+def encode_data_uri(image_path: str) -> str:
+    """Read an image and return it as a base64 data URI."""
+    path = Path(image_path)
+    data = path.read_bytes()
+    mime_type = MIME_TYPES.get(path.suffix.lower(), "image/png")
+    return f"data:{mime_type};base64,{base64.b64encode(data).decode('ascii')}"
@@ -0,0 +1,418 @@
+"""In-process metrics with Prometheus text exposition.
+
+Recording is a dict lookup plus a lock-protected add, so timers and counters
+can sit on the request hot path without measurable overhead.
+"""
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+from app.utils.tracing import current_span
+
+
+DEFAULT_BUCKETS: Tuple[float, ...] = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0
+)
+
+
+def _escape(value: str) -> str:
+    """Escape a label value per the exposition format."""
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labelnames: Sequence[str], values: Tuple[str, ...], extra: str = "") -> str:
+    """Render a Prometheus label set such as ``{stage="ocr",le="0.5"}``."""
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    """Render a sample value, keeping integers free of a trailing ``.0``."""
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    """Base class holding the name, help text and label schema of a metric."""
+
+    type_name = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        if len(labels) != len(self.labelnames):
+            raise ValueError(
+                f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}"
+            )
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def render(self) -> List[str]:
+        """Return the exposition lines for this metric."""
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.type_name}",
+        ]
+        lines.extend(self._samples())
+        return lines
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """Monotonically increasing counter."""
+
+    type_name = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        """Increment the counter for the given label values."""
+        if amount < 0:
+            raise ValueError("Counters can only be incremented")
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def get(self, **labels: str) -> float:
+        """Return the current value for the given label values."""
+        return self._values.get(self._key(labels), 0.0)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+            for key, value in items
+        ]
+
+
+class Gauge(_Metric):
+    """Value that can go up and down."""
+
+    type_name = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def set(self, value: float, **labels: str) -> None:
+        """Set the gauge for the given label values."""
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        """Add ``amount`` (which may be negative) to the gauge."""
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels: str) -> None:
+        """Subtract ``amount`` from the gauge."""
+        self.inc(-amount, **labels)
+
+    def get(self, **labels: str) -> float:
+        """Return the current value for the given label values."""
+        return self._values.get(self._key(labels), 0.0)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+            for key, value in items
+        ]
+
+
+class Histogram(_Metric):
+    """Cumulative histogram with fixed upper bounds."""
+
+    type_name = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [bucket counts..., +Inf count], sum
+        self._counts: Dict[Tuple[str, ...], List[int]] = {}
+        self._sums: Dict[Tuple[str, ...], float] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        """Record a single observation."""
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts = self._counts.get(key)
+            if counts is None:
+                counts = self._counts[key] = [0] * (len(self.buckets) + 1)
+                self._sums[key] = 0.0
+            counts[index] += 1
+            self._sums[key] += value
+
+    def count(self, **labels: str) -> int:
+        """Return the number of observations for the given label values."""
+        return sum(self._counts.get(self._key(labels), ()))
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            snapshot = [(key, list(counts), self._sums[key]) for key, counts in self._counts.items()]
+        lines = []
+        for key, counts, total in sorted(snapshot):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(
+                    f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}"
+                )
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """Collection of named metrics rendered together at ``/metrics``."""
+
+    def __init__(self):
+        """Initialize an empty registry."""
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name: str, *args, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, *args, **kwargs)
+            elif not isinstance(metric, cls):
+                raise ValueError(f"Metric {name} already registered as {metric.type_name}")
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        """Return the counter called ``name``, creating it if needed."""
+        return self._get_or_create(Counter, name, documentation, labelnames)
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        """Return the gauge called ``name``, creating it if needed."""
+        return self._get_or_create(Gauge, name, documentation, labelnames)
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        """Return the histogram called ``name``, creating it if needed."""
+        return self._get_or_create(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def render(self) -> str:
+        """Render every registered metric in Prometheus text format (0.0.4)."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines: List[str] = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+STAGE_SECONDS = registry.histogram(
+    "medocr_stage_duration_seconds",
+    "Wall-clock duration of each pipeline stage",
+    ["stage"],
+)
+REQUEST_SECONDS = registry.histogram(
+    "medocr_request_duration_seconds",
+    "End-to-end duration of processing endpoints",
+    ["endpoint"],
+)
+CACHE_HITS = registry.counter(
+    "medocr_cache_hits_total",
+    "Cache lookups served without recomputation",
+    ["cache"],
+)
+CACHE_MISSES = registry.counter(
+    "medocr_cache_misses_total",
+    "Cache lookups that required recomputation",
+    ["cache"],
+)
+PROVIDER_RETRIES = registry.counter(
+    "medocr_provider_retries_total",
+    "Retries taken by provider clients before a response was returned",
+    ["provider"],
+)
+PROVIDER_REQUESTS = registry.counter(
+    "medocr_provider_requests_total",
+    "Requests sent to external providers",
+    ["provider", "outcome"],
+)
+TOKENS = registry.counter(
+    "medocr_tokens_total",
+    "Tokens reported by provider usage blocks",
+    ["provider", "direction"],
+)
+BYTES_SENT = registry.counter(
+    "medocr_bytes_sent_total",
+    "Approximate request payload bytes sent to external providers",
+    ["provider"],
+)
+AGENT_LLM_CALLS = registry.histogram(
+    "medocr_agent_llm_calls",
+    "LLM calls the extraction agent needed per form",
+    ["form_type"],
+    buckets=(1, 2, 3, 4, 5, 6),
+)
+LLM_MODEL_SECONDS = registry.histogram(
+    "medocr_llm_model_duration_seconds",
+    "Duration of LLM calls per model",
+    ["model"],
+)
+LLM_COST = registry.counter(
+    "medocr_llm_cost_total",
+    "Estimated LLM spend per model, in the units of LLM_MODEL_PRICES",
+    ["model"],
+)
+CASCADE_ESCALATIONS = registry.counter(
+    "medocr_llm_cascade_escalations_total",
+    "Extractions passed on to the next model in the cascade",
+    ["model", "reason"],
+)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+_current_timer: ContextVar[Optional["StageTimer"]] = ContextVar("stage_timer", default=None)
+
+
+class StageTimer:
+    """
+    Collect monotonic per-stage durations for a single request.
+
+    Each completed stage is also observed in :data:`STAGE_SECONDS`. Stages
+    that run more than once (e.g. OCR for several pages) accumulate.
+    """
+
+    def __init__(self):
+        """Initialize an empty timer."""
+        self.stages: Dict[str, float] = {}
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Time the enclosed block as stage ``name``."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def record(self, name: str, seconds: float) -> None:
+        """Record an externally measured stage duration."""
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+        STAGE_SECONDS.observe(seconds, stage=name)
+
+    def as_ms(self) -> Dict[str, float]:
+        """Return the stage breakdown in milliseconds."""
+        return {name: seconds * 1000 for name, seconds in self.stages.items()}
+
+    @contextmanager
+    def activate(self) -> Iterator["StageTimer"]:
+        """Make this the timer used by :func:`stage` within the current context."""
+        token = _current_timer.set(self)
+        try:
+            yield self
+        finally:
+            _current_timer.reset(token)
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """
+    Time a stage against the active request timer, if any.
+
+    Lets code below the route layer (connectors, parsers) contribute to the
+    request's breakdown without having the timer passed in explicitly.
+    """
+    timer = _current_timer.get()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        if timer is not None:
+            timer.record(name, elapsed)
+        else:
+            STAGE_SECONDS.observe(elapsed, stage=name)
+
+
+def _payload_bytes(messages: List[Dict[str, Any]]) -> int:
+    """Approximate request size from message text and image data URIs."""
+    total = 0
+    for message in messages:
+        content = message.get("content")
+        if isinstance(content, str):
+            total += len(content)
+            continue
+        for part in content or ():
+            if part.get("type") == "text":
+                total += len(part.get("text", ""))
+            elif part.get("type") == "image_url":
+                total += len(part.get("image_url", {}).get("url", ""))
+    return total
+
+
+def record_provider_call(
+    provider: str,
+    messages: List[Dict[str, Any]],
+    completion: Any,
+    retries: int,
+    outcome: str = "success",
+) -> None:
+    """
+    Record provider request metrics for a chat completion.
+
+    Args:
+        provider: Provider label (huggingface, moonshot)
+        messages: Messages that were sent
+        completion: Parsed completion, or None if the call failed
+        retries: Retries the client took before returning
+        outcome: success or error
+    """
+    PROVIDER_REQUESTS.inc(provider=provider, outcome=outcome)
+    payload_bytes = _payload_bytes(messages)
+    BYTES_SENT.inc(payload_bytes, provider=provider)
+    if retries:
+        PROVIDER_RETRIES.inc(retries, provider=provider)
+
+    span = current_span()
+    span.set_attributes({"payload.size_bytes": payload_bytes, "provider.retries": retries})
+    usage = getattr(completion, "usage", None)
+    if usage is not None:
+        TOKENS.inc(usage.prompt_tokens or 0, provider=provider, direction="in")
+        TOKENS.inc(usage.completion_tokens or 0, provider=provider, direction="out")
+        span.set_attributes(
+            {
+                "tokens.input": usage.prompt_tokens or 0,
+                "tokens.output": usage.completion_tokens or 0,
+            }
+        )
+
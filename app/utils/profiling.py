@@ -0,0 +1,112 @@
+"""Opt-in per-request profiling.
+
+With ``PROFILING_MODE=header`` a request carrying ``X-Profile: 1`` is
+profiled; with ``PROFILING_MODE=always`` every request is. Profiles are only
+written when the request takes at least ``PROFILING_SLOW_MS``.
+
+cProfile (the default) is not async-aware: while a request is profiled it
+also samples whatever else the event loop runs, so profiles are most useful
+under light load. pyinstrument, if installed, attributes time to the awaiting
+coroutine instead. Only one request is profiled at a time, and profiles are
+written on the I/O thread pool so the event loop never blocks on the dump.
+"""
+import cProfile
+import re
+import threading
+import time
+from pathlib import Path
+
+from fastapi import Request
+
+from app.utils.executors import executors
+
+PROFILE_HEADER = "x-profile"
+_SAFE_CHARS = re.compile(r"[^A-Za-z0-9_.-]+")
+
+
+class RequestProfiler:
+    """Decide which requests to profile and write profiles for slow ones."""
+
+    def __init__(
+        self,
+        mode: str = "off",
+        slow_ms: float = 1000.0,
+        output_dir: str = "logs/profiles",
+        profiler: str = "cprofile",
+    ):
+        """
+        Initialize the profiler.
+
+        Args:
+            mode: off, header or always
+            slow_ms: Minimum request duration for a profile to be kept
+            output_dir: Directory profiles are written to
+            profiler: cprofile or pyinstrument
+        """
+        if mode not in ("off", "header", "always"):
+            raise ValueError(f"Unknown profiling mode: {mode}")
+        if profiler not in ("cprofile", "pyinstrument"):
+            raise ValueError(f"Unknown profiler: {profiler}")
+        self.mode = mode
+        self.slow_ms = slow_ms
+        self.output_dir = Path(output_dir)
+        self.profiler = profiler
+        self._busy = threading.Lock()
+
+    def wants(self, request: Request) -> bool:
+        """Return True if this request should be profiled."""
+        if self.mode == "always":
+            return True
+        if self.mode == "header":
+            return request.headers.get(PROFILE_HEADER, "").lower() in ("1", "true", "yes")
+        return False
+
+    def _start(self):
+        if self.profiler == "pyinstrument":
+            from pyinstrument import Profiler
+
+            profiler = Profiler(async_mode="enabled")
+            profiler.start()
+            return profiler
+        profiler = cProfile.Profile()
+        profiler.enable()
+        return profiler
+
+    def _stop(self, profiler) -> None:
+        if self.profiler == "pyinstrument":
+            profiler.stop()
+        else:
+            profiler.disable()
+
+    def _write(self, profiler, name: str) -> Path:
+        """Render and write a stopped profile; blocking, so run it off the event loop."""
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        if self.profiler == "pyinstrument":
+            path = self.output_dir / f"{name}.html"
+            path.write_text(profiler.output_html(), encoding="utf-8")
+        else:
+            path = self.output_dir / f"{name}.prof"
+            profiler.dump_stats(str(path))
+        return path
+
+    async def __call__(self, request: Request, call_next):
+        """HTTP middleware entry point."""
+        if not self.wants(request) or not self._busy.acquire(blocking=False):
+            return await call_next(request)
+
+        try:
+            start = time.perf_counter()
+            profiler = self._start()
+            try:
+                response = await call_next(request)
+            finally:
+                elapsed_ms = (time.perf_counter() - start) * 1000
+                self._stop(profiler)
+            if elapsed_ms >= self.slow_ms:
+                stem = _SAFE_CHARS.sub("_", f"{request.method}_{request.url.path}").strip("_")
+                name = f"{time.strftime('%Y%m%dT%H%M%S')}_{stem}_{elapsed_ms:.0f}ms"
+                path = await executors.run_io(self._write, profiler, name)
+                response.headers["X-Profile-Path"] = str(path)
+            return response
+        finally:
+            self._busy.release()
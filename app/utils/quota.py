@@ -0,0 +1,283 @@
+"""Provider rate-limit budgets shared by every caller and worker.
+
+HuggingFace and Moonshot enforce requests-per-minute and tokens-per-minute
+limits per API key. Every provider call first reserves capacity here: one
+request plus an estimate of its tokens. Usage is tracked per key over a
+sliding window, stored in the shared state backend so all workers draw from
+one budget. After the response arrives, the estimate is corrected with the
+reported usage. Batch work may only use part of the budget, which leaves
+headroom for interactive requests.
+
+The window is approximated with fixed sub-window counters: the oldest
+counter is weighted by how much of it is still inside the window. This costs
+two increments and two multi-gets per reservation on any backend.
+"""
+import asyncio
+import hashlib
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+from app.config import settings
+from app.utils.admission import DEFAULT_LANE, current_lane
+from app.utils.executors import executors
+from app.utils.metrics import registry
+from app.utils.state import StateBackend, state_backend
+
+
+QUOTA_WAIT_SECONDS = registry.histogram(
+    "medocr_provider_quota_wait_seconds",
+    "Time provider calls waited for rate-limit budget",
+    ["provider"],
+)
+QUOTA_THROTTLES = registry.counter(
+    "medocr_provider_quota_throttles_total",
+    "Reservations deferred because the provider budget was used up",
+    ["provider", "lane"],
+)
+
+# Rough token cost of one image part; vision models bill images as tokens
+IMAGE_TOKEN_ESTIMATE = 1000
+# Completion tokens reserved up front; corrected from usage afterwards
+COMPLETION_TOKEN_ESTIMATE = 1024
+
+
+class ProviderQuotaExceededError(Exception):
+    """Raised when provider budget does not free up within the wait limit."""
+
+    def __init__(self, provider: str, retry_after: int):
+        super().__init__(f"Rate limit budget for {provider} exhausted")
+        self.provider = provider
+        self.retry_after = retry_after
+
+
+@dataclass
+class ProviderLimits:
+    """Per-key limits for one provider; 0 means unlimited."""
+
+    rpm: int = 0
+    tpm: int = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.rpm > 0 or self.tpm > 0
+
+
+def estimate_tokens(messages: List[Dict[str, Any]]) -> int:
+    """
+    Estimate prompt tokens before sending a request.
+
+    Text is counted at roughly four characters per token and each image part
+    at :data:`IMAGE_TOKEN_ESTIMATE`.
+    """
+    chars = 0
+    images = 0
+    for message in messages:
+        content = message.get("content")
+        if isinstance(content, str):
+            chars += len(content)
+            continue
+        for part in content or ():
+            if part.get("type") == "text":
+                chars += len(part.get("text", ""))
+            elif part.get("type") == "image_url":
+                images += 1
+    return chars // 4 + images * IMAGE_TOKEN_ESTIMATE + 4 * len(messages)
+
+
+def usage_tokens(completion: Any) -> Optional[int]:
+    """Return the total tokens a completion reports, or None if it has no usage."""
+    usage = getattr(completion, "usage", None)
+    if usage is None:
+        return None
+    return usage.total_tokens or (usage.prompt_tokens or 0) + (usage.completion_tokens or 0)
+
+
+class Reservation:
+    """Budget held for one provider call, corrected once usage is known."""
+
+    def __init__(self, manager: "QuotaManager", token_key: Optional[str], estimate: int):
+        self.manager = manager
+        self.token_key = token_key
+        self.estimate = estimate
+        self.settled = False
+
+    async def settle(self, actual_tokens: Optional[int]) -> None:
+        """
+        Replace the token estimate with the actual usage.
+
+        Args:
+            actual_tokens: Tokens reported by the provider, 0 if the call
+                failed before tokens were consumed, or None to keep the estimate
+        """
+        if self.settled or self.token_key is None:
+            return
+        self.settled = True
+        if actual_tokens is None or actual_tokens == self.estimate:
+            return
+        await executors.run_io(
+            self.manager.backend.incr,
+            self.token_key,
+            actual_tokens - self.estimate,
+            self.manager.ttl,
+        )
+
+
+class QuotaManager:
+    """Reserve provider capacity against shared sliding-window budgets."""
+
+    def __init__(
+        self,
+        backend: StateBackend,
+        limits: Dict[str, ProviderLimits],
+        window_seconds: float = 60.0,
+        bucket_seconds: float = 5.0,
+        target_ratio: float = 0.95,
+        batch_ratio: float = 0.8,
+        max_wait_seconds: float = 30.0,
+    ):
+        """
+        Initialize the manager.
+
+        Args:
+            backend: Shared state backend holding the counters
+            limits: Limits per provider name
+            window_seconds: Length of the rate-limit window
+            bucket_seconds: Resolution of the sliding window
+            target_ratio: Share of each limit interactive calls may use
+            batch_ratio: Share of each limit batch calls may use
+            max_wait_seconds: Longest a call waits for budget before failing
+        """
+        self.backend = backend
+        self.limits = limits
+        self.bucket_seconds = bucket_seconds
+        self.buckets = max(1, int(round(window_seconds / bucket_seconds)))
+        self.ttl = window_seconds + 2 * bucket_seconds
+        self.ratios = {DEFAULT_LANE: target_ratio, "batch": batch_ratio}
+        self.max_wait_seconds = max_wait_seconds
+
+    @staticmethod
+    def key_id(api_key: str) -> str:
+        """Identify an API key in state keys without storing the key itself."""
+        return hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:12]
+
+    def _key(self, provider: str, key_id: str, kind: str, bucket: int) -> str:
+        return f"quota:{provider}:{key_id}:{kind}:{bucket}"
+
+    def usage(self, provider: str, key_id: str, kind: str, now: Optional[float] = None) -> float:
+        """Return requests or tokens used over the sliding window ending at ``now``."""
+        now = time.time() if now is None else now
+        current = int(now // self.bucket_seconds)
+        keys = [
+            self._key(provider, key_id, kind, bucket)
+            for bucket in range(current - self.buckets, current + 1)
+        ]
+        values = self.backend.get_many(keys)
+        # The oldest bucket is only partly inside the window
+        overlap = 1.0 - (now % self.bucket_seconds) / self.bucket_seconds
+        total = float(values[0] or 0) * overlap
+        total += sum(float(value or 0) for value in values[1:])
+        return total
+
+    def try_reserve(
+        self,
+        provider: str,
+        key_id: str,
+        tokens: int,
+        lane: str = DEFAULT_LANE,
+        now: Optional[float] = None,
+    ) -> Optional[str]:
+        """
+        Reserve one request and ``tokens`` if the budget allows.
+
+        Counters are incremented first and rolled back on overrun, so
+        concurrent workers never both squeeze into the last slot.
+
+        Returns:
+            The token counter key holding the reservation, or None if the
+            caller must wait
+        """
+        limits = self.limits[provider]
+        ratio = self.ratios.get(lane, self.ratios[DEFAULT_LANE])
+        now = time.time() if now is None else now
+        bucket = int(now // self.bucket_seconds)
+        request_key = self._key(provider, key_id, "requests", bucket)
+        token_key = self._key(provider, key_id, "tokens", bucket)
+
+        self.backend.incr(request_key, 1, self.ttl)
+        self.backend.incr(token_key, tokens, self.ttl)
+        requests_used = self.usage(provider, key_id, "requests", now)
+        tokens_used = self.usage(provider, key_id, "tokens", now)
+
+        over_rpm = limits.rpm > 0 and requests_used > limits.rpm * ratio
+        # A single call larger than the budget is let through on an idle key
+        over_tpm = (
+            limits.tpm > 0
+            and tokens_used > limits.tpm * ratio
+            and tokens_used - tokens > 0
+        )
+        if over_rpm or over_tpm:
+            self.backend.incr(request_key, -1, self.ttl)
+            self.backend.incr(token_key, -tokens, self.ttl)
+            return None
+        return token_key
+
+    async def acquire(
+        self,
+        provider: str,
+        api_key: str,
+        tokens: int,
+        lane: Optional[str] = None,
+    ) -> Reservation:
+        """
+        Wait until the provider budget admits a call.
+
+        Args:
+            provider: Provider name
+            api_key: API key the call will use; budgets are per key
+            tokens: Estimated tokens for the call (prompt plus completion)
+            lane: Priority lane; defaults to the current request's lane
+
+        Returns:
+            Reservation to settle with the actual usage
+
+        Raises:
+            ProviderQuotaExceededError: If no budget frees up in time
+        """
+        limits = self.limits.get(provider)
+        if limits is None or not limits.enabled:
+            return Reservation(self, None, tokens)
+
+        lane = lane or current_lane()
+        key_id = self.key_id(api_key)
+        start = time.monotonic()
+        throttled = False
+        while True:
+            token_key = await executors.run_io(
+                self.try_reserve, provider, key_id, tokens, lane
+            )
+            if token_key is not None:
+                QUOTA_WAIT_SECONDS.observe(time.monotonic() - start, provider=provider)
+                return Reservation(self, token_key, tokens)
+
+            if not throttled:
+                QUOTA_THROTTLES.inc(provider=provider, lane=lane)
+                throttled = True
+            waited = time.monotonic() - start
+            if waited >= self.max_wait_seconds:
+                raise ProviderQuotaExceededError(provider, int(self.bucket_seconds) + 1)
+            # Budget frees up as the window slides past the next bucket boundary
+            delay = self.bucket_seconds - (time.time() % self.bucket_seconds)
+            await asyncio.sleep(min(delay + 0.01, self.max_wait_seconds - waited))
+
+
+quota = QuotaManager(
+    state_backend,
+    {
+        "huggingface": ProviderLimits(rpm=settings.hf_rpm, tpm=settings.hf_tpm),
+        "moonshot": ProviderLimits(rpm=settings.moonshot_rpm, tpm=settings.moonshot_tpm),
+    },
+    target_ratio=settings.quota_target_ratio,
+    batch_ratio=settings.quota_batch_ratio,
+    max_wait_seconds=settings.quota_max_wait_seconds,
+)
@@ -0,0 +1,94 @@
+"""ASGI middleware that caps request body size before parsing."""
+import json
+from typing import Sequence
+
+
+class RequestTooLargeError(Exception):
+    """Raised from ``receive`` once a streamed body passes the limit."""
+
+
+class RequestSizeLimitMiddleware:
+    """
+    Reject oversized request bodies with 413 as early as possible.
+
+    A declared ``Content-Length`` over the limit is rejected before any body
+    is read. Chunked bodies are counted as they stream in and the request is
+    aborted as soon as the limit is passed, so an oversized upload is never
+    fully spooled by the multipart parser.
+    """
+
+    def __init__(self, app, max_bytes: int, path_prefixes: Sequence[str] = ("/",)):
+        """
+        Initialize the middleware.
+
+        Args:
+            app: Wrapped ASGI application
+            max_bytes: Maximum accepted body size, including multipart framing
+            path_prefixes: Only requests under these paths are limited
+        """
+        self.app = app
+        self.max_bytes = max_bytes
+        self.path_prefixes = tuple(path_prefixes)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not scope["path"].startswith(self.path_prefixes):
+            await self.app(scope, receive, send)
+            return
+
+        for name, value in scope.get("headers", ()):
+            if name == b"content-length":
+                try:
+                    declared = int(value)
+                except ValueError:
+                    break
+                if declared > self.max_bytes:
+                    await self._reject(send)
+                    return
+                break
+
+        received = 0
+        exceeded = False
+        response_started = False
+
+        async def limited_receive():
+            nonlocal received, exceeded
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    exceeded = True
+                    raise RequestTooLargeError()
+            return message
+
+        async def guarded_send(message):
+            nonlocal response_started
+            # Whatever error the parser turned our abort into, answer 413
+            if exceeded:
+                if not response_started:
+                    response_started = True
+                    await self._reject(send)
+                return
+            response_started = True
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, guarded_send)
+        except RequestTooLargeError:
+            if not response_started:
+                await self._reject(send)
+
+    async def _reject(self, send) -> None:
+        body = json.dumps(
+            {"detail": f"Request body exceeds {self.max_bytes} bytes"}
+        ).encode("utf-8")
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 413,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode("ascii")),
+                ],
+            }
+        )
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,66 @@
+"""Cache of pipeline results keyed by document content."""
+import hashlib
+import json
+from typing import Any, Dict, Optional
+
+from app.utils.executors import executors
+from app.utils.metrics import CACHE_HITS, CACHE_MISSES
+from app.utils.state import StateBackend
+
+
+class ResultCache:
+    """
+    Store OCR and extraction results in the shared state backend.
+
+    Entries are keyed by the document's SHA-256 plus everything else that
+    changes the result (form type, models), so a re-uploaded document is
+    served from cache by whichever worker receives it.
+    """
+
+    def __init__(self, backend: StateBackend, ttl_seconds: float, name: str = "result"):
+        """
+        Initialize the cache.
+
+        Args:
+            backend: Shared state backend
+            ttl_seconds: Entry lifetime; 0 disables the cache
+            name: Cache name used in keys and metric labels
+        """
+        self.backend = backend
+        self.ttl_seconds = ttl_seconds
+        self.name = name
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl_seconds > 0
+
+    def key(self, document_sha256: str, *variant: str) -> str:
+        """Build the cache key for a document and the settings that shape its result."""
+        digest = hashlib.sha256("\x1f".join(variant).encode("utf-8")).hexdigest()[:16]
+        return f"{self.name}:{document_sha256}:{digest}"
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return the cached result, or None on a miss."""
+        if not self.enabled:
+            return None
+        raw = await executors.run_io(self.backend.get, key)
+        if raw is None:
+            CACHE_MISSES.inc(cache=self.name)
+            return None
+        CACHE_HITS.inc(cache=self.name)
+        return json.loads(raw)
+
+    async def peek(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return the cached result without recording a hit or miss (for polling)."""
+        if not self.enabled:
+            return None
+        raw = await executors.run_io(self.backend.get, key)
+        return None if raw is None else json.loads(raw)
+
+    async def set(self, key: str, value: Dict[str, Any]) -> None:
+        """Store a JSON-serialisable result."""
+        if not self.enabled:
+            return
+        await executors.run_io(
+            self.backend.set, key, json.dumps(value, default=str), self.ttl_seconds
+        )
@@ -0,0 +1,308 @@
+"""Columnar store of completed extractions for bulk analytics.
+
+Every completed extraction is flattened into one row of the ``forms`` table
+(one column per CMS-1500 field plus its confidence) and one row per service
+line in the ``service_lines`` table. Rows are buffered in memory and written
+as Parquet files partitioned by processing date::
+
+    data/results/forms/date=2026-10-19/part-<pid>-<id>.parquet
+    data/results/service_lines/date=2026-10-19/part-<pid>-<id>.parquet
+
+so a date-range export reads only the matching partitions and only the
+requested columns, instead of replaying full JSON responses. Writing and
+reading need ``pandas`` and ``pyarrow``; both are imported on first use.
+"""
+import asyncio
+import io
+import json
+import os
+import re
+import threading
+import uuid
+from datetime import date, datetime, time, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from app.agents import cms1500
+from app.agents.validators import is_empty
+from app.config import settings
+from app.utils.executors import executors
+
+TABLES = ("forms", "service_lines")
+FORMATS = {
+    "parquet": "application/vnd.apache.parquet",
+    "csv": "text/csv",
+    "jsonl": "application/x-ndjson",
+}
+
+# Columns every export includes, whatever the projection
+_KEY_COLUMNS = {
+    "forms": ["document_sha256", "processed_at"],
+    "service_lines": ["document_sha256", "processed_at", "line_number"],
+}
+_FORM_FIELDS = [name for name in cms1500.FIELD_LABELS if name != "service_lines"]
+_LIST_FIELDS = {"diagnosis_codes"}
+_NON_ALNUM = re.compile(r"[^0-9a-z]+")
+
+
+def _pandas():
+    try:
+        import pandas
+        import pyarrow  # noqa: F401  (Parquet engine)
+    except ImportError as e:
+        raise RuntimeError(
+            "The results store requires 'pandas' and 'pyarrow' (pip install pandas pyarrow)"
+        ) from e
+    return pandas
+
+
+def _text(value: Any) -> Optional[str]:
+    if is_empty(value):
+        return None
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, default=str)
+    return str(value)
+
+
+def _column(key: str) -> str:
+    return _NON_ALNUM.sub("_", str(key).lower()).strip("_") or "value"
+
+
+def flatten(
+    document_sha256: str,
+    form_type: str,
+    extraction: Dict[str, Any],
+    processed_at: datetime
+) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Flatten one extraction into ``forms`` and ``service_lines`` rows.
+
+    Catalogue fields become string columns (diagnosis codes a list of
+    strings), each with a ``confidence_<field>`` column; any other field
+    goes into the ``other_fields`` JSON column.
+
+    Args:
+        document_sha256: SHA-256 of the source document
+        form_type: Type of medical form
+        extraction: Extraction result (``fields``, ``confidence_scores``, ...)
+        processed_at: Completion time (UTC)
+
+    Returns:
+        Rows per table
+    """
+    fields = extraction.get("fields", {}) or {}
+    confidence = extraction.get("confidence_scores", {}) or {}
+    form: Dict[str, Any] = {
+        "document_sha256": document_sha256,
+        "processed_at": processed_at,
+        "form_type": form_type,
+        "model": extraction.get("model"),
+        "llm_calls": extraction.get("llm_calls"),
+    }
+    for name in _FORM_FIELDS:
+        value = fields.get(name)
+        if name in _LIST_FIELDS:
+            values = value if isinstance(value, list) else [value]
+            form[name] = [str(v) for v in values if not is_empty(v)]
+        else:
+            form[name] = _text(value)
+        form[f"confidence_{name}"] = confidence.get(name)
+    other = {k: v for k, v in fields.items() if k not in _FORM_FIELDS and k != "service_lines"}
+    form["other_fields"] = json.dumps(other, default=str) if other else None
+
+    lines = []
+    service_lines = fields.get("service_lines")
+    for number, line in enumerate(service_lines if isinstance(service_lines, list) else [], 1):
+        row: Dict[str, Any] = {
+            "document_sha256": document_sha256,
+            "processed_at": processed_at,
+            "line_number": number,
+        }
+        items = line.items() if isinstance(line, dict) else [("value", line)]
+        row.update({_column(key): _text(value) for key, value in items})
+        lines.append(row)
+    return {"forms": [form], "service_lines": lines}
+
+
+class ResultsStore:
+    """Buffered, date-partitioned Parquet tables of completed extractions."""
+
+    def __init__(self, directory: Path, flush_rows: int = 500, enabled: bool = True):
+        """
+        Initialize the store; nothing is written until the first flush.
+
+        Args:
+            directory: Root of the ``forms`` and ``service_lines`` tables
+            flush_rows: Buffered form rows that trigger a write
+            enabled: Record extractions at all
+        """
+        self.directory = Path(directory)
+        self.flush_rows = flush_rows
+        self.enabled = enabled
+        self._rows: Dict[str, List[Dict[str, Any]]] = {table: [] for table in TABLES}
+        self._lock = threading.Lock()
+
+    async def append(
+        self,
+        document_sha256: str,
+        form_type: str,
+        extraction: Dict[str, Any]
+    ) -> None:
+        """Buffer a completed extraction, writing the buffer once it is full."""
+        if not self.enabled:
+            return
+        rows = flatten(document_sha256, form_type, extraction, datetime.now(timezone.utc))
+        with self._lock:
+            for table in TABLES:
+                self._rows[table].extend(rows[table])
+            full = len(self._rows["forms"]) >= self.flush_rows
+        if full:
+            await executors.run_io(self.flush)
+
+    def flush(self) -> int:
+        """
+        Write buffered rows as new Parquet files and return how many form rows were written.
+
+        If ``pandas``/``pyarrow`` are missing, the store disables itself
+        rather than buffering without bound.
+        """
+        with self._lock:
+            rows, self._rows = self._rows, {table: [] for table in TABLES}
+        if not rows["forms"]:
+            return 0
+        try:
+            pd = _pandas()
+        except RuntimeError as e:
+            print(f"Results store disabled: {e}")
+            self.enabled = False
+            return 0
+
+        part = f"part-{os.getpid()}-{uuid.uuid4().hex[:12]}.parquet"
+        for table in TABLES:
+            if not rows[table]:
+                continue
+            frame = pd.DataFrame(rows[table])
+            for day, group in frame.groupby(frame["processed_at"].dt.date):
+                partition = self.directory / table / f"date={day.isoformat()}"
+                partition.mkdir(parents=True, exist_ok=True)
+                tmp = partition / f".{part}.tmp"
+                group.to_parquet(tmp, index=False)
+                os.replace(tmp, partition / part)
+        return len(rows["forms"])
+
+    async def run_flusher(self, interval: float) -> None:
+        """Flush every ``interval`` seconds until cancelled."""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await executors.run_io(self.flush)
+            except Exception as e:
+                print(f"Error flushing results store {self.directory}: {e}")
+
+    def _partitions(self, table: str, start: Optional[date], end: Optional[date]) -> List[Path]:
+        files = []
+        for partition in sorted((self.directory / table).glob("date=*")):
+            try:
+                day = date.fromisoformat(partition.name[len("date="):])
+            except ValueError:
+                continue
+            if (start is None or day >= start) and (end is None or day <= end):
+                files.extend(sorted(partition.glob("*.parquet")))
+        return files
+
+    def query(
+        self,
+        table: str = "forms",
+        fields: Optional[List[str]] = None,
+        start: Optional[date] = None,
+        end: Optional[date] = None
+    ):
+        """
+        Read stored rows, pruning partitions by date and columns by projection.
+
+        Args:
+            table: ``forms`` or ``service_lines``
+            fields: Columns to return (key columns are always included);
+                None returns every column
+            start: First processing date to include
+            end: Last processing date to include
+
+        Returns:
+            pandas DataFrame ordered by ``processed_at``
+
+        Raises:
+            ValueError: If the table is unknown
+            RuntimeError: If pandas/pyarrow are not installed
+        """
+        if table not in TABLES:
+            raise ValueError(f"Unknown table {table!r}; expected one of {', '.join(TABLES)}")
+        pd = _pandas()
+        import pyarrow.parquet as pq
+
+        columns = None
+        if fields:
+            columns = list(dict.fromkeys(_KEY_COLUMNS[table] + list(fields)))
+        frames = []
+        for path in self._partitions(table, start, end):
+            available = pq.read_schema(path).names
+            wanted = [c for c in columns if c in available] if columns else None
+            frames.append(pd.read_parquet(path, columns=wanted))
+        if not frames:
+            return pd.DataFrame(columns=columns or _KEY_COLUMNS[table])
+        frame = pd.concat(frames, ignore_index=True)
+        if columns:
+            frame = frame.reindex(columns=columns)
+        if start is not None:
+            frame = frame[frame["processed_at"] >= datetime.combine(start, time.min, timezone.utc)]
+        if end is not None:
+            frame = frame[frame["processed_at"] <= datetime.combine(end, time.max, timezone.utc)]
+        return frame.sort_values("processed_at", kind="stable").reset_index(drop=True)
+
+    def export(
+        self,
+        table: str = "forms",
+        fields: Optional[List[str]] = None,
+        start: Optional[date] = None,
+        end: Optional[date] = None,
+        fmt: str = "parquet"
+    ) -> bytes:
+        """
+        Flush this worker's buffer and serialise a query result.
+
+        Exports are eventually consistent across workers: rows another
+        worker has buffered are included once it flushes, at most
+        ``RESULTS_FLUSH_INTERVAL_SECONDS`` (or ``RESULTS_FLUSH_ROWS``
+        documents) later.
+
+        Args:
+            table: ``forms`` or ``service_lines``
+            fields: Columns to return; None returns every column
+            start: First processing date to include
+            end: Last processing date to include
+            fmt: ``parquet``, ``csv`` or ``jsonl``
+
+        Returns:
+            Encoded rows
+
+        Raises:
+            ValueError: If the table or format is unknown
+            RuntimeError: If pandas/pyarrow are not installed
+        """
+        if fmt not in FORMATS:
+            raise ValueError(f"Unknown format {fmt!r}; expected one of {', '.join(FORMATS)}")
+        self.flush()
+        frame = self.query(table, fields, start, end)
+        if fmt == "parquet":
+            buffer = io.BytesIO()
+            frame.to_parquet(buffer, index=False)
+            return buffer.getvalue()
+        if fmt == "csv":
+            return frame.to_csv(index=False).encode("utf-8")
+        return frame.to_json(orient="records", lines=True, date_format="iso").encode("utf-8")
+
+
+results_store = ResultsStore(
+    Path(settings.results_store_dir),
+    flush_rows=settings.results_flush_rows,
+    enabled=settings.results_store_enabled,
+)
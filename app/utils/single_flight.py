@@ -0,0 +1,150 @@
+"""Single-flight coalescing of identical in-flight work.
+
+Duplicate submissions and upstream retry storms send the same document
+several times within seconds, before its result reaches the result cache.
+:class:`SingleFlight` runs the work for a key once: concurrent callers in the
+same process await the leader's future, and callers in other workers wait on
+a lease in the shared state backend and pick the leader's result up from the
+result cache when it lands.
+"""
+import asyncio
+import os
+import uuid
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple, TypeVar
+
+from app.utils.executors import executors
+from app.utils.metrics import CACHE_HITS
+from app.utils.state import StateBackend
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """Run at most one computation per key at a time, sharing its result."""
+
+    def __init__(
+        self,
+        backend: Optional[StateBackend],
+        lease_seconds: float,
+        poll_interval: float = 0.25,
+        name: str = "inflight"
+    ):
+        """
+        Initialize the coalescer.
+
+        Args:
+            backend: Shared state backend for cross-worker leases; None
+                coalesces within this process only
+            lease_seconds: Lifetime of a cross-worker lease, after which a
+                crashed leader's key is taken over; a live leader renews it
+                every third of this period, so it may be shorter than the
+                slowest computation
+            poll_interval: Seconds between result checks while another
+                worker holds the lease
+            name: Prefix for lease keys and the metric label
+        """
+        self.backend = backend
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self.name = name
+        self._calls: Dict[str, "asyncio.Future[Any]"] = {}
+
+    async def run(
+        self,
+        key: str,
+        compute: Callable[[], Awaitable[T]],
+        lookup: Optional[Callable[[], Awaitable[Optional[T]]]] = None
+    ) -> Tuple[T, bool]:
+        """
+        Compute the value for ``key``, or join the computation already running.
+
+        A leader's exception is raised in every caller that joined it. If the
+        leader is cancelled, one of the waiting callers takes over.
+
+        Args:
+            key: Identity of the work (the result cache key)
+            compute: Coroutine function producing the value; it must publish
+                the value where ``lookup`` finds it before returning
+            lookup: Coroutine function returning the published value, or
+                None; enables cross-worker coalescing through the lease
+
+        Returns:
+            The value, and True if it was computed by another caller
+        """
+        while True:
+            future = self._calls.get(key)
+            if future is not None:
+                try:
+                    value = await asyncio.shield(future)
+                except asyncio.CancelledError:
+                    if future.cancelled():
+                        continue  # The leader was cancelled; take over
+                    raise
+                CACHE_HITS.inc(cache=self.name)
+                return value, True
+
+            future = asyncio.get_running_loop().create_future()
+            self._calls[key] = future
+            try:
+                value, shared = await self._lead(key, compute, lookup)
+            except asyncio.CancelledError:
+                future.cancel()
+                raise
+            except BaseException as e:
+                future.set_exception(e)
+                future.exception()  # Mark retrieved when nobody joined
+                raise
+            else:
+                future.set_result(value)
+                if shared:
+                    CACHE_HITS.inc(cache=self.name)
+                return value, shared
+            finally:
+                del self._calls[key]
+
+    async def _lead(
+        self,
+        key: str,
+        compute: Callable[[], Awaitable[T]],
+        lookup: Optional[Callable[[], Awaitable[Optional[T]]]]
+    ) -> Tuple[T, bool]:
+        """Compute under the cross-worker lease, or wait for the worker holding it."""
+        if self.backend is None or lookup is None:
+            return await compute(), False
+
+        lease_key = f"{self.name}:{key}"
+        token = f"{os.getpid()}:{uuid.uuid4().hex}"
+        while not await executors.run_io(
+            self.backend.set_if_absent, lease_key, token, self.lease_seconds
+        ):
+            value = await lookup()
+            if value is not None:
+                return value, True
+            await asyncio.sleep(self.poll_interval)
+
+        renewer = asyncio.create_task(self._renew(lease_key, token))
+        try:
+            # The previous holder may have published just before releasing
+            value = await lookup()
+            if value is not None:
+                return value, True
+            return await compute(), False
+        finally:
+            renewer.cancel()
+            # Only release our own lease; if it expired, another worker may hold it now
+            await executors.run_io(self.backend.delete_if_equal, lease_key, token)
+
+    async def _renew(self, lease_key: str, token: str) -> None:
+        """Keep the lease alive while the computation runs."""
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            try:
+                renewed = await executors.run_io(
+                    self.backend.expire_if_equal, lease_key, token, self.lease_seconds
+                )
+            except Exception as e:
+                print(f"Error renewing lease {lease_key}: {e}")
+                continue
+            if not renewed:
+                print(f"Lease {lease_key} was lost; another worker may duplicate this work")
+                return
@@ -0,0 +1,377 @@
+"""Shared state backends for running several worker processes.
+
+Caches, rate-limit budgets and dedup indexes that must be visible to every
+worker live behind :class:`StateBackend`. The in-memory backend is for a
+single process (and tests); the SQLite backend shares state between workers
+on one host through a WAL-mode database file; the Redis backend shares it
+between hosts or containers and needs the optional ``redis`` package.
+
+Values are strings (callers serialise to JSON); counters are floats.
+"""
+import asyncio
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from app.config import settings
+from app.utils.executors import executors
+
+
+class StateBackend:
+    """Key-value store with expiry and atomic counters."""
+
+    name = "base"
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the value for ``key``, or None if absent or expired."""
+        raise NotImplementedError
+
+    def get_many(self, keys: Sequence[str]) -> List[Optional[str]]:
+        """Return the values for ``keys`` in order."""
+        return [self.get(key) for key in keys]
+
+    def set(self, key: str, value: str, ttl: Optional[float] = None) -> None:
+        """Store ``value`` under ``key``, expiring after ``ttl`` seconds."""
+        raise NotImplementedError
+
+    def set_if_absent(self, key: str, value: str, ttl: Optional[float] = None) -> bool:
+        """Store ``value`` only if ``key`` is absent; return True if stored."""
+        raise NotImplementedError
+
+    def delete(self, key: str) -> None:
+        """Remove ``key`` if present."""
+        raise NotImplementedError
+
+    def delete_if_equal(self, key: str, value: str) -> bool:
+        """Atomically remove ``key`` only if it still holds ``value``; return True if removed."""
+        raise NotImplementedError
+
+    def expire_if_equal(self, key: str, value: str, ttl: float) -> bool:
+        """Atomically reset the expiry of ``key`` only if it still holds ``value``."""
+        raise NotImplementedError
+
+    def incr(self, key: str, amount: float = 1.0, ttl: Optional[float] = None) -> float:
+        """
+        Atomically add ``amount`` to a counter and return the new value.
+
+        ``ttl`` applies when the counter is created; it is not extended by
+        later increments.
+        """
+        raise NotImplementedError
+
+    def purge_expired(self) -> int:
+        """Delete expired entries and return how many were removed."""
+        return 0
+
+    def close(self) -> None:
+        """Release connections."""
+
+
+class MemoryStateBackend(StateBackend):
+    """Process-local backend; state is not shared between workers."""
+
+    name = "memory"
+
+    def __init__(self):
+        self._data: Dict[str, Tuple[str, Optional[float]]] = {}
+        self._lock = threading.Lock()
+
+    def _live(self, key: str, now: float) -> Optional[str]:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        value, expires = entry
+        if expires is not None and expires <= now:
+            del self._data[key]
+            return None
+        return value
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            return self._live(key, time.time())
+
+    def set(self, key: str, value: str, ttl: Optional[float] = None) -> None:
+        with self._lock:
+            self._data[key] = (value, time.time() + ttl if ttl else None)
+
+    def set_if_absent(self, key: str, value: str, ttl: Optional[float] = None) -> bool:
+        with self._lock:
+            now = time.time()
+            if self._live(key, now) is not None:
+                return False
+            self._data[key] = (value, now + ttl if ttl else None)
+            return True
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def delete_if_equal(self, key: str, value: str) -> bool:
+        with self._lock:
+            if self._live(key, time.time()) != value:
+                return False
+            del self._data[key]
+            return True
+
+    def expire_if_equal(self, key: str, value: str, ttl: float) -> bool:
+        with self._lock:
+            now = time.time()
+            if self._live(key, now) != value:
+                return False
+            self._data[key] = (value, now + ttl)
+            return True
+
+    def incr(self, key: str, amount: float = 1.0, ttl: Optional[float] = None) -> float:
+        with self._lock:
+            now = time.time()
+            current = self._live(key, now)
+            if current is None:
+                total = amount
+                expires = now + ttl if ttl else None
+            else:
+                total = float(current) + amount
+                expires = self._data[key][1]
+            self._data[key] = (repr(total), expires)
+            return total
+
+    def purge_expired(self) -> int:
+        with self._lock:
+            now = time.time()
+            expired = [
+                key for key, (_, expires) in self._data.items()
+                if expires is not None and expires <= now
+            ]
+            for key in expired:
+                del self._data[key]
+            return len(expired)
+
+
+class SQLiteStateBackend(StateBackend):
+    """
+    Backend stored in a SQLite database shared by workers on one host.
+
+    WAL mode lets readers proceed while a writer commits, and every mutation
+    is a single statement, so increments stay atomic across processes.
+    """
+
+    name = "sqlite"
+
+    def __init__(self, path: str):
+        """
+        Open (and create if needed) the state database.
+
+        Args:
+            path: Database file; its directory is created if missing
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        self._conn().execute(
+            "CREATE TABLE IF NOT EXISTS state ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires REAL)"
+        )
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> Optional[str]:
+        return self.get_many([key])[0]
+
+    def get_many(self, keys: Sequence[str]) -> List[Optional[str]]:
+        if not keys:
+            return []
+        placeholders = ",".join("?" * len(keys))
+        rows = self._conn().execute(
+            f"SELECT key, value FROM state WHERE key IN ({placeholders}) "
+            "AND (expires IS NULL OR expires > ?)",
+            (*keys, time.time()),
+        ).fetchall()
+        found = dict(rows)
+        return [found.get(key) for key in keys]
+
+    def set(self, key: str, value: str, ttl: Optional[float] = None) -> None:
+        self._conn().execute(
+            "INSERT OR REPLACE INTO state (key, value, expires) VALUES (?, ?, ?)",
+            (key, value, time.time() + ttl if ttl else None),
+        )
+
+    def set_if_absent(self, key: str, value: str, ttl: Optional[float] = None) -> bool:
+        now = time.time()
+        cursor = self._conn().execute(
+            "INSERT INTO state (key, value, expires) VALUES (?, ?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET value = excluded.value, expires = excluded.expires "
+            "WHERE state.expires IS NOT NULL AND state.expires <= ?",
+            (key, value, now + ttl if ttl else None, now),
+        )
+        return cursor.rowcount == 1
+
+    def delete(self, key: str) -> None:
+        self._conn().execute("DELETE FROM state WHERE key = ?", (key,))
+
+    def delete_if_equal(self, key: str, value: str) -> bool:
+        cursor = self._conn().execute(
+            "DELETE FROM state WHERE key = ? AND value = ? AND (expires IS NULL OR expires > ?)",
+            (key, value, time.time()),
+        )
+        return cursor.rowcount == 1
+
+    def expire_if_equal(self, key: str, value: str, ttl: float) -> bool:
+        now = time.time()
+        cursor = self._conn().execute(
+            "UPDATE state SET expires = ? "
+            "WHERE key = ? AND value = ? AND (expires IS NULL OR expires > ?)",
+            (now + ttl, key, value, now),
+        )
+        return cursor.rowcount == 1
+
+    def incr(self, key: str, amount: float = 1.0, ttl: Optional[float] = None) -> float:
+        now = time.time()
+        row = self._conn().execute(
+            "INSERT INTO state (key, value, expires) VALUES (?, ?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET "
+            "value = CASE WHEN state.expires IS NOT NULL AND state.expires <= ? "
+            "THEN excluded.value ELSE CAST(state.value AS REAL) + ? END, "
+            "expires = CASE WHEN state.expires IS NOT NULL AND state.expires <= ? "
+            "THEN excluded.expires ELSE state.expires END "
+            "RETURNING value",
+            (key, amount, now + ttl if ttl else None, now, amount, now),
+        ).fetchone()
+        return float(row[0])
+
+    def purge_expired(self) -> int:
+        cursor = self._conn().execute(
+            "DELETE FROM state WHERE expires IS NOT NULL AND expires <= ?", (time.time(),)
+        )
+        return cursor.rowcount
+
+    def close(self) -> None:
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+# Compare-and-act scripts, so a lease is only released or renewed by its holder
+_REDIS_DELETE_IF_EQUAL = """
+if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('del', KEYS[1]) end
+return 0
+"""
+_REDIS_EXPIRE_IF_EQUAL = """
+if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('pexpire', KEYS[1], ARGV[2]) end
+return 0
+"""
+
+
+class RedisStateBackend(StateBackend):
+    """Backend on a Redis-compatible server, shared across hosts."""
+
+    name = "redis"
+
+    def __init__(self, url: str, prefix: str = "medocr:"):
+        """
+        Connect to the server.
+
+        Args:
+            url: Redis URL, e.g. ``redis://localhost:6379/0``
+            prefix: Namespace prepended to every key
+        """
+        try:
+            import redis
+        except ImportError as e:
+            raise RuntimeError(
+                "STATE_BACKEND=redis requires the 'redis' package (pip install redis)"
+            ) from e
+        self.client = redis.Redis.from_url(url, decode_responses=True)
+        self.prefix = prefix
+        self._delete_if_equal = self.client.register_script(_REDIS_DELETE_IF_EQUAL)
+        self._expire_if_equal = self.client.register_script(_REDIS_EXPIRE_IF_EQUAL)
+
+    def _key(self, key: str) -> str:
+        return f"{self.prefix}{key}"
+
+    @staticmethod
+    def _px(ttl: Optional[float]) -> Optional[int]:
+        return max(1, int(ttl * 1000)) if ttl else None
+
+    def get(self, key: str) -> Optional[str]:
+        return self.client.get(self._key(key))
+
+    def get_many(self, keys: Sequence[str]) -> List[Optional[str]]:
+        if not keys:
+            return []
+        return self.client.mget([self._key(key) for key in keys])
+
+    def set(self, key: str, value: str, ttl: Optional[float] = None) -> None:
+        self.client.set(self._key(key), value, px=self._px(ttl))
+
+    def set_if_absent(self, key: str, value: str, ttl: Optional[float] = None) -> bool:
+        return bool(self.client.set(self._key(key), value, px=self._px(ttl), nx=True))
+
+    def delete(self, key: str) -> None:
+        self.client.delete(self._key(key))
+
+    def delete_if_equal(self, key: str, value: str) -> bool:
+        return bool(self._delete_if_equal(keys=[self._key(key)], args=[value]))
+
+    def expire_if_equal(self, key: str, value: str, ttl: float) -> bool:
+        return bool(self._expire_if_equal(keys=[self._key(key)], args=[value, self._px(ttl)]))
+
+    def incr(self, key: str, amount: float = 1.0, ttl: Optional[float] = None) -> float:
+        pipe = self.client.pipeline()
+        pipe.incrbyfloat(self._key(key), amount)
+        if ttl:
+            # NX keeps the expiry set when the counter was created
+            pipe.pexpire(self._key(key), self._px(ttl), nx=True)
+        return float(pipe.execute()[0])
+
+    def close(self) -> None:
+        self.client.close()
+
+
+def create_backend(kind: str, sqlite_path: str = "data/state.db", redis_url: str = "") -> StateBackend:
+    """
+    Build a state backend by name.
+
+    Args:
+        kind: ``memory``, ``sqlite`` or ``redis``
+        sqlite_path: Database file for the SQLite backend
+        redis_url: Server URL for the Redis backend
+
+    Returns:
+        The backend instance
+
+    Raises:
+        ValueError: If ``kind`` is unknown
+    """
+    if kind == "memory":
+        return MemoryStateBackend()
+    if kind == "sqlite":
+        return SQLiteStateBackend(sqlite_path)
+    if kind == "redis":
+        return RedisStateBackend(redis_url)
+    raise ValueError(f"Unknown state backend: {kind}")
+
+
+async def run_purger(backend: StateBackend, interval: float) -> None:
+    """Purge expired entries every ``interval`` seconds until cancelled."""
+    while True:
+        try:
+            await executors.run_io(backend.purge_expired)
+        except Exception as e:
+            print(f"Error purging {backend.name} state: {e}")
+        await asyncio.sleep(interval)
+
+
+state_backend = create_backend(
+    settings.state_backend,
+    sqlite_path=settings.state_sqlite_path,
+    redis_url=settings.state_redis_url,
+)
@@ -0,0 +1,474 @@
+"""Lightweight OpenTelemetry-compatible tracing.
+
+Spans carry W3C trace/span ids and are exported in the OTLP JSON shape, so
+they can be shipped to any OpenTelemetry collector. When tracing is disabled
+or a trace is not sampled, ``tracer.span()`` returns a shared no-op context
+and costs a single attribute check.
+"""
+import json
+import os
+import queue
+import random
+import sys
+import threading
+import time
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+
+def _new_trace_id() -> str:
+    return f"{random.getrandbits(128):032x}"
+
+
+def _new_span_id() -> str:
+    return f"{random.getrandbits(64):016x}"
+
+
+class Span:
+    """A single timed operation within a trace."""
+
+    is_recording = True
+
+    def __init__(
+        self,
+        name: str,
+        trace_id: str,
+        parent_id: Optional[str] = None,
+        attributes: Optional[Dict[str, Any]] = None,
+    ):
+        """
+        Initialize a started span.
+
+        Args:
+            name: Operation name
+            trace_id: 32-hex-digit trace id shared by the whole trace
+            parent_id: Span id of the parent span, if any
+            attributes: Initial span attributes
+        """
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = _new_span_id()
+        self.parent_id = parent_id
+        self.attributes: Dict[str, Any] = dict(attributes or {})
+        self.status = "OK"
+        self.status_message = ""
+        self.start_time_ns = time.time_ns()
+        self.end_time_ns: Optional[int] = None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        """Set a single attribute."""
+        self.attributes[key] = value
+
+    def set_attributes(self, attributes: Dict[str, Any]) -> None:
+        """Set several attributes at once."""
+        self.attributes.update(attributes)
+
+    def record_exception(self, exc: BaseException) -> None:
+        """Mark the span as failed with the given exception."""
+        self.status = "ERROR"
+        self.status_message = f"{type(exc).__name__}: {exc}"
+
+    @property
+    def duration_ms(self) -> float:
+        """Span duration in milliseconds (0 while still open)."""
+        if self.end_time_ns is None:
+            return 0.0
+        return (self.end_time_ns - self.start_time_ns) / 1e6
+
+    def traceparent(self) -> str:
+        """Return the W3C ``traceparent`` header value for this span."""
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Serialize in the OTLP JSON span shape."""
+        return {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "parentSpanId": self.parent_id or "",
+            "name": self.name,
+            "startTimeUnixNano": str(self.start_time_ns),
+            "endTimeUnixNano": str(self.end_time_ns or self.start_time_ns),
+            "attributes": [
+                {"key": key, "value": _otlp_value(value)} for key, value in self.attributes.items()
+            ],
+            "status": {
+                "code": 2 if self.status == "ERROR" else 1,
+                "message": self.status_message,
+            },
+        }
+
+
+class _NoopSpan:
+    """Span stand-in used when tracing is disabled or the trace is not sampled."""
+
+    is_recording = False
+    trace_id = ""
+    span_id = ""
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        pass
+
+    def set_attributes(self, attributes: Dict[str, Any]) -> None:
+        pass
+
+    def record_exception(self, exc: BaseException) -> None:
+        pass
+
+    def traceparent(self) -> str:
+        return ""
+
+
+NOOP_SPAN = _NoopSpan()
+
+_current_span: ContextVar[Optional[Any]] = ContextVar("current_span", default=None)
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    """Encode an attribute value as an OTLP ``AnyValue``."""
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def parse_traceparent(header: Optional[str]) -> Optional[Tuple[str, str, bool]]:
+    """
+    Parse a W3C ``traceparent`` header.
+
+    Returns:
+        (trace_id, parent_span_id, sampled) or None if the header is invalid
+    """
+    if not header:
+        return None
+    parts = header.strip().split("-")
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    try:
+        flags = int(parts[3], 16)
+        int(parts[1], 16)
+        int(parts[2], 16)
+    except ValueError:
+        return None
+    return parts[1], parts[2], bool(flags & 0x01)
+
+
+class SpanExporter:
+    """Base class for span exporters."""
+
+    def export(self, spans: List[Span]) -> None:
+        """Export a batch of finished spans."""
+        raise NotImplementedError
+
+    def shutdown(self) -> None:
+        """Release any resources held by the exporter."""
+
+
+class ConsoleSpanExporter(SpanExporter):
+    """Write one JSON object per span to a stream (stderr by default)."""
+
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stderr
+
+    def export(self, spans: List[Span]) -> None:
+        for span in spans:
+            self.stream.write(json.dumps(span.to_dict()) + "\n")
+        self.stream.flush()
+
+
+class FileSpanExporter(SpanExporter):
+    """Append spans as JSON lines to a file."""
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+    def export(self, spans: List[Span]) -> None:
+        with open(self.path, "a", encoding="utf-8") as f:
+            for span in spans:
+                f.write(json.dumps(span.to_dict()) + "\n")
+
+
+class OTLPHttpSpanExporter(SpanExporter):
+    """Send spans to an OpenTelemetry collector over OTLP/HTTP (JSON encoding)."""
+
+    def __init__(self, endpoint: str, service_name: str, timeout: float = 5.0):
+        import httpx
+
+        self.url = endpoint.rstrip("/") + "/v1/traces"
+        self.service_name = service_name
+        self.client = httpx.Client(timeout=timeout)
+
+    def export(self, spans: List[Span]) -> None:
+        payload = {
+            "resourceSpans": [
+                {
+                    "resource": {
+                        "attributes": [
+                            {"key": "service.name", "value": {"stringValue": self.service_name}}
+                        ]
+                    },
+                    "scopeSpans": [
+                        {"scope": {"name": "app"}, "spans": [span.to_dict() for span in spans]}
+                    ],
+                }
+            ]
+        }
+        try:
+            self.client.post(self.url, json=payload)
+        except Exception as e:
+            print(f"Error exporting {len(spans)} spans to {self.url}: {e}")
+
+    def shutdown(self) -> None:
+        self.client.close()
+
+
+class InMemorySpanExporter(SpanExporter):
+    """Keep finished spans in a list (used by tests)."""
+
+    def __init__(self):
+        self.spans: List[Span] = []
+
+    def export(self, spans: List[Span]) -> None:
+        self.spans.extend(spans)
+
+
+class BatchSpanProcessor:
+    """Hand finished spans to an exporter from a background thread."""
+
+    def __init__(
+        self,
+        exporter: SpanExporter,
+        max_queue_size: int = 2048,
+        max_batch_size: int = 256,
+        schedule_delay: float = 1.0,
+    ):
+        self.exporter = exporter
+        self.max_batch_size = max_batch_size
+        self.schedule_delay = schedule_delay
+        self.dropped = 0
+        self._queue: "queue.Queue[Optional[Span]]" = queue.Queue(max_queue_size)
+        self._thread = threading.Thread(target=self._worker, name="span-exporter", daemon=True)
+        self._thread.start()
+
+    def on_end(self, span: Span) -> None:
+        """Queue a finished span, dropping it if the queue is full."""
+        try:
+            self._queue.put_nowait(span)
+        except queue.Full:
+            self.dropped += 1
+
+    def _worker(self) -> None:
+        running = True
+        while running:
+            batch: List[Span] = []
+            try:
+                item = self._queue.get(timeout=self.schedule_delay)
+                while True:
+                    if item is None:
+                        running = False
+                        break
+                    batch.append(item)
+                    if len(batch) >= self.max_batch_size:
+                        break
+                    item = self._queue.get_nowait()
+            except queue.Empty:
+                pass
+            if batch:
+                try:
+                    self.exporter.export(batch)
+                except Exception as e:
+                    print(f"Error exporting spans: {e}")
+
+    def shutdown(self) -> None:
+        """Flush queued spans and stop the worker thread."""
+        self._queue.put(None)
+        self._thread.join(timeout=10)
+        self.exporter.shutdown()
+
+
+class SimpleSpanProcessor:
+    """Export each span synchronously as it ends (tests and debugging)."""
+
+    def __init__(self, exporter: SpanExporter):
+        self.exporter = exporter
+
+    def on_end(self, span: Span) -> None:
+        self.exporter.export([span])
+
+    def shutdown(self) -> None:
+        self.exporter.shutdown()
+
+
+class _SpanContext:
+    """Context manager that activates a recording span."""
+
+    __slots__ = ("tracer", "span", "token")
+
+    def __init__(self, tracer: "Tracer", span: Span):
+        self.tracer = tracer
+        self.span = span
+        self.token = None
+
+    def __enter__(self) -> Span:
+        self.token = _current_span.set(self.span)
+        return self.span
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc is not None:
+            self.span.record_exception(exc)
+        self.span.end_time_ns = time.time_ns()
+        _current_span.reset(self.token)
+        self.tracer._on_end(self.span)
+
+
+class _NoopContext:
+    """Shared context manager yielding the no-op span."""
+
+    __slots__ = ()
+
+    def __enter__(self) -> _NoopSpan:
+        return NOOP_SPAN
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        return None
+
+
+class _UnsampledRootContext:
+    """Marks the current context as belonging to an unsampled trace."""
+
+    __slots__ = ("token",)
+
+    def __enter__(self) -> _NoopSpan:
+        self.token = _current_span.set(NOOP_SPAN)
+        return NOOP_SPAN
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        _current_span.reset(self.token)
+
+
+_NOOP_CONTEXT = _NoopContext()
+
+
+class Tracer:
+    """
+    Create spans and route finished ones to the configured processor.
+
+    Sampling is decided once per trace at the root span (parent-based), so a
+    trace is always recorded or dropped as a whole.
+    """
+
+    def __init__(self):
+        """Initialize a disabled tracer."""
+        self.enabled = False
+        self.sample_ratio = 1.0
+        self.processor = None
+
+    def configure(self, processor, sample_ratio: float = 1.0) -> None:
+        """
+        Enable tracing.
+
+        Args:
+            processor: Span processor (BatchSpanProcessor or SimpleSpanProcessor)
+            sample_ratio: Fraction of root traces to record (0.0-1.0)
+        """
+        self.shutdown()
+        self.processor = processor
+        self.sample_ratio = max(0.0, min(1.0, sample_ratio))
+        self.enabled = True
+
+    def shutdown(self) -> None:
+        """Flush and disable tracing."""
+        self.enabled = False
+        if self.processor is not None:
+            self.processor.shutdown()
+            self.processor = None
+
+    def span(
+        self,
+        name: str,
+        attributes: Optional[Dict[str, Any]] = None,
+        traceparent: Optional[str] = None,
+    ):
+        """
+        Start a span as a context manager.
+
+        Args:
+            name: Operation name
+            attributes: Initial span attributes
+            traceparent: Incoming W3C traceparent header (root spans only)
+
+        Returns:
+            Context manager yielding the span (or the no-op span)
+        """
+        if not self.enabled:
+            return _NOOP_CONTEXT
+
+        parent = _current_span.get()
+        if parent is NOOP_SPAN:
+            return _NOOP_CONTEXT
+        if parent is not None:
+            return _SpanContext(self, Span(name, parent.trace_id, parent.span_id, attributes))
+
+        remote = parse_traceparent(traceparent)
+        if remote is not None:
+            trace_id, parent_id, sampled = remote
+        else:
+            trace_id, parent_id = _new_trace_id(), None
+            sampled = self.sample_ratio >= 1.0 or (
+                int(trace_id[-14:], 16) < self.sample_ratio * (1 << 56)
+            )
+        if not sampled:
+            return _UnsampledRootContext()
+        return _SpanContext(self, Span(name, trace_id, parent_id, attributes))
+
+    def _on_end(self, span: Span) -> None:
+        processor = self.processor
+        if processor is not None:
+            processor.on_end(span)
+
+
+def current_span():
+    """Return the active span, or the no-op span if there is none."""
+    return _current_span.get() or NOOP_SPAN
+
+
+def build_exporter(kind: str, file_path: str, otlp_endpoint: str, service_name: str) -> SpanExporter:
+    """
+    Create an exporter from its configured name.
+
+    Args:
+        kind: console, file or otlp
+        file_path: Output path for the file exporter
+        otlp_endpoint: Collector base URL for the OTLP exporter
+        service_name: service.name resource attribute for OTLP
+
+    Raises:
+        ValueError: If the exporter name is unknown
+    """
+    if kind == "console":
+        return ConsoleSpanExporter()
+    if kind == "file":
+        return FileSpanExporter(file_path)
+    if kind == "otlp":
+        return OTLPHttpSpanExporter(otlp_endpoint, service_name)
+    raise ValueError(f"Unknown tracing exporter: {kind}")
+
+
+def configure_from_settings(settings) -> None:
+    """Enable the global tracer if ``settings.tracing_enabled`` is set."""
+    if not settings.tracing_enabled:
+        return
+    exporter = build_exporter(
+        settings.tracing_exporter,
+        settings.tracing_file_path,
+        settings.tracing_otlp_endpoint,
+        os.environ.get("OTEL_SERVICE_NAME", "medical-ocr-api"),
+    )
+    tracer.configure(BatchSpanProcessor(exporter), settings.tracing_sample_ratio)
+
+
+tracer = Tracer()
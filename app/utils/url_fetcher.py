@@ -0,0 +1,384 @@
+"""Server-side download of documents submitted by URL."""
+import asyncio
+import hashlib
+import ipaddress
+import json
+import os
+import shutil
+import socket
+import time
+import uuid
+from contextlib import aclosing
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+from urllib.parse import urljoin, urlsplit
+
+from app.config import settings
+from app.utils.executors import executors
+from app.utils.file_handler import SavedUpload, UploadTooLargeError
+from app.utils.metrics import CACHE_HITS, CACHE_MISSES
+from app.utils.tracing import tracer
+
+
+class RemoteFetchError(Exception):
+    """Raised when a remote document cannot be downloaded."""
+
+
+# Leading bytes of each supported file type; the Content-Type header and
+# URL suffix are not trusted
+_SIGNATURES = {
+    b"%PDF-": "pdf",
+    b"\x89PNG\r\n\x1a\n": "png",
+    b"\xff\xd8\xff": "jpg",
+}
+
+
+_REDIRECT_STATUSES = {301, 302, 303, 307, 308}
+
+
+def sniff_extension(head: bytes) -> Optional[str]:
+    """Return the file extension matching the leading bytes, if supported."""
+    for signature, extension in _SIGNATURES.items():
+        if head.startswith(signature):
+            return extension
+    return None
+
+
+def _is_public(address: Union[ipaddress.IPv4Address, ipaddress.IPv6Address]) -> bool:
+    return address.is_global
+
+
+async def _resolve(host: str, port: int) -> List[str]:
+    """Resolve ``host`` to its IP addresses."""
+    infos = await asyncio.get_running_loop().getaddrinfo(host, port, type=socket.SOCK_STREAM)
+    return list(dict.fromkeys(info[4][0] for info in infos))
+
+
+async def public_addresses(host: str, port: int) -> List[str]:
+    """
+    Resolve ``host`` and return its addresses if every one of them is public.
+
+    Raises:
+        ValueError: If any address is private, loopback, link-local or reserved
+        socket.gaierror: If the host does not resolve
+    """
+    addresses = await _resolve(host, port)
+    if not all(_is_public(ipaddress.ip_address(a.split("%")[0])) for a in addresses):
+        raise ValueError(f"URL host {host} is not a public address")
+    return addresses
+
+
+class _PublicOnlyBackend:
+    """
+    httpcore network backend that connects only to public addresses.
+
+    The host is resolved here and the connection made to the checked
+    address, so a DNS answer that changes between the URL check and the
+    connect (DNS rebinding) cannot reach an internal service.
+    """
+
+    def __init__(self):
+        import httpcore
+
+        self._backend = httpcore.AnyIOBackend()
+
+    async def connect_tcp(self, host, port, timeout=None, local_address=None, socket_options=None):
+        import httpcore
+
+        try:
+            addresses = await public_addresses(host, port)
+        except socket.gaierror as e:
+            raise httpcore.ConnectError(f"Could not resolve {host}: {e}") from e
+        error: Optional[Exception] = None
+        for address in addresses:
+            try:
+                return await self._backend.connect_tcp(
+                    address, port, timeout=timeout,
+                    local_address=local_address, socket_options=socket_options,
+                )
+            except httpcore.ConnectError as e:
+                error = e
+        raise error
+
+    async def connect_unix_socket(self, path, timeout=None, socket_options=None):
+        raise ValueError("Unix sockets are not allowed")
+
+    async def sleep(self, seconds: float) -> None:
+        await self._backend.sleep(seconds)
+
+
+class URLFetcher:
+    """
+    Download documents over a pooled HTTP client with a conditional-GET cache.
+
+    Bodies are streamed to disk in chunks and hashed while streaming, and the
+    download is aborted as soon as it exceeds the size limit. Responses with
+    an ``ETag`` or ``Last-Modified`` header are kept in a local cache; a later
+    fetch of the same URL revalidates with ``If-None-Match`` /
+    ``If-Modified-Since`` and reuses the cached body on ``304 Not Modified``.
+    """
+
+    def __init__(
+        self,
+        cache_dir: Path,
+        max_bytes: int,
+        timeout: float,
+        max_connections: int = 20,
+        cache_max_bytes: int = 512 * 1024 * 1024,
+        allow_private: bool = False,
+        max_redirects: int = 5,
+    ):
+        """
+        Initialize the fetcher; the HTTP client is created on first use.
+
+        Args:
+            cache_dir: Directory for cached bodies and their validators
+            max_bytes: Largest document accepted
+            timeout: Connect/read timeout in seconds
+            max_connections: HTTP connection pool size
+            cache_max_bytes: Cache size above which the oldest entries are evicted
+            allow_private: Allow URLs resolving to private, loopback or
+                link-local addresses
+            max_redirects: Redirects followed before giving up; every hop
+                is checked like the original URL
+        """
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self.cache_max_bytes = cache_max_bytes
+        self.allow_private = allow_private
+        self.max_redirects = max_redirects
+        self._client = None
+
+    @property
+    def client(self):
+        """Pooled ``httpx.AsyncClient``, created (and ``httpx`` imported) on first use."""
+        if self._client is None:
+            import httpx
+
+            limits = httpx.Limits(max_connections=self.max_connections)
+            if self.allow_private:
+                transport = httpx.AsyncHTTPTransport(limits=limits)
+            else:
+                from app.utils.http_transport import BackendTransport
+
+                # Check the address actually connected to, not just the URL
+                transport = BackendTransport(_PublicOnlyBackend(), limits)
+            self._client = httpx.AsyncClient(
+                timeout=httpx.Timeout(self.timeout),
+                transport=transport,
+                follow_redirects=False,
+            )
+        return self._client
+
+    async def aclose(self) -> None:
+        """Close the HTTP connection pool if the client was created."""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def _cache_paths(self, url: str):
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        return self.cache_dir / f"{key}.body", self.cache_dir / f"{key}.json"
+
+    def _load_meta(self, url: str) -> Optional[Dict[str, Any]]:
+        body, meta = self._cache_paths(url)
+        try:
+            with open(meta, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return data if body.exists() and data.get("url") == url else None
+
+    def _store(self, url: str, source: Path, meta: Dict[str, Any]) -> None:
+        """Copy a downloaded body into the cache, then evict the oldest entries."""
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        body, meta_path = self._cache_paths(url)
+        suffix = f".{uuid.uuid4().hex}.tmp"
+        shutil.copyfile(source, str(body) + suffix)
+        os.replace(str(body) + suffix, body)
+        with open(str(meta_path) + suffix, "w", encoding="utf-8") as f:
+            json.dump({**meta, "url": url, "stored_at": time.time()}, f)
+        os.replace(str(meta_path) + suffix, meta_path)
+        self._evict()
+
+    def _discard(self, url: str) -> None:
+        for path in self._cache_paths(url):
+            path.unlink(missing_ok=True)
+
+    def _evict(self) -> None:
+        entries = []
+        for body in self.cache_dir.glob("*.body"):
+            try:
+                stat = body.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, body))
+        total = sum(size for _, size, _ in entries)
+        for _, size, body in sorted(entries):
+            if total <= self.cache_max_bytes:
+                break
+            body.unlink(missing_ok=True)
+            body.with_suffix(".json").unlink(missing_ok=True)
+            total -= size
+
+    async def _check_host(self, url: str) -> None:
+        parts = urlsplit(url)
+        if parts.scheme not in ("http", "https") or not parts.hostname:
+            raise ValueError("Only http(s) URLs are supported")
+        if self.allow_private:
+            return
+        try:
+            await public_addresses(
+                parts.hostname, parts.port or (443 if parts.scheme == "https" else 80)
+            )
+        except socket.gaierror as e:
+            raise RemoteFetchError(f"Could not resolve {parts.hostname}: {e}")
+
+    async def _open(self, url: str, headers: Dict[str, str]):
+        """
+        Send a streaming GET, following redirects by hand so every hop is checked.
+
+        Returns:
+            The final (non-redirect) response, still open
+
+        Raises:
+            ValueError: If a hop is not a public http(s) URL
+            RemoteFetchError: If there are more than ``max_redirects`` redirects
+        """
+        for _ in range(self.max_redirects + 1):
+            await self._check_host(url)
+            request = self.client.build_request("GET", url, headers=headers)
+            response = await self.client.send(request, stream=True)
+            location = response.headers.get("location")
+            if response.status_code not in _REDIRECT_STATUSES or not location:
+                return response
+            await response.aclose()
+            url = urljoin(str(response.url), location)
+        raise RemoteFetchError(f"Too many redirects (more than {self.max_redirects})")
+
+    async def fetch(self, url: str, dest_dir: Path) -> SavedUpload:
+        """
+        Download a PDF or image into ``dest_dir``.
+
+        Args:
+            url: http(s) URL of the document
+            dest_dir: Directory to write the document into (a request workspace)
+
+        Returns:
+            The saved document with its path, content hash and size
+
+        Raises:
+            ValueError: If the URL or the document type is not supported
+            UploadTooLargeError: If the document exceeds the size limit
+            RemoteFetchError: If the server cannot be reached or answers with an error
+        """
+        document = await self._fetch(url, dest_dir, revalidate=True)
+        if document is None:
+            document = await self._fetch(url, dest_dir, revalidate=False)
+        return document
+
+    async def _fetch(self, url: str, dest_dir: Path, revalidate: bool) -> Optional[SavedUpload]:
+        """
+        Download ``url`` once, revalidating a cached copy if ``revalidate`` is set.
+
+        Returns:
+            The saved document, or None if the server confirmed a cached body
+            that has since been evicted (the entry is dropped; fetch again
+            without revalidating)
+        """
+        import httpx
+
+        meta = await executors.run_io(self._load_meta, url) if revalidate else None
+        headers = {}
+        if meta is not None:
+            if meta.get("etag"):
+                headers["If-None-Match"] = meta["etag"]
+            if meta.get("last_modified"):
+                headers["If-Modified-Since"] = meta["last_modified"]
+
+        limit_mb = self.max_bytes // (1024 * 1024)
+        tmp_path = Path(dest_dir) / f"{uuid.uuid4().hex}.download"
+        with tracer.span("url.fetch", {"url.host": urlsplit(url).hostname}) as span:
+            try:
+                async with aclosing(await self._open(url, headers)) as response:
+                    span.set_attribute("http.status_code", response.status_code)
+                    if response.status_code == 304 and meta is not None:
+                        body, _ = self._cache_paths(url)
+                        path = Path(dest_dir) / f"{uuid.uuid4().hex}.{meta['extension']}"
+                        try:
+                            await executors.run_io(shutil.copyfile, body, path)
+                        except FileNotFoundError:
+                            # Evicted by a concurrent store since the metadata was read
+                            await executors.run_io(self._discard, url)
+                            return None
+                        CACHE_HITS.inc(cache="url")
+                        return SavedUpload(path, meta["sha256"], meta["size_bytes"], url)
+                    CACHE_MISSES.inc(cache="url")
+                    if response.status_code >= 400:
+                        raise RemoteFetchError(
+                            f"Fetching {url} failed with HTTP {response.status_code}"
+                        )
+                    length = response.headers.get("content-length")
+                    if length and length.isdigit() and int(length) > self.max_bytes:
+                        raise UploadTooLargeError(f"Remote document exceeds {limit_mb} MB limit")
+
+                    hasher = hashlib.sha256()
+                    size = 0
+                    head = b""
+                    with open(tmp_path, "wb") as f:
+                        async for chunk in response.aiter_bytes(settings.upload_chunk_size_kb * 1024):
+                            size += len(chunk)
+                            if size > self.max_bytes:
+                                raise UploadTooLargeError(
+                                    f"Remote document exceeds {limit_mb} MB limit"
+                                )
+                            if len(head) < 8:
+                                head += chunk[:8]
+                            hasher.update(chunk)
+                            f.write(chunk)
+                    etag = response.headers.get("etag")
+                    last_modified = response.headers.get("last-modified")
+                    no_store = "no-store" in response.headers.get("cache-control", "").lower()
+            except httpx.HTTPError as e:
+                tmp_path.unlink(missing_ok=True)
+                raise RemoteFetchError(f"Fetching {url} failed: {e}")
+            except BaseException:
+                tmp_path.unlink(missing_ok=True)
+                raise
+            span.set_attribute("file.size_bytes", size)
+
+        extension = sniff_extension(head)
+        if extension is None or extension not in settings.allowed_extensions:
+            tmp_path.unlink(missing_ok=True)
+            raise ValueError("Remote document is not a PDF, PNG or JPEG file")
+        path = tmp_path.with_suffix(f".{extension}")
+        tmp_path.rename(path)
+        document = SavedUpload(path, hasher.hexdigest(), size, url)
+
+        if (etag or last_modified) and not no_store:
+            await executors.run_io(
+                self._store,
+                url,
+                path,
+                {
+                    "etag": etag,
+                    "last_modified": last_modified,
+                    "extension": extension,
+                    "sha256": document.sha256,
+                    "size_bytes": size,
+                },
+            )
+        return document
+
+
+url_fetcher = URLFetcher(
+    Path(settings.url_cache_dir),
+    max_bytes=settings.url_fetch_max_mb * 1024 * 1024,
+    timeout=settings.url_fetch_timeout,
+    max_connections=settings.url_fetch_max_connections,
+    cache_max_bytes=settings.url_cache_max_mb * 1024 * 1024,
+    allow_private=settings.url_fetch_allow_private,
+    max_redirects=settings.url_fetch_max_redirects,
+)
@@ -0,0 +1,206 @@
+"""Per-request workspaces with guaranteed cleanup and a disk quota.
+
+Every artefact derived from a request (the upload, rendered pages, fetched
+documents) is written inside that request's workspace directory, which is
+removed when the request finishes -- successfully or not. A periodic sweeper
+removes anything left behind by crashed workers, and new workspaces are
+refused once the upload volume reaches its quota, so load is shed before the
+disk fills. The size of the upload directory is measured by the sweeper off
+the event loop and cached, so the quota check itself never walks the tree.
+"""
+import asyncio
+import shutil
+import time
+import uuid
+from pathlib import Path
+from typing import Optional
+
+from app.utils.executors import executors
+from app.utils.metrics import registry
+
+
+WORKSPACE_BYTES = registry.gauge(
+    "medocr_workspace_bytes",
+    "Bytes used under the upload directory at the last usage refresh",
+)
+WORKSPACES_SWEPT = registry.counter(
+    "medocr_workspaces_swept_total",
+    "Orphaned workspaces and files removed by the sweeper",
+)
+QUOTA_REJECTIONS = registry.counter(
+    "medocr_disk_quota_rejections_total",
+    "Requests refused because the upload volume was over quota",
+)
+
+WORKSPACE_PREFIX = "req-"
+
+
+class DiskQuotaExceededError(Exception):
+    """Raised when a workspace cannot be created without exceeding the disk quota."""
+
+
+def _tree_size(path: Path) -> int:
+    total = 0
+    for entry in path.rglob("*"):
+        try:
+            if entry.is_file():
+                total += entry.stat().st_size
+        except FileNotFoundError:
+            continue
+    return total
+
+
+def _remove(path: Path) -> None:
+    if path.is_dir():
+        shutil.rmtree(path, ignore_errors=True)
+    else:
+        path.unlink(missing_ok=True)
+
+
+class RequestWorkspace:
+    """
+    A directory owning every file derived from one request.
+
+    Use as a context manager (sync or async); the directory and everything in
+    it is removed on exit, including when the request fails.
+    """
+
+    def __init__(self, root: Path, name: Optional[str] = None):
+        """
+        Initialize the workspace (the directory is created on enter).
+
+        Args:
+            root: Parent directory (the upload directory)
+            name: Directory name; a unique ``req-<hex>`` name by default
+        """
+        self.path = Path(root) / (name or f"{WORKSPACE_PREFIX}{uuid.uuid4().hex}")
+
+    def file(self, name: str) -> Path:
+        """Return a path for ``name`` inside the workspace."""
+        return self.path / Path(name).name
+
+    def __enter__(self) -> "RequestWorkspace":
+        self.path.mkdir(parents=True, exist_ok=False)
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        _remove(self.path)
+
+    async def __aenter__(self) -> "RequestWorkspace":
+        return self.__enter__()
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        await executors.run_io(_remove, self.path)
+
+
+class WorkspaceManager:
+    """Create request workspaces under a quota and sweep orphans."""
+
+    def __init__(
+        self,
+        root: Path,
+        ttl_seconds: float = 3600,
+        quota_mb: float = 2048,
+        min_free_mb: float = 512,
+    ):
+        """
+        Initialize the manager.
+
+        Args:
+            root: Upload directory that holds all workspaces
+            ttl_seconds: Age after which leftover workspaces are swept
+            quota_mb: Maximum total size of the upload directory
+            min_free_mb: Minimum free space to keep on the volume
+        """
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.ttl_seconds = ttl_seconds
+        self.quota_bytes = int(quota_mb * 1024 * 1024)
+        self.min_free_bytes = int(min_free_mb * 1024 * 1024)
+        self._usage: Optional[int] = None
+
+    def refresh_usage(self) -> int:
+        """
+        Walk the upload directory and cache its size.
+
+        This is a full directory walk; call it through ``executors.run_io``.
+
+        Returns:
+            Bytes used under the upload directory
+        """
+        used = _tree_size(self.root)
+        self._usage = used
+        WORKSPACE_BYTES.set(used)
+        return used
+
+    def usage_bytes(self) -> int:
+        """
+        Return the bytes used under the upload directory at the last refresh.
+
+        Only the first call before the sweeper has run walks the tree itself.
+        """
+        if self._usage is None:
+            return self.refresh_usage()
+        return self._usage
+
+    def check_quota(self) -> None:
+        """
+        Refuse new work if the upload directory or the volume is too full.
+
+        Raises:
+            DiskQuotaExceededError: If the quota or the free-space floor is hit
+        """
+        free = shutil.disk_usage(self.root).free
+        if free < self.min_free_bytes:
+            QUOTA_REJECTIONS.inc()
+            raise DiskQuotaExceededError(
+                f"Only {free // (1024 * 1024)} MB free on the upload volume"
+            )
+        if self.usage_bytes() >= self.quota_bytes:
+            QUOTA_REJECTIONS.inc()
+            raise DiskQuotaExceededError("Upload storage quota exceeded")
+
+    def workspace(self) -> RequestWorkspace:
+        """
+        Create a workspace after checking the quota.
+
+        Raises:
+            DiskQuotaExceededError: If there is no room for new work
+        """
+        self.check_quota()
+        return RequestWorkspace(self.root)
+
+    def sweep(self, now: Optional[float] = None) -> int:
+        """
+        Remove workspaces and stray files older than the TTL, then refresh
+        the cached usage figure.
+
+        Hidden files (such as ``.gitkeep``) are left alone.
+
+        Returns:
+            Number of entries removed
+        """
+        cutoff = (now or time.time()) - self.ttl_seconds
+        removed = 0
+        for entry in self.root.iterdir():
+            if entry.name.startswith("."):
+                continue
+            try:
+                if entry.stat().st_mtime < cutoff:
+                    _remove(entry)
+                    removed += 1
+            except FileNotFoundError:
+                continue
+        if removed:
+            WORKSPACES_SWEPT.inc(removed)
+        self.refresh_usage()
+        return removed
+
+    async def run_sweeper(self, interval: float) -> None:
+        """Sweep every ``interval`` seconds until cancelled."""
+        while True:
+            try:
+                await executors.run_io(self.sweep)
+            except Exception as e:
+                print(f"Error sweeping {self.root}: {e}")
+            await asyncio.sleep(interval)
@@ -0,0 +1,94 @@
+"""Pareto dashboard for evaluation reports from ``benchmarks.evaluate``.
+
+    streamlit run benchmarks/dashboard.py -- eval.json
+
+Plots every variant's accuracy against a chosen cost (latency, tokens or
+bytes sent), highlights the Pareto front, and lists per-field accuracy so
+the fields a cheaper configuration loses are visible.
+"""
+import json
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import pandas as pd  # noqa: E402
+import plotly.express as px  # noqa: E402
+import streamlit as st  # noqa: E402
+
+from benchmarks.evaluate import pareto_front  # noqa: E402
+
+ACCURACY = {"F1": "f1", "Exact match": "exact_match", "CER (lower is better)": "cer"}
+COST = {
+    "Latency p50 (ms)": "latency_p50_ms",
+    "Tokens per form": "tokens",
+    "Bytes sent per form": "bytes_sent",
+}
+
+
+def main():
+    """Render the dashboard for the report named on the command line."""
+    st.set_page_config(page_title="Accuracy vs throughput", layout="wide")
+    st.title("Accuracy vs throughput")
+
+    default = sys.argv[1] if len(sys.argv) > 1 else "eval.json"
+    path = Path(st.sidebar.text_input("Report", default))
+    if not path.is_file():
+        st.error(f"No report at {path}; run python -m benchmarks.evaluate --output {path}")
+        return
+    report = json.loads(path.read_text(encoding="utf-8"))
+    variants = report["variants"]
+    st.caption(
+        f"commit {report.get('git_commit') or 'unknown'} - {report.get('started_at', '')}"
+        + ("" if report.get("poppler", True) else " - synthetic pages (poppler not installed)")
+    )
+
+    accuracy = ACCURACY[st.sidebar.selectbox("Accuracy", list(ACCURACY))]
+    cost = COST[st.sidebar.selectbox("Cost", list(COST))]
+    front = pareto_front(variants, cost, accuracy, higher_is_better=accuracy != "cer")
+
+    frame = pd.DataFrame(
+        {
+            "variant": v["variant"],
+            "responses": v["responses"],
+            "pareto": v["variant"] in front,
+            **{key: v[key] for key in (*ACCURACY.values(), *COST.values())},
+            "latency_p95_ms": v["latency_p95_ms"],
+            "errors": v["errors"],
+        }
+        for v in variants
+    )
+    figure = px.scatter(
+        frame,
+        x=cost,
+        y=accuracy,
+        color="pareto",
+        symbol="responses",
+        text="variant",
+        hover_data=["latency_p95_ms", "errors"],
+    )
+    figure.add_scatter(
+        x=frame.set_index("variant").loc[front, cost],
+        y=frame.set_index("variant").loc[front, accuracy],
+        mode="lines",
+        line={"dash": "dot"},
+        name="Pareto front",
+    )
+    figure.update_traces(textposition="top center", selector={"mode": "markers+text"})
+    st.plotly_chart(figure, use_container_width=True)
+    if any(v["responses"] == "fixtures" for v in variants):
+        st.info(
+            "Variants marked 'fixtures' replayed the shared recorded responses, so their "
+            "accuracy only reflects local processing. Record them with --record to score "
+            "what the providers return for each configuration."
+        )
+
+    st.subheader("Variants")
+    st.dataframe(frame.sort_values(cost), use_container_width=True, hide_index=True)
+
+    st.subheader("Exact match by field")
+    fields = pd.DataFrame({v["variant"]: v["field_exact_match"] for v in variants})
+    st.dataframe(fields, use_container_width=True)
+
+
+main()
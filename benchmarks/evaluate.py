@@ -0,0 +1,613 @@
+"""Accuracy-versus-throughput evaluation of pipeline configurations.
+
+Runs the labelled sample forms in ``benchmarks/labels`` through the real
+pipeline once per variant, against the mock provider, and reports
+field-level accuracy (exact match, character error rate, F1) next to
+latency, tokens and bytes sent, plus the variants on the Pareto front of
+accuracy against each cost.
+
+    python -m benchmarks.evaluate --variants benchmarks/variants.json --output eval.json
+    streamlit run benchmarks/dashboard.py -- eval.json
+
+A variant overrides any ``Settings`` field (``pdf_dpi``, ``llm_model``,
+``extraction_mode``, ...) and can re-encode page images as JPEG or compact
+whitespace in the OCR text sent to the LLM -- two knobs the pipeline does not
+have yet, so their accuracy cost can be measured before they are adopted.
+
+The mock replays recorded responses, so by default every variant sees the
+same provider answers and only local steps (parsing, code correction, merging)
+can change accuracy. ``--record`` runs the variants against the configured
+live providers instead and saves their responses under
+``benchmarks/recordings/<variant>/``; later runs replay those, so each
+variant is scored on what the providers actually returned for it.
+"""
+import argparse
+import asyncio
+import base64
+import hashlib
+import io
+import json
+import os
+import re
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from collections import Counter
+from contextlib import AsyncExitStack, asynccontextmanager
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+from unittest import mock
+
+os.environ.setdefault("HF_TOKEN", "benchmark")
+os.environ.setdefault("MOONSHOT_API_KEY", "benchmark")
+
+import editdistance  # noqa: E402
+from PIL import Image  # noqa: E402
+
+from app import pipeline  # noqa: E402
+from app.agents.chunking import PAGE_BREAK  # noqa: E402
+from app.agents.validators import is_empty, normalise, parse_date, parse_money  # noqa: E402
+from app.config import settings  # noqa: E402
+from app.connectors import llm_connector as llm_module  # noqa: E402
+from app.connectors import ocr_connector as ocr_module  # noqa: E402
+from app.utils.metrics import BYTES_SENT, StageTimer  # noqa: E402
+from app.utils.quota import estimate_tokens  # noqa: E402
+from app.utils.state import MemoryStateBackend  # noqa: E402
+from benchmarks.micro import synthetic_page  # noqa: E402
+from benchmarks.mock_provider import MockProviderServer, load_fixtures  # noqa: E402
+from benchmarks.run_load import REPO_ROOT, _git_commit, percentile  # noqa: E402
+
+
+LABEL_DIR = Path(__file__).parent / "labels"
+RECORDING_DIR = Path(__file__).parent / "recordings"
+DEFAULT_VARIANTS = Path(__file__).parent / "variants.json"
+
+ACCURACY_METRICS = ("f1", "exact_match", "cer")
+COST_AXES = ("latency_p50_ms", "tokens", "bytes_sent")
+# Keys whose values are compared as dates or amounts rather than as text
+DATE_KEYS = {"patient_dob", "date_of_service"}
+MONEY_KEYS = {"total_charge", "amount_paid", "charges"}
+IMAGE_FORMATS = ("png", "jpeg")
+
+_VARIANT_NAME = re.compile(r"^[\w.-]+$")
+_SPACES = re.compile(r"[ \t]+")
+_BLANK_LINES = re.compile(r"[ \t]*\n[ \t\n]*")
+
+
+@dataclass
+class LabelledForm:
+    """Ground-truth fields for one sample document."""
+
+    name: str
+    source: Path
+    form_type: str
+    fields: Dict[str, Any]
+
+
+@dataclass
+class Variant:
+    """One pipeline configuration to evaluate."""
+
+    name: str
+    settings: Dict[str, Any] = field(default_factory=dict)
+    image_format: str = "png"
+    jpeg_quality: int = 85
+    compact_prompt: bool = False
+
+
+def load_labels(label_dir: Path = LABEL_DIR) -> List[LabelledForm]:
+    """Load every ``*.json`` label file in ``label_dir`` (sorted by name)."""
+    forms = []
+    for path in sorted(label_dir.glob("*.json")):
+        data = json.loads(path.read_text(encoding="utf-8"))
+        forms.append(
+            LabelledForm(
+                name=path.stem,
+                source=REPO_ROOT / data["source"],
+                form_type=data.get("form_type", "CMS-1500"),
+                fields=data["fields"],
+            )
+        )
+    if not forms:
+        raise FileNotFoundError(f"No labels found in {label_dir}")
+    return forms
+
+
+def load_variants(path: Path = DEFAULT_VARIANTS) -> List[Variant]:
+    """
+    Load variants from a JSON list of objects.
+
+    Args:
+        path: JSON file; each object has a ``name`` plus optional ``settings``,
+            ``image_format``, ``jpeg_quality`` and ``compact_prompt``
+
+    Returns:
+        Variants in file order
+
+    Raises:
+        ValueError: If a name is reused or unsafe as a directory name, a
+            setting does not exist, or the image format is unknown
+    """
+    variants = [Variant(**entry) for entry in json.loads(Path(path).read_text(encoding="utf-8"))]
+    names = [variant.name for variant in variants]
+    for variant in variants:
+        if not _VARIANT_NAME.match(variant.name) or names.count(variant.name) > 1:
+            raise ValueError(f"Variant names must be unique and [A-Za-z0-9_.-]: {variant.name!r}")
+        unknown = [key for key in variant.settings if key not in type(settings).model_fields]
+        if unknown:
+            raise ValueError(f"Variant {variant.name!r} sets unknown settings: {', '.join(unknown)}")
+        if variant.image_format not in IMAGE_FORMATS:
+            raise ValueError(
+                f"Variant {variant.name!r}: image_format must be one of {', '.join(IMAGE_FORMATS)}"
+            )
+    return variants
+
+
+def canonical(key: str, value: Any) -> str:
+    """Comparable spelling of one value: ISO dates, two-decimal amounts, normalised text."""
+    if key in DATE_KEYS:
+        parsed = parse_date(value)
+        if parsed is not None:
+            return parsed.isoformat()
+    if key in MONEY_KEYS:
+        amount = parse_money(value)
+        if amount is not None:
+            return f"{amount:.2f}"
+    return normalise(str(value))
+
+
+def field_items(name: str, value: Any) -> List[Tuple[str, str]]:
+    """
+    Flatten a field into ``(path, canonical value)`` items, in form order.
+
+    Scalars in a list share the list's path (diagnosis codes compare as a
+    multiset); dicts in a list are numbered (``service_lines.0.charges``).
+    """
+    items: List[Tuple[str, str]] = []
+
+    def walk(path: str, key: str, item: Any) -> None:
+        if isinstance(item, dict):
+            for sub_key, sub_item in item.items():
+                sub_key = str(sub_key).strip().lower()
+                walk(f"{path}.{sub_key}", sub_key, sub_item)
+        elif isinstance(item, list):
+            for index, sub_item in enumerate(item):
+                walk(f"{path}.{index}" if isinstance(sub_item, dict) else path, key, sub_item)
+        elif not is_empty(item):
+            items.append((path, canonical(key, item)))
+
+    walk(name, name, value)
+    return items
+
+
+def score_document(predicted: Dict[str, Any], truth: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Score extracted fields against the labels of one form.
+
+    Only labelled fields are scored. A field is an exact match when its
+    flattened items equal the label's (a field labelled null matches only
+    an empty prediction). CER is the edit distance between the predicted and
+    true values, joined in sorted order, divided by the length of the truth;
+    it is averaged over fields the form actually fills. F1 counts flattened
+    items, so each diagnosis code and service-line cell is one decision.
+
+    Args:
+        predicted: Extracted fields
+        truth: Labelled fields
+
+    Returns:
+        ``exact_match``, ``cer``, ``f1``, the item counts ``tp``/``fp``/``fn``
+        and per-field ``fields`` results
+    """
+    tp = fp = fn = 0
+    fields: Dict[str, Dict[str, Any]] = {}
+    for name, expected in truth.items():
+        want = field_items(name, expected)
+        got = field_items(name, predicted.get(name))
+        matched = sum((Counter(want) & Counter(got)).values())
+        tp += matched
+        fp += len(got) - matched
+        fn += len(want) - matched
+        result: Dict[str, Any] = {"exact": Counter(want) == Counter(got), "cer": None}
+        if want:
+            true_text = " | ".join(value for _, value in sorted(want))
+            predicted_text = " | ".join(value for _, value in sorted(got))
+            result["cer"] = editdistance.eval(predicted_text, true_text) / len(true_text)
+        fields[name] = result
+
+    cers = [result["cer"] for result in fields.values() if result["cer"] is not None]
+    return {
+        "exact_match": sum(r["exact"] for r in fields.values()) / len(fields) if fields else 1.0,
+        "cer": statistics.mean(cers) if cers else 0.0,
+        "f1": f1_score(tp, fp, fn),
+        "tp": tp,
+        "fp": fp,
+        "fn": fn,
+        "fields": fields,
+    }
+
+
+def f1_score(tp: int, fp: int, fn: int) -> float:
+    """F1 from item counts (1.0 when there was nothing to find and nothing was found)."""
+    if tp + fp + fn == 0:
+        return 1.0
+    return 2 * tp / (2 * tp + fp + fn)
+
+
+def pareto_front(
+    points: List[Dict[str, Any]],
+    cost: str,
+    accuracy: str = "f1",
+    higher_is_better: bool = True
+) -> List[str]:
+    """
+    Return the variants no other variant beats on both cost and accuracy.
+
+    Args:
+        points: Variant summaries with ``variant``, ``cost`` and ``accuracy`` keys
+        cost: Key to minimise
+        accuracy: Key to maximise (minimise if ``higher_is_better`` is False, e.g. CER)
+        higher_is_better: Direction of ``accuracy``
+
+    Returns:
+        Names of the non-dominated variants, cheapest first
+    """
+    sign = 1 if higher_is_better else -1
+
+    def dominates(a: Dict[str, Any], b: Dict[str, Any]) -> bool:
+        better_or_equal = a[cost] <= b[cost] and sign * a[accuracy] >= sign * b[accuracy]
+        strictly = a[cost] < b[cost] or sign * a[accuracy] > sign * b[accuracy]
+        return better_or_equal and strictly
+
+    front = [p for p in points if not any(dominates(q, p) for q in points)]
+    return [p["variant"] for p in sorted(front, key=lambda p: (p[cost], -sign * p[accuracy]))]
+
+
+def compact_text(text: str) -> str:
+    """Collapse runs of spaces and drop blank lines and line padding."""
+    return _BLANK_LINES.sub("\n", _SPACES.sub(" ", text)).strip()
+
+
+def jpeg_data_uri(image_path: str, quality: int) -> str:
+    """Re-encode a page image as JPEG and return it as a base64 data URI."""
+    with Image.open(image_path) as image:
+        buffer = io.BytesIO()
+        image.convert("RGB").save(buffer, "JPEG", quality=quality, optimize=True)
+    return f"data:image/jpeg;base64,{base64.b64encode(buffer.getvalue()).decode('ascii')}"
+
+
+class Meter:
+    """Tally tokens and bytes of every provider call made through the connectors."""
+
+    def __init__(self):
+        self.totals: Counter = Counter()
+
+    def wrap(self, record_provider_call):
+        """Wrap a connector's ``record_provider_call`` so its calls are also tallied."""
+        def record(provider, messages, completion, retries, outcome="success"):
+            before = BYTES_SENT.get(provider=provider)
+            record_provider_call(provider, messages, completion, retries, outcome)
+            self.totals["bytes_sent"] += BYTES_SENT.get(provider=provider) - before
+            # Prompt tokens are estimated from what was actually sent, so
+            # prompt changes register even when responses are replayed
+            self.totals["tokens_in"] += estimate_tokens(messages)
+            usage = getattr(completion, "usage", None)
+            self.totals["tokens_out"] += (getattr(usage, "completion_tokens", 0) or 0) if usage else 0
+            self.totals["provider_calls"] += 1
+
+        return record
+
+    def take(self) -> Dict[str, int]:
+        """Return the tallies since the last call and reset them."""
+        totals, self.totals = dict(self.totals), Counter()
+        return totals
+
+
+@asynccontextmanager
+async def applied(
+    variant: Variant,
+    meter: Meter,
+    provider_bases: Optional[Tuple[str, str]] = None
+) -> AsyncIterator[None]:
+    """
+    Patch settings, connectors and file handling for ``variant``.
+
+    Caches and the results store are disabled so every run reaches the
+    providers, and provider calls are tallied on ``meter``.
+
+    Args:
+        variant: Configuration to apply
+        meter: Tally for provider calls
+        provider_bases: ``(hf_api_base, moonshot_api_base)`` to point the
+            connectors at; None keeps the configured providers
+    """
+    async with AsyncExitStack() as stack:
+        overrides = dict(variant.settings)
+        if provider_bases:
+            overrides.update(hf_api_base=provider_bases[0], moonshot_api_base=provider_bases[1])
+        for key, value in overrides.items():
+            stack.enter_context(mock.patch.object(settings, key, value))
+        for module in (llm_module, ocr_module):
+            wrapped = meter.wrap(module.record_provider_call)
+            stack.enter_context(mock.patch.object(module, "record_provider_call", wrapped))
+        stack.enter_context(mock.patch.object(pipeline.results_store, "enabled", False))
+        for cache in (pipeline.result_cache, pipeline.ocr_cache):
+            stack.enter_context(mock.patch.object(cache, "backend", MemoryStateBackend()))
+
+        # Connectors read settings when built, so build fresh ones for the variant
+        ocr = ocr_module.OCRConnector()
+        llm = llm_module.LLMConnector()
+        stack.push_async_callback(ocr.aclose)
+        stack.push_async_callback(llm.aclose)
+        if variant.compact_prompt:
+            build = llm._build_extraction_prompt
+            llm._build_extraction_prompt = lambda ocr_text, *args, **kwargs: build(
+                compact_text(ocr_text), *args, **kwargs
+            )
+        stack.enter_context(mock.patch.object(pipeline, "ocr_connector", ocr))
+        stack.enter_context(mock.patch.object(pipeline, "llm_connector", llm))
+        stack.enter_context(mock.patch.object(pipeline.extraction_agent, "llm", llm))
+
+        handler = pipeline.file_handler
+        if variant.image_format == "jpeg":
+            async def encode(image_path):
+                return await asyncio.to_thread(jpeg_data_uri, str(image_path), variant.jpeg_quality)
+
+            stack.enter_context(mock.patch.object(handler, "image_to_base64_async", encode))
+        if not shutil.which("pdftoppm"):
+            async def render(pdf_path, dpi=None, output_dir=None, max_pages=None):
+                dpi = dpi or settings.pdf_dpi
+                path = Path(output_dir) / f"{Path(pdf_path).stem}_{dpi}.png"
+                await asyncio.to_thread(synthetic_page(dpi).save, path, "PNG")
+                return [path]
+
+            stack.enter_context(mock.patch.object(handler, "pdf_to_images_async", render))
+        yield
+
+
+async def run_document(form: LabelledForm, workdir: Path) -> Tuple[Any, float, StageTimer]:
+    """
+    Process one labelled form with empty caches.
+
+    Returns:
+        Pipeline result, wall time in seconds and the stage timer
+    """
+    # Fresh caches, so repeated passes reach the providers too
+    pipeline.result_cache.backend = MemoryStateBackend()
+    pipeline.ocr_cache.backend = MemoryStateBackend()
+    document_sha256 = hashlib.sha256(form.source.read_bytes()).hexdigest()
+    timer = StageTimer()
+    start = time.perf_counter()
+    with timer.activate():
+        result = await pipeline.process_document(
+            form.source, document_sha256, form.form_type, timer, workdir
+        )
+    return result, time.perf_counter() - start, timer
+
+
+def _recording(form: LabelledForm, variant: Variant, result: Any) -> Dict[str, Any]:
+    """Fixture-format record of the responses a live run returned."""
+    attempts = result.extraction.get("model_attempts") or [{}]
+    return {
+        "source": str(form.source.relative_to(REPO_ROOT)),
+        "pages": len(result.ocr_text.split(PAGE_BREAK)),
+        "variant": asdict(variant),
+        "ocr": {"text": result.ocr_text, "usage": {}},
+        "llm": {
+            "text": result.extraction.get("raw_response") or "",
+            "usage": {
+                "prompt_tokens": attempts[-1].get("prompt_tokens", 0),
+                "completion_tokens": attempts[-1].get("completion_tokens", 0),
+            },
+        },
+    }
+
+
+async def evaluate_variant(
+    variant: Variant,
+    forms: List[LabelledForm],
+    server: Optional[MockProviderServer] = None,
+    record_dir: Optional[Path] = None,
+    repeat: int = 1,
+    recording_dir: Path = RECORDING_DIR
+) -> Dict[str, Any]:
+    """
+    Run every labelled form through one variant and summarise the results.
+
+    Args:
+        variant: Configuration to apply
+        forms: Labelled forms
+        server: Mock provider to replay from; None uses the configured providers
+        record_dir: Where to save live responses (``<record_dir>/<variant>/<form>.json``)
+        repeat: Passes over the forms (latency percentiles pool every pass)
+        recording_dir: Recordings to replay in preference to the default fixtures
+
+    Returns:
+        Variant summary with per-document results
+    """
+    replayed = set()
+    if server is not None:
+        fixtures = {fixture.name: fixture for fixture in load_fixtures()}
+        if (recording_dir / variant.name).is_dir():
+            for fixture in load_fixtures(recording_dir / variant.name):
+                fixtures[fixture.name] = fixture
+                replayed.add(fixture.name)
+
+    meter = Meter()
+    documents: List[Dict[str, Any]] = []
+    wall_start = time.perf_counter()
+    bases = (server.hf_base, server.moonshot_base) if server is not None else None
+    async with applied(variant, meter, bases):
+        with tempfile.TemporaryDirectory() as tmp:
+            for _ in range(repeat):
+                for form in forms:
+                    if server is not None:
+                        server.use([fixtures[form.name]])
+                    document: Dict[str, Any] = {"document": form.name}
+                    try:
+                        result, seconds, timer = await run_document(form, Path(tmp))
+                        predicted = result.extraction.get("fields", {})
+                        document.update(latency_ms=seconds * 1000, stages_ms=timer.as_ms())
+                    except Exception as e:
+                        # A failed document scores as an empty extraction
+                        result, predicted = None, {}
+                        document.update(latency_ms=None, error=str(e))
+                    document.update(meter.take())
+                    document.update(score_document(predicted, form.fields))
+                    documents.append(document)
+                    if record_dir is not None and result is not None:
+                        path = record_dir / variant.name / f"{form.name}.json"
+                        path.parent.mkdir(parents=True, exist_ok=True)
+                        path.write_text(
+                            json.dumps(_recording(form, variant, result), indent=2) + "\n",
+                            encoding="utf-8",
+                        )
+    wall_seconds = time.perf_counter() - wall_start
+
+    if server is None:
+        responses = "live"
+    elif not replayed:
+        responses = "fixtures"
+    else:
+        responses = "recorded" if replayed >= {form.name for form in forms} else "mixed"
+    return summarise(variant, documents, wall_seconds, responses)
+
+
+def summarise(
+    variant: Variant,
+    documents: List[Dict[str, Any]],
+    wall_seconds: float,
+    responses: str
+) -> Dict[str, Any]:
+    """
+    Aggregate per-document results into one variant summary.
+
+    Accuracy is micro-averaged F1 over every item plus the mean exact-match
+    rate and CER; costs are latency percentiles and per-form means of tokens
+    and bytes sent.
+    """
+    latencies = [d["latency_ms"] for d in documents if d["latency_ms"] is not None]
+    tp, fp, fn = (sum(d[key] for d in documents) for key in ("tp", "fp", "fn"))
+
+    def mean(key: str) -> float:
+        return statistics.mean(d.get(key, 0) for d in documents) if documents else 0.0
+
+    exact: Dict[str, List[bool]] = {}
+    cer: Dict[str, List[float]] = {}
+    for document in documents:
+        for name, result in document["fields"].items():
+            exact.setdefault(name, []).append(result["exact"])
+            if result["cer"] is not None:
+                cer.setdefault(name, []).append(result["cer"])
+    return {
+        "variant": variant.name,
+        "config": asdict(variant),
+        "responses": responses,
+        "forms": len(documents),
+        "errors": sum(1 for d in documents if "error" in d),
+        "f1": f1_score(tp, fp, fn),
+        "exact_match": mean("exact_match"),
+        "cer": mean("cer"),
+        "latency_p50_ms": percentile(latencies, 50),
+        "latency_p95_ms": percentile(latencies, 95),
+        "latency_mean_ms": statistics.mean(latencies) if latencies else 0.0,
+        "throughput_fps": len(latencies) / wall_seconds if wall_seconds else 0.0,
+        "tokens": mean("tokens_in") + mean("tokens_out"),
+        "tokens_in": mean("tokens_in"),
+        "tokens_out": mean("tokens_out"),
+        "bytes_sent": mean("bytes_sent"),
+        "provider_calls": mean("provider_calls"),
+        "field_exact_match": {name: sum(v) / len(v) for name, v in exact.items()},
+        "field_cer": {name: statistics.mean(v) for name, v in cer.items()},
+        "documents": documents,
+    }
+
+
+def run(args: argparse.Namespace) -> Dict[str, Any]:
+    """Evaluate every variant and return the JSON report."""
+    forms = load_labels(Path(args.labels))
+    variants = load_variants(Path(args.variants))
+    if args.only:
+        wanted = set(args.only.split(","))
+        variants = [variant for variant in variants if variant.name in wanted]
+    recordings = Path(args.recordings)
+
+    report: Dict[str, Any] = {
+        "git_commit": _git_commit(),
+        "started_at": datetime.now(timezone.utc).isoformat(),
+        "poppler": bool(shutil.which("pdftoppm")),
+        "config": {key: value for key, value in vars(args).items() if key != "output"},
+        "variants": [],
+    }
+
+    async def evaluate_all(server: Optional[MockProviderServer]) -> None:
+        if server is not None:
+            # Pay for worker-pool start-up and lazy imports before timing anything
+            await evaluate_variant(Variant("warmup"), forms[:1], server, recording_dir=recordings)
+        for variant in variants:
+            summary = await evaluate_variant(
+                variant,
+                forms,
+                server,
+                record_dir=recordings if args.record else None,
+                repeat=args.repeat,
+                recording_dir=recordings,
+            )
+            report["variants"].append(summary)
+            print(
+                f"{variant.name:<20} f1={summary['f1']:.3f} exact={summary['exact_match']:.3f} "
+                f"cer={summary['cer']:.3f} p50={summary['latency_p50_ms']:8.1f}ms "
+                f"tokens={summary['tokens']:7.0f} bytes={summary['bytes_sent']:9.0f} "
+                f"({summary['responses']})",
+                file=sys.stderr,
+            )
+
+    if args.record:
+        asyncio.run(evaluate_all(None))
+    else:
+        with MockProviderServer(
+            ocr_latency=args.ocr_latency, llm_latency=args.llm_latency, seed=args.seed
+        ) as server:
+            asyncio.run(evaluate_all(server))
+
+    report["pareto"] = {
+        metric: {
+            cost: pareto_front(report["variants"], cost, metric, higher_is_better=metric != "cer")
+            for cost in COST_AXES
+        }
+        for metric in ACCURACY_METRICS
+    }
+    return report
+
+
+def main():
+    """Parse arguments, run the evaluation and write the JSON report."""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--variants", default=str(DEFAULT_VARIANTS), help="JSON list of variants")
+    parser.add_argument("--only", default="", help="Comma-separated variant names to run")
+    parser.add_argument("--labels", default=str(LABEL_DIR), help="Directory of labelled forms")
+    parser.add_argument("--recordings", default=str(RECORDING_DIR),
+                        help="Per-variant recorded responses (replayed, or written with --record)")
+    parser.add_argument("--record", action="store_true",
+                        help="Call the configured live providers and save their responses")
+    parser.add_argument("--repeat", type=int, default=1, help="Passes over the labelled forms")
+    parser.add_argument("--ocr-latency", default="none")
+    parser.add_argument("--llm-latency", default="none")
+    parser.add_argument("--seed", type=int, default=1500)
+    parser.add_argument("--output", default="-", help="JSON output path ('-' for stdout)")
+    args = parser.parse_args()
+
+    report = run(args)
+    text = json.dumps(report, indent=2)
+    if args.output == "-":
+        print(text)
+    else:
+        Path(args.output).write_text(text + "\n", encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
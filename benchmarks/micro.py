@@ -0,0 +1,168 @@
+"""Micro-benchmarks for the CPU-side hot paths.
+
+Times each synchronous step the request path runs on the event loop --
+rasterisation, PNG encode, base64 encoding, image validation, TOON
+conversion, prompt building, response parsing and confidence scoring -- for
+every sample form
+at several DPIs, and reports per-call and per-page cost as JSON.
+
+    python -m benchmarks.micro --dpi 100,200,300 --output micro.json
+
+If poppler is not installed, rasterisation is skipped and a synthetic
+letter-size page is used for the image benchmarks so the rest still runs.
+"""
+import argparse
+import io
+import json
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+os.environ.setdefault("HF_TOKEN", "benchmark")
+os.environ.setdefault("MOONSHOT_API_KEY", "benchmark")
+
+from PIL import Image, ImageDraw  # noqa: E402
+
+from app.agents.confidence import score_fields  # noqa: E402
+from app.connectors.llm_connector import LLMConnector  # noqa: E402
+from app.utils.file_handler import FileHandler  # noqa: E402
+from app.utils.toon_converter import TOONConverter  # noqa: E402
+from benchmarks.mock_provider import load_fixtures  # noqa: E402
+from benchmarks.run_load import REPO_ROOT, _git_commit  # noqa: E402
+
+
+def measure(fn: Callable[[], Any], repeat: int, min_time: float = 0.05) -> Dict[str, float]:
+    """
+    Time ``fn`` and return per-call statistics in milliseconds.
+
+    Each of ``repeat`` samples loops ``fn`` enough times to run for at least
+    ``min_time`` seconds, so very fast functions are not dominated by timer
+    resolution.
+    """
+    start = time.perf_counter()
+    fn()
+    single = time.perf_counter() - start
+    loops = max(1, int(min_time / single)) if single > 0 else 1000
+
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        samples.append((time.perf_counter() - start) / loops * 1000)
+    return {
+        "min_ms": min(samples),
+        "median_ms": statistics.median(samples),
+        "loops": loops,
+    }
+
+
+def synthetic_page(dpi: int) -> Image.Image:
+    """A letter-size page with form-like text, for hosts without poppler."""
+    image = Image.new("RGB", (int(8.5 * dpi), int(11 * dpi)), "white")
+    draw = ImageDraw.Draw(image)
+    step = max(12, dpi // 8)
+    for row, y in enumerate(range(step, image.height - step, step)):
+        draw.text((step, y), f"{row:02d}. INSURED'S I.D. NUMBER 1234567893 99213 E11.9", fill="black")
+        draw.line((step, y + step - 2, image.width - step, y + step - 2), fill="red")
+    return image
+
+
+def bench_document(
+    handler: FileHandler, pdf: Path, dpi: int, repeat: int, workdir: Path
+) -> Dict[str, Any]:
+    """Benchmark the image-side steps for one document at one DPI."""
+    results: Dict[str, Any] = {"document": pdf.name, "dpi": dpi}
+    copy = workdir / pdf.name
+    shutil.copy(pdf, copy)
+
+    if shutil.which("pdftoppm"):
+        pages = handler.pdf_to_images(copy, dpi=dpi)
+        results["pages"] = len(pages)
+        results["pdf_to_images"] = measure(lambda: handler.pdf_to_images(copy, dpi=dpi), repeat, 0)
+        results["pdf_to_images"]["per_page_ms"] = results["pdf_to_images"]["median_ms"] / len(pages)
+        image = Image.open(pages[0])
+        image.load()
+    else:
+        results["pages"] = 1
+        results["pdf_to_images"] = None
+        image = synthetic_page(dpi)
+
+    page_path = workdir / f"{pdf.stem}_{dpi}.png"
+    image.save(page_path, "PNG")
+    results["page_png_bytes"] = page_path.stat().st_size
+    results["png_encode"] = measure(lambda: image.save(io.BytesIO(), "PNG"), repeat)
+    results["image_to_base64"] = measure(lambda: handler.image_to_base64(page_path), repeat)
+    results["validate_image"] = measure(lambda: handler.validate_image(page_path), repeat)
+    return results
+
+
+def bench_text(repeat: int) -> List[Dict[str, Any]]:
+    """Benchmark TOON conversion, prompt building, parsing and scoring per fixture."""
+    llm = LLMConnector.__new__(LLMConnector)  # prompt helpers need no client
+    results = []
+    for fixture in load_fixtures():
+        fields = LLMConnector.parse_response(fixture.llm_text)
+        results.append(
+            {
+                "document": fixture.name,
+                "ocr_chars": len(fixture.ocr_text),
+                "toon_convert": measure(lambda: TOONConverter.convert_to_toon(fields), repeat),
+                "build_prompt": measure(
+                    lambda: (
+                        llm._get_default_system_prompt("CMS-1500"),
+                        llm._build_extraction_prompt(fixture.ocr_text, "CMS-1500"),
+                    ),
+                    repeat,
+                ),
+                "parse_response": measure(lambda: LLMConnector.parse_response(fixture.llm_text), repeat),
+                "score_confidence": measure(
+                    lambda: score_fields(fields, fixture.ocr_text, fixture.llm_text), repeat
+                ),
+            }
+        )
+    return results
+
+
+def main():
+    """Run the micro-benchmarks and write the JSON report."""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dpi", default="100,200,300", help="Comma-separated DPIs")
+    parser.add_argument("--inputs", default="data/samples/*.pdf")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", default="-", help="JSON output path ('-' for stdout)")
+    args = parser.parse_args()
+
+    report: Dict[str, Any] = {
+        "git_commit": _git_commit(),
+        "poppler": bool(shutil.which("pdftoppm")),
+        "image": [],
+        "text": bench_text(args.repeat),
+    }
+    with tempfile.TemporaryDirectory() as tmp:
+        handler = FileHandler(upload_dir=tmp)
+        for pdf in sorted(REPO_ROOT.glob(args.inputs)):
+            for dpi in (int(d) for d in args.dpi.split(",")):
+                result = bench_document(handler, pdf, dpi, args.repeat, Path(tmp))
+                report["image"].append(result)
+                print(
+                    f"{pdf.name:<22} dpi={dpi:<4} "
+                    f"base64={result['image_to_base64']['median_ms']:7.2f}ms "
+                    f"png={result['png_encode']['median_ms']:8.2f}ms",
+                    file=sys.stderr,
+                )
+
+    text = json.dumps(report, indent=2)
+    if args.output == "-":
+        print(text)
+    else:
+        Path(args.output).write_text(text + "\n", encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
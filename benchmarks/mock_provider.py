@@ -0,0 +1,423 @@
+"""OpenAI-compatible stub for the HuggingFace router and Moonshot APIs.
+
+Serves recorded OCR and LLM responses from ``benchmarks/fixtures`` with
+configurable latency, error injection and SSE streaming, so the pipeline can
+be load-tested without network access or provider spend.
+
+    python -m benchmarks.mock_provider --port 9100 --ocr-latency lognormal:0.7,0.3
+
+Point the app at it with ``HF_API_BASE=http://127.0.0.1:9100/hf/v1`` and
+``MOONSHOT_API_BASE=http://127.0.0.1:9100/moonshot/v1``.
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import random
+import socket
+import tempfile
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import FileResponse, JSONResponse, Response, StreamingResponse
+
+
+FIXTURE_DIR = Path(__file__).parent / "fixtures"
+SAMPLE_DIR = Path(__file__).parent.parent / "data" / "samples"
+
+
+class LatencyModel:
+    """
+    Sample simulated provider latency.
+
+    Specs: ``none``, ``fixed:S``, ``uniform:LO,HI`` or ``lognormal:MU,SIGMA``
+    (parameters of the underlying normal, in log-seconds).
+    """
+
+    def __init__(self, spec: str = "none", rng: Optional[random.Random] = None):
+        self.spec = spec
+        self.rng = rng or random.Random()
+        kind, _, params = spec.partition(":")
+        self.kind = kind
+        self.params = [float(p) for p in params.split(",") if p]
+        expected = {"none": 0, "fixed": 1, "uniform": 2, "lognormal": 2}
+        if kind not in expected or len(self.params) != expected[kind]:
+            raise ValueError(f"Invalid latency spec: {spec}")
+
+    def sample(self) -> float:
+        """Return a latency in seconds."""
+        if self.kind == "fixed":
+            return self.params[0]
+        if self.kind == "uniform":
+            return self.rng.uniform(*self.params)
+        if self.kind == "lognormal":
+            return self.rng.lognormvariate(*self.params)
+        return 0.0
+
+
+@dataclass
+class Fixture:
+    """Recorded OCR and LLM responses for one sample document."""
+
+    name: str
+    pages: int
+    ocr_text: str
+    ocr_usage: Dict[str, int]
+    llm_text: str
+    llm_usage: Dict[str, int]
+
+
+def load_fixtures(fixture_dir: Path = FIXTURE_DIR) -> List[Fixture]:
+    """Load every ``*.json`` fixture in ``fixture_dir`` (sorted by name)."""
+    fixtures = []
+    for path in sorted(fixture_dir.glob("*.json")):
+        data = json.loads(path.read_text(encoding="utf-8"))
+        fixtures.append(
+            Fixture(
+                name=path.stem,
+                pages=data.get("pages", 1),
+                ocr_text=data["ocr"]["text"],
+                ocr_usage=data["ocr"].get("usage", {}),
+                llm_text=data["llm"]["text"],
+                llm_usage=data["llm"].get("usage", {}),
+            )
+        )
+    if not fixtures:
+        raise FileNotFoundError(f"No fixtures found in {fixture_dir}")
+    return fixtures
+
+
+def _image_urls(messages: List[Dict[str, Any]]) -> List[str]:
+    urls = []
+    for message in messages:
+        content = message.get("content")
+        if isinstance(content, list):
+            for part in content:
+                if part.get("type") == "image_url":
+                    urls.append(part["image_url"]["url"])
+    return urls
+
+
+def _text_of(messages: List[Dict[str, Any]]) -> str:
+    parts = []
+    for message in messages:
+        content = message.get("content")
+        if isinstance(content, str):
+            parts.append(content)
+        elif isinstance(content, list):
+            parts.extend(p.get("text", "") for p in content if p.get("type") == "text")
+    return "\n".join(parts)
+
+
+def _page_digest(data_uri: str) -> str:
+    return hashlib.sha256(data_uri.encode("utf-8")).hexdigest()
+
+
+class FixtureMatcher:
+    """Pick the recorded response that corresponds to a request."""
+
+    def __init__(self, fixtures: List[Fixture]):
+        self.fixtures = fixtures
+        self.pages: Dict[str, str] = {}
+
+    def register_page(self, fixture_name: str, data_uri: str) -> None:
+        """Answer OCR requests for the page ``data_uri`` with ``fixture_name``."""
+        self.pages[_page_digest(data_uri)] = fixture_name
+
+    def index_samples(self, dpi: int, sample_dir: Path = SAMPLE_DIR) -> int:
+        """
+        Register every page of each fixture's sample PDF as the pipeline renders it.
+
+        Pages are rasterised and encoded with the same functions the API uses,
+        so a page sent at the same DPI has the same data URI.
+
+        Args:
+            dpi: Rasterisation resolution (the API's ``PDF_DPI``)
+            sample_dir: Directory holding ``<fixture name>.pdf``
+
+        Returns:
+            Number of pages registered
+
+        Raises:
+            Exception: If the PDFs cannot be rendered (e.g. poppler is missing)
+        """
+        from app.utils.image_ops import encode_data_uri, render_pdf_pages
+
+        registered = 0
+        with tempfile.TemporaryDirectory() as output_dir:
+            for fixture in self.fixtures:
+                source = sample_dir / f"{fixture.name}.pdf"
+                if not source.is_file():
+                    continue
+                for page in render_pdf_pages(str(source), dpi, output_dir):
+                    self.register_page(fixture.name, encode_data_uri(page))
+                    registered += 1
+        return registered
+
+    def for_image(self, url: str) -> Optional[Fixture]:
+        """
+        Match an OCR request.
+
+        Remote URLs match on the fixture name appearing in the URL and data
+        URIs (rasterised pages) on the pages registered for each fixture. With
+        a single fixture in play (see ``MockProviderServer.use``) every request
+        gets it.
+
+        Returns:
+            The matching fixture, or None if the image is not recognised
+        """
+        if len(self.fixtures) == 1:
+            return self.fixtures[0]
+        if url.startswith("data:"):
+            name = self.pages.get(_page_digest(url))
+            return next((f for f in self.fixtures if f.name == name), None)
+        return next((f for f in self.fixtures if f.name in url), None)
+
+    def for_prompt(self, prompt: str) -> Fixture:
+        """Match an LLM request by the recorded OCR transcript it embeds."""
+        best, best_overlap = self.fixtures[0], -1
+        for fixture in self.fixtures:
+            if fixture.ocr_text in prompt:
+                return fixture
+            lines = fixture.ocr_text.splitlines()
+            overlap = sum(1 for line in lines if line and line in prompt)
+            if overlap > best_overlap:
+                best, best_overlap = fixture, overlap
+        return best
+
+
+def _completion(model: str, text: str, usage: Dict[str, int]) -> Dict[str, Any]:
+    return {
+        "id": f"chatcmpl-mock-{random.getrandbits(48):012x}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [
+            {
+                "index": 0,
+                "message": {"role": "assistant", "content": text},
+                "finish_reason": "stop",
+            }
+        ],
+        "usage": {
+            "prompt_tokens": usage.get("prompt_tokens", 0),
+            "completion_tokens": usage.get("completion_tokens", 0),
+            "total_tokens": usage.get("prompt_tokens", 0) + usage.get("completion_tokens", 0),
+        },
+    }
+
+
+async def _stream(model: str, text: str, chunk_chars: int, delay: float):
+    created = int(time.time())
+    for start in range(0, len(text), chunk_chars):
+        chunk = {
+            "id": "chatcmpl-mock-stream",
+            "object": "chat.completion.chunk",
+            "created": created,
+            "model": model,
+            "choices": [
+                {"index": 0, "delta": {"content": text[start:start + chunk_chars]}, "finish_reason": None}
+            ],
+        }
+        yield f"data: {json.dumps(chunk)}\n\n"
+        if delay:
+            await asyncio.sleep(delay)
+    done = {
+        "id": "chatcmpl-mock-stream",
+        "object": "chat.completion.chunk",
+        "created": created,
+        "model": model,
+        "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+    }
+    yield f"data: {json.dumps(done)}\n\n"
+    yield "data: [DONE]\n\n"
+
+
+def create_app(
+    fixtures: Optional[List[Fixture]] = None,
+    ocr_latency: str = "none",
+    llm_latency: str = "none",
+    error_rate: float = 0.0,
+    error_status: int = 503,
+    stream_chunk_chars: int = 64,
+    stream_chunk_delay: float = 0.0,
+    seed: Optional[int] = None,
+    page_dpi: Optional[int] = None,
+) -> FastAPI:
+    """
+    Build the stub application.
+
+    Args:
+        fixtures: Recorded responses (defaults to ``benchmarks/fixtures``)
+        ocr_latency: Latency spec for ``/hf/v1`` requests
+        llm_latency: Latency spec for ``/moonshot/v1`` requests
+        error_rate: Probability of answering with ``error_status``
+        error_status: HTTP status used for injected errors (429 and 5xx are retried by clients)
+        stream_chunk_chars: Characters per SSE chunk when ``stream`` is requested
+        stream_chunk_delay: Delay between SSE chunks in seconds
+        seed: Seed for latency and error sampling
+        page_dpi: Register the sample PDFs' pages rendered at this DPI, so
+            OCR requests for rasterised pages get their own document's fixture
+
+    Returns:
+        FastAPI application
+    """
+    rng = random.Random(seed)
+    matcher = FixtureMatcher(fixtures or load_fixtures())
+    if page_dpi:
+        try:
+            matcher.index_samples(page_dpi)
+        except Exception as e:
+            print(f"Could not render sample pages, rasterised pages will not match: {e}")
+    latency = {
+        "hf": LatencyModel(ocr_latency, rng),
+        "moonshot": LatencyModel(llm_latency, rng),
+    }
+    stats: Counter = Counter()
+    app = FastAPI(title="Mock OCR/LLM provider")
+    app.state.stats = stats
+    app.state.matcher = matcher
+
+    @app.post("/{provider}/v1/chat/completions")
+    async def chat_completions(provider: str, request: Request):
+        if provider not in latency:
+            raise HTTPException(status_code=404, detail=f"Unknown provider {provider}")
+        body = await request.json()
+        messages = body.get("messages", [])
+        stats[f"{provider}.requests"] += 1
+
+        await asyncio.sleep(latency[provider].sample())
+
+        if error_rate and rng.random() < error_rate:
+            stats[f"{provider}.errors"] += 1
+            return JSONResponse(
+                {"error": {"message": "Injected failure", "type": "mock_error"}},
+                status_code=error_status,
+                headers={"retry-after": "0"},
+            )
+
+        images = _image_urls(messages)
+        if provider == "hf":
+            fixture = matcher.for_image(images[0] if images else "")
+            if fixture is None:
+                # Answering with another document's text would skew the results
+                stats["hf.unmatched"] += 1
+                return JSONResponse(
+                    {"error": {"message": "No fixture for this image", "type": "mock_unmatched"}},
+                    status_code=422,
+                )
+            text, usage = fixture.ocr_text, fixture.ocr_usage
+        else:
+            fixture = matcher.for_prompt(_text_of(messages))
+            text, usage = fixture.llm_text, fixture.llm_usage
+        stats[f"{provider}.{fixture.name}"] += 1
+
+        model = body.get("model", "mock")
+        if body.get("stream"):
+            return StreamingResponse(
+                _stream(model, text, stream_chunk_chars, stream_chunk_delay),
+                media_type="text/event-stream",
+            )
+        return _completion(model, text, usage)
+
+    @app.get("/files/{name}")
+    async def sample_file(name: str, nonce: Optional[str] = None):
+        path = SAMPLE_DIR / Path(name).name
+        if not path.is_file():
+            raise HTTPException(status_code=404, detail="Not found")
+        if nonce:
+            # A comment after the trailer makes each copy a distinct document
+            return Response(path.read_bytes() + f"\n% {nonce}\n".encode(), media_type="application/pdf")
+        return FileResponse(path)
+
+    @app.get("/stats")
+    async def get_stats():
+        return dict(stats)
+
+    return app
+
+
+def _free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class MockProviderServer:
+    """Run the stub in a background thread for the duration of a ``with`` block."""
+
+    def __init__(self, port: Optional[int] = None, **app_kwargs):
+        import uvicorn
+
+        self.port = port or _free_port()
+        self.app = create_app(**app_kwargs)
+        config = uvicorn.Config(self.app, host="127.0.0.1", port=self.port, log_level="warning")
+        self.server = uvicorn.Server(config)
+        self.thread = threading.Thread(target=self.server.run, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    @property
+    def hf_base(self) -> str:
+        return f"{self.base_url}/hf/v1"
+
+    @property
+    def moonshot_base(self) -> str:
+        return f"{self.base_url}/moonshot/v1"
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        return dict(self.app.state.stats)
+
+    def use(self, fixtures: List[Fixture]) -> None:
+        """Replay only ``fixtures`` from now on (e.g. one document's recording)."""
+        self.app.state.matcher.fixtures = list(fixtures)
+
+    def __enter__(self) -> "MockProviderServer":
+        self.thread.start()
+        deadline = time.monotonic() + 10
+        while not self.server.started:
+            if time.monotonic() > deadline:
+                raise RuntimeError("Mock provider did not start")
+            time.sleep(0.01)
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.server.should_exit = True
+        self.thread.join(timeout=10)
+
+
+def main():
+    """Run the stub as a standalone server."""
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--ocr-latency", default="none")
+    parser.add_argument("--llm-latency", default="none")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--error-status", type=int, default=503)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--page-dpi", type=int, default=None, help="PDF_DPI of the API, to match rasterised pages")
+    args = parser.parse_args()
+
+    app = create_app(
+        ocr_latency=args.ocr_latency,
+        llm_latency=args.llm_latency,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        seed=args.seed,
+        page_dpi=args.page_dpi,
+    )
+    uvicorn.run(app, host="127.0.0.1", port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
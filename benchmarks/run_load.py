@@ -0,0 +1,312 @@
+"""Load benchmark for the processing endpoints against the mock providers.
+
+Starts the mock OCR/LLM stub in-process, launches the API as a separate
+uvicorn process pointed at it, and drives ``/process/upload``,
+``/process/url`` and a batch scenario (all samples submitted together and
+timed as one unit) at each requested concurrency. A fresh API process is
+started per run so peak RSS is attributable to that run. Every request sends
+a distinct copy of its sample (a nonce comment after the PDF trailer), so
+identical in-flight documents are not coalesced, and the result and OCR
+caches are off; ``--cached`` adds runs with the caches on.
+
+    python -m benchmarks.run_load --concurrency 1,8 --requests 40 \\
+        --ocr-latency lognormal:-0.5,0.4 --output bench.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+import httpx
+
+from benchmarks.mock_provider import MockProviderServer, _free_port
+
+
+REPO_ROOT = Path(__file__).parent.parent
+SAMPLE_GLOB = "data/samples/*.pdf"
+SCENARIOS = ("upload", "url", "batch")
+
+
+def percentile(values: Sequence[float], q: float) -> float:
+    """Linear-interpolated percentile (``q`` in 0-100) of ``values``."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * q / 100
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def summarize(latencies: List[float], errors: int, wall_seconds: float) -> Dict[str, Any]:
+    """Summarize successful latencies (seconds) into the JSON result shape."""
+    ms = [value * 1000 for value in latencies]
+    completed = len(latencies) + errors
+    return {
+        "requests": completed,
+        "errors": errors,
+        "throughput_rps": len(latencies) / wall_seconds if wall_seconds else 0.0,
+        "latency_ms": {
+            "p50": percentile(ms, 50),
+            "p95": percentile(ms, 95),
+            "p99": percentile(ms, 99),
+            "mean": sum(ms) / len(ms) if ms else 0.0,
+            "max": max(ms) if ms else 0.0,
+        },
+    }
+
+
+def _descendants(pid: int) -> List[int]:
+    pids = [pid]
+    for task in Path(f"/proc/{pid}/task").glob("*"):
+        children = (task / "children").read_text().split() if (task / "children").exists() else []
+        for child in children:
+            pids.extend(_descendants(int(child)))
+    return pids
+
+
+def peak_rss_mb(pid: int) -> Optional[float]:
+    """Sum of peak resident set size (VmHWM) over a process tree, in MiB (Linux only)."""
+    total_kb = 0
+    try:
+        for proc in _descendants(pid):
+            for line in Path(f"/proc/{proc}/status").read_text().splitlines():
+                if line.startswith("VmHWM:"):
+                    total_kb += int(line.split()[1])
+    except (FileNotFoundError, ProcessLookupError):
+        return None
+    return total_kb / 1024 if total_kb else None
+
+
+class AppProcess:
+    """The API under test, running in its own uvicorn process."""
+
+    def __init__(self, env: Dict[str, str], extra_args: Sequence[str] = ()):
+        self.port = _free_port()
+        self.env = env
+        self.extra_args = list(extra_args)
+        self.proc: Optional[subprocess.Popen] = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def __enter__(self) -> "AppProcess":
+        self.proc = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1",
+             "--port", str(self.port), "--log-level", "warning", *self.extra_args],
+            cwd=REPO_ROOT,
+            env=self.env,
+        )
+        deadline = time.monotonic() + 60
+        while time.monotonic() < deadline:
+            if self.proc.poll() is not None:
+                raise RuntimeError(f"API process exited with {self.proc.returncode}")
+            try:
+                if httpx.get(f"{self.base_url}/api/v1/health", timeout=1).status_code == 200:
+                    return self
+            except httpx.HTTPError:
+                pass
+            time.sleep(0.1)
+        raise RuntimeError("API process did not become healthy")
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.proc.terminate()
+        try:
+            self.proc.wait(timeout=15)
+        except subprocess.TimeoutExpired:
+            self.proc.kill()
+
+
+async def _timed(coro) -> Optional[float]:
+    start = time.perf_counter()
+    try:
+        response = await coro
+        ok = response.status_code == 200
+    except httpx.HTTPError:
+        ok = False
+    return time.perf_counter() - start if ok else None
+
+
+async def run_scenario(
+    scenario: str,
+    client: httpx.AsyncClient,
+    samples: List[Path],
+    files_base: str,
+    concurrency: int,
+    total: int,
+) -> Dict[str, Any]:
+    """Drive one scenario with ``concurrency`` workers until ``total`` units complete."""
+    payloads = {path: path.read_bytes() for path in samples}
+    counter = iter(range(total))
+    latencies: List[float] = []
+    errors = 0
+
+    # Repeated samples would otherwise share one pipeline run through coalescing
+    def upload(path: Path):
+        unique = payloads[path] + f"\n% {uuid.uuid4().hex}\n".encode()
+        return client.post(
+            "/api/v1/process/upload",
+            files={"file": (path.name, unique, "application/pdf")},
+        )
+
+    def from_url(path: Path):
+        url = f"{files_base}/files/{path.name}?nonce={uuid.uuid4().hex}"
+        return client.post("/api/v1/process/url", json={"image_url": url})
+
+    async def unit(index: int) -> Optional[float]:
+        path = samples[index % len(samples)]
+        if scenario == "upload":
+            return await _timed(upload(path))
+        if scenario == "url":
+            return await _timed(from_url(path))
+        start = time.perf_counter()
+        results = await asyncio.gather(*(_timed(upload(p)) for p in samples))
+        return time.perf_counter() - start if all(r is not None for r in results) else None
+
+    async def worker():
+        nonlocal errors
+        for index in counter:
+            elapsed = await unit(index)
+            if elapsed is None:
+                errors += 1
+            else:
+                latencies.append(elapsed)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(latencies, errors, time.perf_counter() - start)
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "HEAD"], cwd=REPO_ROOT, text=True, stderr=subprocess.DEVNULL
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(args: argparse.Namespace) -> Dict[str, Any]:
+    """Run every scenario/concurrency combination and return the JSON report."""
+    samples = sorted(REPO_ROOT.glob(args.inputs))
+    if not samples:
+        raise SystemExit(f"No inputs match {args.inputs}")
+
+    report: Dict[str, Any] = {
+        "git_commit": _git_commit(),
+        "started_at": datetime.now(timezone.utc).isoformat(),
+        "config": {
+            key: value for key, value in vars(args).items() if key not in ("output",)
+        },
+        "results": [],
+    }
+
+    with MockProviderServer(
+        ocr_latency=args.ocr_latency,
+        llm_latency=args.llm_latency,
+        error_rate=args.error_rate,
+        seed=args.seed,
+        page_dpi=args.pdf_dpi,
+    ) as mock:
+        env = dict(os.environ)
+        env.update(
+            HF_TOKEN="benchmark",
+            MOONSHOT_API_KEY="benchmark",
+            HF_API_BASE=mock.hf_base,
+            MOONSHOT_API_BASE=mock.moonshot_base,
+            # The url scenario fetches from the mock on 127.0.0.1
+            URL_FETCH_ALLOW_PRIVATE="True",
+            # The mock recognises pages rendered at this DPI
+            PDF_DPI=str(args.pdf_dpi),
+            DEBUG="False",
+        )
+        uncached = dict(
+            env,
+            # The samples repeat, so cache hits would hide the pipeline cost
+            RESULT_CACHE_TTL_SECONDS="0",
+            OCR_CACHE_TTL_SECONDS="0",
+        )
+        runs = [
+            (scenario, int(concurrency), cached)
+            for cached in ((False, True) if args.cached else (False,))
+            for scenario in args.scenarios.split(",")
+            for concurrency in args.concurrency.split(",")
+        ]
+        for scenario, concurrency, cached in runs:
+            with AppProcess(env if cached else uncached, args.app_args.split()) as api:
+                async def drive():
+                    async with httpx.AsyncClient(base_url=api.base_url, timeout=args.timeout) as client:
+                        return await run_scenario(
+                            scenario, client, samples, mock.base_url, concurrency, args.requests
+                        )
+
+                stats_before = mock.stats
+                result = asyncio.run(drive())
+                result.update(
+                    scenario=scenario,
+                    concurrency=concurrency,
+                    cached=cached,
+                    peak_rss_mb=peak_rss_mb(api.proc.pid),
+                    provider_requests={
+                        key: mock.stats.get(key, 0) - stats_before.get(key, 0)
+                        for key in ("hf.requests", "hf.unmatched", "moonshot.requests")
+                    },
+                )
+            # A run that mostly returned errors measured error handling, not the pipeline
+            result["failed"] = result["errors"] * 2 > result["requests"]
+            report["results"].append(result)
+            print(
+                f"{scenario + (' cached' if cached else ''):>14} c={concurrency:<3} "
+                f"{result['throughput_rps']:7.2f} rps  "
+                f"p50={result['latency_ms']['p50']:8.1f}ms  "
+                f"p99={result['latency_ms']['p99']:8.1f}ms  "
+                f"errors={result['errors']}",
+                file=sys.stderr,
+            )
+    return report
+
+
+def main():
+    """Parse arguments, run the benchmark and write the JSON report."""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--concurrency", default="1,4,16", help="Comma-separated concurrency levels")
+    parser.add_argument("--requests", type=int, default=40, help="Units of work per run")
+    parser.add_argument("--inputs", default=SAMPLE_GLOB, help="Glob (relative to repo root) of input files")
+    parser.add_argument("--ocr-latency", default="lognormal:-0.7,0.3")
+    parser.add_argument("--llm-latency", default="lognormal:0.0,0.3")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=1500)
+    parser.add_argument("--pdf-dpi", type=int, default=200, help="PDF_DPI for the API under test")
+    parser.add_argument("--timeout", type=float, default=300.0)
+    parser.add_argument("--cached", action="store_true", help="Also run with the result and OCR caches on")
+    parser.add_argument("--app-args", default="", help="Extra arguments for the uvicorn process")
+    parser.add_argument("--output", default="-", help="JSON output path ('-' for stdout)")
+    args = parser.parse_args()
+
+    report = run(args)
+    text = json.dumps(report, indent=2)
+    if args.output == "-":
+        print(text)
+    else:
+        Path(args.output).write_text(text + "\n", encoding="utf-8")
+
+    failed = [
+        f"{r['scenario']}{' cached' if r['cached'] else ''} c={r['concurrency']}"
+        for r in report["results"]
+        if r["failed"]
+    ]
+    if failed:
+        raise SystemExit(f"Most requests failed in: {', '.join(failed)}")
+
+
+if __name__ == "__main__":
+    main()
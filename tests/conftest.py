@@ -0,0 +1,73 @@
+"""Shared pytest configuration."""
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+# Settings() requires provider credentials at import time; tests never call
+# the real providers, so placeholders are enough.
+os.environ.setdefault("HF_TOKEN", "test-hf-token")
+os.environ.setdefault("MOONSHOT_API_KEY", "test-moonshot-key")
+
+
+class DocumentServer:
+    """Local HTTP server serving in-memory documents with ETag validation."""
+
+    def __init__(self, host="127.0.0.1"):
+        self.host = host
+        self.documents = {}
+        self.redirects = {}
+        self.requests = []
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                server.requests.append((self.path, dict(self.headers)))
+                if self.path in server.redirects:
+                    self.send_response(302)
+                    self.send_header("Location", server.redirects[self.path])
+                    self.end_headers()
+                    return
+                document = server.documents.get(self.path)
+                if document is None:
+                    self.send_error(404)
+                    return
+                body, etag = document
+                if etag and self.headers.get("If-None-Match") == etag:
+                    self.send_response(304)
+                    self.send_header("ETag", etag)
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header("Content-Length", str(len(body)))
+                if etag:
+                    self.send_header("ETag", etag)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer((host, 0), Handler)
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    def add(self, path, body, etag=None):
+        """Serve ``body`` at ``path`` and return its URL."""
+        self.documents[path] = (body, etag)
+        return f"http://{self.host}:{self.httpd.server_port}{path}"
+
+    def redirect(self, path, location):
+        """Answer ``path`` with a 302 to ``location`` and return its URL."""
+        self.redirects[path] = location
+        return f"http://{self.host}:{self.httpd.server_port}{path}"
+
+
+@pytest.fixture
+def document_server():
+    """Start a local HTTP server for URL-fetch tests."""
+    server = DocumentServer()
+    server.thread.start()
+    yield server
+    server.httpd.shutdown()
+    server.httpd.server_close()
@@ -0,0 +1,96 @@
+"""Admission control tests."""
+import asyncio
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.utils.admission import (
+    AdmissionController,
+    AdmissionMiddleware,
+    AdmissionRejectedError,
+)
+
+
+async def test_waiters_are_served_by_lane_then_arrival():
+    """Interactive waiters are admitted before batch waiters queued earlier."""
+    controller = AdmissionController(max_concurrent=1, max_queue=4, queue_timeout=1)
+    await controller.acquire()
+    order = []
+
+    async def wait(lane, name):
+        await controller.acquire(lane)
+        order.append(name)
+        controller.release()
+
+    tasks = [
+        asyncio.create_task(wait("batch", "batch-1")),
+        asyncio.create_task(wait("interactive", "interactive-1")),
+        asyncio.create_task(wait("batch", "batch-2")),
+    ]
+    await asyncio.sleep(0)
+    assert controller.queued == 3
+
+    controller.release()
+    await asyncio.gather(*tasks)
+
+    assert order == ["interactive-1", "batch-1", "batch-2"]
+    assert controller.active == 0
+
+
+async def test_full_queue_and_timeout_are_rejected():
+    """A full queue answers 429 and an expired wait answers 503."""
+    controller = AdmissionController(max_concurrent=1, max_queue=1, queue_timeout=0.05)
+    await controller.acquire()
+    waiter = asyncio.create_task(controller.acquire())
+    await asyncio.sleep(0)
+
+    with pytest.raises(AdmissionRejectedError) as full:
+        await controller.acquire()
+    assert full.value.status_code == 429
+
+    with pytest.raises(AdmissionRejectedError) as timed_out:
+        await waiter
+    assert timed_out.value.status_code == 503
+    assert controller.queued == 0
+    assert controller.active == 1
+
+
+async def test_batch_cannot_use_reserved_slots():
+    """Batch work leaves the reserved slot free for interactive requests."""
+    controller = AdmissionController(
+        max_concurrent=2, max_queue=4, queue_timeout=0.05, interactive_reserved=1
+    )
+    await controller.acquire("batch")
+
+    with pytest.raises(AdmissionRejectedError):
+        await controller.acquire("batch")
+    await controller.acquire("interactive")
+
+    assert controller.active == 2
+
+
+def test_middleware_sheds_load_with_retry_after():
+    """Saturated endpoints answer immediately with Retry-After."""
+    controller = AdmissionController(max_concurrent=1, max_queue=0, retry_after=7)
+    controller.active = 1
+    app = FastAPI()
+
+    @app.post("/api/v1/process/url")
+    async def process():
+        return {"ok": True}
+
+    app.add_middleware(
+        AdmissionMiddleware, controller=controller, path_prefixes=("/api/v1/process/",)
+    )
+    client = TestClient(app)
+
+    response = client.post("/api/v1/process/url")
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "7"
+
+    assert client.post("/api/v1/process/url", headers={"X-Priority": "bulk"}).status_code == 400
+
+    controller.active = 0
+    assert client.post("/api/v1/process/url").json() == {"ok": True}
+    assert controller.active == 0
@@ -0,0 +1,143 @@
+"""Extraction agent tests."""
+import json
+
+import pytest
+
+from app.agents.checkpoint import CheckpointStore
+from app.agents.extraction_agent import NODES, ExtractionAgent
+from app.connectors.llm_connector import LLMConnector
+from app.utils.state import MemoryStateBackend, SQLiteStateBackend
+
+
+OCR_TEXT = """HEALTH INSURANCE CLAIM FORM
+APPROVED BY NATIONAL UNIFORM CLAIM COMMITTEE (NUCC) 02/12
+1a. INSURED'S I.D. NUMBER 123456789
+2. PATIENT'S NAME (Last Name, First Name, Middle Initial) DOE, JOHN
+3. PATIENT'S BIRTH DATE 01 15 1980 SEX M
+24. A. DATE(S) OF SERVICE 03 01 2024 99213 100 00
+03 01 2024 36415 50 00
+28. TOTAL CHARGE 150 00
+33a. NPI 1234567893
+"""
+
+CLEAN_FIELDS = {
+    "patient_name": "DOE, JOHN",
+    "patient_dob": "01 15 1980",
+    "insured_id": "123456789",
+    "billing_provider_npi": "1234567893",
+    "total_charge": "150.00",
+    "service_lines": [{"cpt": "99213", "charge": "100.00"}, {"cpt": "36415", "charge": "50.00"}],
+}
+
+
+class FakeLLM:
+    """LLM stand-in that records calls and can fail the cross-field review."""
+
+    model = "fake-model"
+    parse_response = staticmethod(LLMConnector.parse_response)
+
+    def __init__(self, fields=None, reextracted=None, fail_review: int = 0):
+        self.calls = []
+        self.fields = fields or CLEAN_FIELDS
+        self.reextracted = reextracted or {}
+        self.fail_review = fail_review
+
+    async def extract_fields(
+        self, ocr_text, form_type="CMS-1500", system_prompt=None, field_names=None
+    ):
+        self.calls.append("extract")
+        return {
+            "raw_response": "{}",
+            "fields": dict(self.fields),
+            "reasoning": [],
+            "confidence_scores": {},
+        }
+
+    async def chat(self, messages, temperature=None, max_tokens=None):
+        if "Read the OCR text again" in messages[0]["content"]:
+            self.calls.append("reextract")
+            return json.dumps(self.reextracted)
+        self.calls.append("review")
+        if self.fail_review:
+            self.fail_review -= 1
+            raise Exception("Chat completion failed: timeout")
+        return json.dumps({"corrections": {}, "issues": ["total does not match"]})
+
+
+async def test_clean_form_takes_one_llm_call():
+    llm = FakeLLM()
+    agent = ExtractionAgent(llm, CheckpointStore(MemoryStateBackend()))
+
+    state = await agent.extract(OCR_TEXT, document_id="doc")
+
+    assert llm.calls == ["extract"]
+    assert state["llm_calls"] == 1
+    assert state["completed_nodes"] == NODES
+    assert state["current_step"] == "complete"
+    assert set(state["confidence_scores"]) == set(CLEAN_FIELDS)
+    assert min(state["confidence_scores"].values()) > 0.9
+    assert {"patient_name", "insured_id", "total_charge"} <= set(state["identified_fields"])
+    assert state["errors"] == []
+
+
+async def test_failed_fields_are_reextracted_alone():
+    llm = FakeLLM(
+        fields={**CLEAN_FIELDS, "total_charge": "180.00"},
+        reextracted={"total_charge": "150.00", "patient_name": "ignored"},
+    )
+    agent = ExtractionAgent(llm)
+
+    state = await agent.extract(OCR_TEXT, document_id="doc")
+
+    assert llm.calls == ["extract", "reextract"]
+    assert state["extracted_fields"]["total_charge"] == "150.00"
+    assert state["extracted_fields"]["patient_name"] == "DOE, JOHN"
+    assert state["completed_nodes"].count("extract_values") == 2
+    assert state["llm_calls"] == 2
+
+
+async def test_fields_failing_after_reextraction_get_llm_review():
+    llm = FakeLLM(fields={**CLEAN_FIELDS, "total_charge": "180.00"})
+    agent = ExtractionAgent(llm)
+
+    state = await agent.extract(OCR_TEXT, document_id="doc")
+
+    assert llm.calls == ["extract", "reextract", "review"]
+    assert state["confidence_scores"]["total_charge"] < 0.5
+    assert "total does not match" in state["errors"]
+
+
+@pytest.mark.parametrize("backend", ["memory", "sqlite"])
+async def test_failed_run_resumes_from_last_checkpoint(backend, tmp_path):
+    """A retry after a late failure repeats only the failed node."""
+    if backend == "sqlite":
+        store = CheckpointStore(SQLiteStateBackend(tmp_path / "state.db"))
+    else:
+        store = CheckpointStore(MemoryStateBackend())
+    llm = FakeLLM(fields={**CLEAN_FIELDS, "total_charge": "180.00"}, fail_review=1)
+    agent = ExtractionAgent(llm, store)
+
+    with pytest.raises(Exception, match="timeout"):
+        await agent.extract(OCR_TEXT, document_id="doc")
+    thread_id = agent._thread_id(OCR_TEXT, "CMS-1500", "doc")
+    saved = await store.load(thread_id)
+    assert saved["completed_nodes"][-1] == "extract_values"
+    assert saved["reextract_rounds"] == 1
+
+    state = await agent.extract(OCR_TEXT, document_id="doc")
+
+    assert llm.calls == ["extract", "reextract", "review", "review"]
+    assert state["completed_nodes"][-2:] == ["validate_cross_fields", "score_confidence"]
+    assert state["llm_calls"] == 3
+    assert await store.load(thread_id) is None
+
+
+async def test_agent_without_store_restarts():
+    llm = FakeLLM(fields={**CLEAN_FIELDS, "total_charge": "180.00"}, fail_review=1)
+    agent = ExtractionAgent(llm)
+
+    with pytest.raises(Exception):
+        await agent.extract(OCR_TEXT, document_id="doc")
+    await agent.extract(OCR_TEXT, document_id="doc")
+
+    assert llm.calls.count("extract") == 2
@@ -1,7 +1,12 @@
 """API endpoint tests."""
+import io
+
 import pytest
 from fastapi.testclient import TestClient
+from PIL import Image
+
 from app.main import app
+from app.utils.state import MemoryStateBackend
 
 
 client = TestClient(app)
@@ -26,6 +31,67 @@ def test_health_check():
     assert "timestamp" in data
 
 
+def test_metrics_endpoint():
+    """Test metrics endpoint exposes Prometheus text format."""
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert "# TYPE medocr_stage_duration_seconds histogram" in response.text
+
+
+def test_process_url_includes_stage_timings(monkeypatch, document_server, tmp_path):
+    """Test stage breakdown is returned when requested."""
+    from app import pipeline
+    from app.utils.url_fetcher import URLFetcher
+
+    async def fake_ocr(image_data, prompt=None):
+        assert image_data.startswith("data:image/")
+        return "PATIENT'S NAME DOE, JOHN"
+
+    async def fake_extract(ocr_text, form_type="CMS-1500", system_prompt=None, **kwargs):
+        return {"fields": {"patient_name": "DOE, JOHN"}, "reasoning": [], "confidence_scores": {}}
+
+    monkeypatch.setattr(pipeline.ocr_connector, "extract_text", fake_ocr)
+    monkeypatch.setattr(pipeline.llm_connector, "extract_fields", fake_extract)
+    monkeypatch.setattr(pipeline.result_cache, "backend", MemoryStateBackend())
+    monkeypatch.setattr(pipeline.ocr_cache, "backend", MemoryStateBackend())
+    monkeypatch.setattr(
+        pipeline, "url_fetcher",
+        URLFetcher(tmp_path / "cache", max_bytes=1024 * 1024, timeout=5, allow_private=True),
+    )
+    buffer = io.BytesIO()
+    Image.new("RGB", (8, 8), "white").save(buffer, format="PNG")
+    url = document_server.add("/form.png", buffer.getvalue())
+
+    response = client.post("/api/v1/process/url?include_timings=true", json={"image_url": url})
+    assert response.status_code == 200
+    data = response.json()
+    assert data["extracted_fields"] == {"patient_name": "DOE, JOHN"}
+    assert "download" in data["stage_timings_ms"]
+
+    response = client.post("/api/v1/process/url", json={"image_url": url})
+    assert response.json()["cached"] is True
+    assert response.json()["stage_timings_ms"] is None
+
+
+def test_process_url_maps_fetch_errors(monkeypatch, document_server, tmp_path):
+    """Unreachable and unsupported documents are client or gateway errors."""
+    from app import pipeline
+    from app.utils.url_fetcher import URLFetcher
+
+    monkeypatch.setattr(
+        pipeline, "url_fetcher",
+        URLFetcher(tmp_path / "cache", max_bytes=1024, timeout=5, allow_private=True),
+    )
+    missing = document_server.add("/other.png", b"").replace("other", "missing")
+    html = document_server.add("/page.html", b"<html></html>")
+    large = document_server.add("/large.pdf", b"%PDF-" + b"x" * 4096)
+
+    assert client.post("/api/v1/process/url", json={"image_url": missing}).status_code == 502
+    assert client.post("/api/v1/process/url", json={"image_url": html}).status_code == 400
+    assert client.post("/api/v1/process/url", json={"image_url": large}).status_code == 413
+
+
 # TODO: Add tests for OCR endpoint
 # TODO: Add tests for extraction endpoint
 # TODO: Add tests for file upload endpoint
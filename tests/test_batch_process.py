@@ -0,0 +1,76 @@
+"""Batch processing CLI tests."""
+import importlib.util
+import json
+from pathlib import Path
+
+import pytest
+
+from app.pipeline import PipelineResult
+
+
+SCRIPT = Path(__file__).resolve().parent.parent / "scripts" / "batch_process.py"
+
+
+@pytest.fixture
+def batch():
+    spec = importlib.util.spec_from_file_location("batch_process", SCRIPT)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def test_discover_expands_dirs_globs_and_urls(batch, tmp_path):
+    """Directories and globs expand to allowed files, without duplicates."""
+    (tmp_path / "nested").mkdir()
+    for name in ("a.pdf", "b.png", "notes.txt", "nested/c.jpg"):
+        (tmp_path / name).write_bytes(b"x")
+
+    items = batch.discover(
+        [str(tmp_path), str(tmp_path / "*.pdf"), "https://example.com/form.png"], "CMS-1500"
+    )
+
+    assert [Path(i.source).name for i in items] == ["a.pdf", "b.png", "c.jpg", "form.png"]
+    assert items[-1].is_url
+
+
+def test_manifest_csv_and_jsonl(batch, tmp_path):
+    """Manifests provide ids and per-row form types."""
+    csv_path = tmp_path / "manifest.csv"
+    csv_path.write_text("id,source,form_type\nclaim-1,a.pdf,\nclaim-2,b.pdf,UB-04\n")
+    jsonl_path = tmp_path / "manifest.jsonl"
+    jsonl_path.write_text('{"source": "https://example.com/x.png"}\n')
+
+    rows = batch.load_manifest(csv_path, "CMS-1500")
+    assert [(i.id, i.form_type) for i in rows] == [("claim-1", "CMS-1500"), ("claim-2", "UB-04")]
+    assert batch.load_manifest(jsonl_path, "CMS-1500")[0].id == "https://example.com/x.png"
+
+
+async def test_run_batch_resumes_from_checkpoint(batch, tmp_path, monkeypatch):
+    """Completed items are skipped on rerun and failed items are retried."""
+    calls = []
+    failing = {"bad.png"}
+
+    async def fake_process_file(path, form_type, timer):
+        calls.append(path.name)
+        if path.name in failing:
+            raise ValueError("Invalid image file")
+        return PipelineResult("text", {"fields": {"ok": True}}, document_sha256="abc")
+
+    monkeypatch.setattr(batch.pipeline, "process_file", fake_process_file)
+    items = [
+        batch.BatchItem(id=name, source=str(tmp_path / name), form_type="CMS-1500")
+        for name in ("good.png", "bad.png")
+    ]
+    output, checkpoint = tmp_path / "out.jsonl", tmp_path / "out.jsonl.checkpoint"
+
+    first = await batch.run_batch(items, output, checkpoint, concurrency=2, progress=False)
+    failing.clear()
+    second = await batch.run_batch(items, output, checkpoint, concurrency=2, progress=False)
+
+    assert first == {"ok": 1, "error": 1, "skipped": 0}
+    assert second == {"ok": 1, "error": 0, "skipped": 1}
+    assert sorted(calls) == ["bad.png", "bad.png", "good.png"]
+    records = [json.loads(line) for line in output.read_text().splitlines()]
+    assert [r["status"] for r in records].count("ok") == 2
+    assert all(r["extracted_fields"] == {"ok": True} for r in records if r["status"] == "ok")
+    assert checkpoint.read_text().split() == ["good.png", "bad.png"]
@@ -0,0 +1,112 @@
+"""Benchmark harness and mock provider tests."""
+import httpx
+import openai
+import pytest
+
+from benchmarks.mock_provider import LatencyModel, MockProviderServer, load_fixtures
+from benchmarks.micro import measure
+from benchmarks.run_load import percentile, summarize
+
+
+@pytest.fixture(scope="module")
+def mock_server():
+    with MockProviderServer(seed=1) as server:
+        yield server
+
+
+def test_percentile_interpolates():
+    """Percentiles interpolate linearly between ranks."""
+    values = [1, 2, 3, 4, 5, 6, 7, 8, 9, 10]
+    assert percentile(values, 50) == 5.5
+    assert percentile(values, 100) == 10
+    assert percentile([], 95) == 0.0
+    assert summarize([0.1, 0.2], errors=1, wall_seconds=1.0)["throughput_rps"] == 2
+
+
+def test_measure_reports_per_call_time():
+    """Micro-benchmark timing loops fast functions and reports per-call cost."""
+    result = measure(lambda: sum(range(100)), repeat=3, min_time=0.001)
+    assert result["loops"] >= 1
+    assert 0 < result["min_ms"] <= result["median_ms"]
+
+
+def test_latency_spec_validation():
+    """Latency specs are parsed and malformed ones rejected."""
+    assert LatencyModel("fixed:0.25").sample() == 0.25
+    assert 0.1 <= LatencyModel("uniform:0.1,0.2").sample() <= 0.2
+    with pytest.raises(ValueError):
+        LatencyModel("uniform:0.1")
+
+
+def test_llm_request_replays_matching_fixture(mock_server):
+    """LLM requests get the recorded response for the OCR text they embed."""
+    fixture = next(f for f in load_fixtures() if f.name == "sample_montana")
+    client = openai.OpenAI(base_url=mock_server.moonshot_base, api_key="x")
+
+    completion = client.chat.completions.create(
+        model="moonshot-v1-8k",
+        messages=[{"role": "user", "content": f"Extract fields:\n{fixture.ocr_text}"}],
+    )
+
+    assert completion.choices[0].message.content == fixture.llm_text
+    assert completion.usage.prompt_tokens == fixture.llm_usage["prompt_tokens"]
+
+
+def test_ocr_request_matches_url_and_streams(mock_server):
+    """OCR requests match remote URLs by sample name and support streaming."""
+    fixture = next(f for f in load_fixtures() if f.name == "sample_texas")
+    client = openai.OpenAI(base_url=mock_server.hf_base, api_key="x")
+    messages = [{
+        "role": "user",
+        "content": [
+            {"type": "text", "text": "OCR"},
+            {"type": "image_url", "image_url": {"url": f"{mock_server.base_url}/files/sample_texas.pdf"}},
+        ],
+    }]
+
+    stream = client.chat.completions.create(model="ocr", messages=messages, stream=True)
+    text = "".join(chunk.choices[0].delta.content or "" for chunk in stream)
+
+    assert text == fixture.ocr_text
+
+
+def test_rasterised_pages_match_their_own_document():
+    """Registered pages get their document's fixture; unknown pages are refused."""
+    fixtures = load_fixtures()
+    texas = next(f for f in fixtures if f.name == "sample_texas")
+    page = "data:image/png;base64,dGV4YXMgcGFnZQ=="
+    with MockProviderServer(fixtures=fixtures) as server:
+        server.app.state.matcher.register_page("sample_texas", page)
+        client = openai.OpenAI(base_url=server.hf_base, api_key="x", max_retries=0)
+
+        def ocr(url):
+            content = [{"type": "image_url", "image_url": {"url": url}}]
+            return client.chat.completions.create(
+                model="ocr", messages=[{"role": "user", "content": content}]
+            )
+
+        assert ocr(page).choices[0].message.content == texas.ocr_text
+        with pytest.raises(openai.UnprocessableEntityError):
+            ocr("data:image/png;base64,dW5rbm93bg==")
+        assert server.stats["hf.unmatched"] == 1
+
+
+def test_sample_files_with_a_nonce_are_distinct_documents(mock_server):
+    """A nonce makes each served copy of a sample a distinct, still-valid PDF."""
+    original = httpx.get(f"{mock_server.base_url}/files/sample_texas.pdf").content
+    first, second = (
+        httpx.get(f"{mock_server.base_url}/files/sample_texas.pdf", params={"nonce": nonce}).content
+        for nonce in ("a", "b")
+    )
+
+    assert first != second
+    assert first.startswith(original) and second.startswith(original)
+
+
+def test_error_injection_returns_configured_status():
+    """Injected failures surface as provider errors."""
+    with MockProviderServer(error_rate=1.0, error_status=500) as server:
+        client = openai.OpenAI(base_url=server.moonshot_base, api_key="x", max_retries=0)
+        with pytest.raises(openai.InternalServerError):
+            client.chat.completions.create(model="m", messages=[{"role": "user", "content": "hi"}])
+        assert server.stats["moonshot.errors"] == 1
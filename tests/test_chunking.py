@@ -0,0 +1,110 @@
+"""Map-reduce extraction tests."""
+import asyncio
+
+import pytest
+from PIL import Image
+
+from app.agents.chunking import PAGE_BREAK, Chunk, merge_extractions, split_transcript
+from app.config import settings
+from app.utils.metrics import StageTimer
+from app.utils.state import MemoryStateBackend
+
+
+def test_short_pages_are_packed_and_long_pages_split_on_sections():
+    long_page = "## Services\n" + "line\n" * 40 + "\n" + "tail " * 30
+    pages = ["page one " * 5, "page two " * 5, long_page]
+
+    chunks = split_transcript(PAGE_BREAK.join(pages), max_chars=150)
+
+    assert chunks[0].pages == [1, 2]
+    assert all(chunk.pages == [3] for chunk in chunks[1:])
+    assert len(chunks) > 2
+    assert all(len(chunk.text) <= 150 for chunk in chunks)
+    rejoined = "".join(chunk.text for chunk in chunks[1:])
+    assert rejoined.replace("\n", "") == long_page.strip().replace("\n", "")
+
+
+def test_text_that_fits_is_one_chunk():
+    assert split_transcript("short form", max_chars=100) == [Chunk("short form", 1, 1)]
+
+
+def test_merge_resolves_conflicts_deterministically_with_provenance():
+    first, second, third = Chunk("a", 1, 1), Chunk("b", 2, 2), Chunk("c", 3, 4)
+    results = [
+        (first, {"patient_name": "DOE, JOHN", "diagnosis_codes": ["E11.9"],
+                 "total_charge": "150.00"}, {"patient_name": 0.9, "total_charge": 0.4}),
+        (second, {"patient_name": "DOE JOHN", "diagnosis_codes": ["e11.9", "I10"],
+                  "total_charge": "180.00"}, {"patient_name": 0.9, "total_charge": 0.95}),
+        (third, {"patient_name": "DOE, JANE", "diagnosis_codes": [],
+                 "total_charge": None}, {"patient_name": 0.9}),
+    ]
+
+    fields, pages, reasoning = merge_extractions(results)
+
+    # Ties on confidence go to the value most chunks agree on
+    assert fields["patient_name"] == "DOE, JOHN"
+    assert pages["patient_name"] == [1, 2]
+    assert fields["diagnosis_codes"] == ["E11.9", "I10"]
+    assert pages["diagnosis_codes"] == [1, 2]
+    assert fields["total_charge"] == "180.00"
+    assert pages["total_charge"] == [2]
+    assert [entry["reasoning"].split(":")[0] for entry in reasoning] == [
+        "patient_name", "total_charge"
+    ]
+
+
+async def test_chunked_mode_extracts_chunks_concurrently(monkeypatch):
+    from app import pipeline
+
+    monkeypatch.setattr(settings, "extraction_mode", "chunked")
+    monkeypatch.setattr(settings, "extraction_chunk_chars", 60)
+    running, peak = 0, 0
+
+    async def fake_extract(ocr_text, form_type="CMS-1500", system_prompt=None, **kwargs):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.02)
+        running -= 1
+        page = "1" if "DOE" in ocr_text else "2"
+        fields = {"patient_name": "DOE, JOHN"} if page == "1" else {"diagnosis_codes": ["I10"]}
+        return {"raw_response": page, "fields": fields, "reasoning": [], "confidence_scores": {}}
+
+    monkeypatch.setattr(pipeline.llm_connector, "extract_fields", fake_extract)
+    ocr_text = PAGE_BREAK.join([
+        "2. PATIENT'S NAME DOE, JOHN " + "x" * 30,
+        "21. DIAGNOSIS OR NATURE OF ILLNESS I10 " + "y" * 20,
+    ])
+
+    result = await pipeline.extract_fields(ocr_text, "CMS-1500")
+
+    assert peak == 2
+    assert result["llm_calls"] == 2
+    assert result["fields"] == {"patient_name": "DOE, JOHN", "diagnosis_codes": ["I10"]}
+    assert result["field_pages"] == {"patient_name": [1], "diagnosis_codes": [2]}
+    assert result["raw_response"] == PAGE_BREAK.join(["1", "2"])
+
+
+@pytest.mark.parametrize("max_pages, expected", [(0, 3), (1, 1)])
+async def test_only_the_pdf_pages_ocrd_are_rendered(monkeypatch, tmp_path, max_pages, expected):
+    from app import pipeline
+
+    monkeypatch.setattr(settings, "ocr_max_pages", max_pages)
+    monkeypatch.setattr(pipeline.ocr_cache, "backend", MemoryStateBackend())
+    paths = []
+    for number in range(3):
+        paths.append(tmp_path / f"page-{number}.png")
+        Image.new("RGB", (8, 8), "white").save(paths[-1])
+
+    async def fake_render(pdf_path, dpi=None, output_dir=None, max_pages=None):
+        return paths[:max_pages or None]
+
+    async def fake_ocr(image_data, prompt=None):
+        return f"page {len(image_data)}"
+
+    monkeypatch.setattr(pipeline.file_handler, "pdf_to_images_async", fake_render)
+    monkeypatch.setattr(pipeline.ocr_connector, "extract_text", fake_ocr)
+
+    text = await pipeline._ocr(tmp_path / "packet.pdf", "sha", StageTimer(), tmp_path)
+
+    assert len(text.split(PAGE_BREAK)) == expected
@@ -0,0 +1,119 @@
+"""Code index and OCR-confusion correction tests."""
+import os
+import time
+
+import pytest
+
+from app.agents.codes import HCPCS_SHAPE, ICD10_SHAPE, CodeIndex, CodeSets, correct_npi
+from app.agents.validators import validate_fields
+from app.config import settings
+
+
+@pytest.fixture
+def code_sets(tmp_path):
+    (tmp_path / "icd10cm.txt").write_text(
+        "# comment\nS060X0A  Concussion without loss of consciousness\nE119\nI10\nM542\n"
+    )
+    (tmp_path / "hcpcs.txt").write_text("99213\n99214\n3048F\nG8919\n")
+    return CodeSets(tmp_path)
+
+
+def test_index_lookup_and_rebuild(tmp_path):
+    source = tmp_path / "icd10cm.txt"
+    source.write_text("I10\nE119\nS060X0A description\n")
+    index = CodeIndex("icd10cm", source, ICD10_SHAPE)
+
+    assert len(index) == 3
+    assert "E11.9" in index and "i10" in index
+    assert "E11" not in index and "S060X0AA" not in index
+    assert index.path.exists()
+
+    # A newer source file is recompiled on the next load
+    source.write_text("I10\nZ23\n")
+    later = index.path.stat().st_mtime + 10
+    os.utime(source, (later, later))
+    reloaded = CodeIndex("icd10cm", source, ICD10_SHAPE)
+    assert "Z23" in reloaded and "E119" not in reloaded
+
+
+def test_missing_code_set_is_empty(tmp_path):
+    index = CodeIndex("hcpcs", tmp_path / "missing.txt", HCPCS_SHAPE)
+    assert len(index) == 0
+    assert "99213" not in index
+
+
+def test_ocr_confusions_are_corrected(code_sets):
+    fields = {
+        "diagnosis_codes": ["5O6.0X0A", "E11.9", "I1O", "M5A.2"],
+        "service_lines": [
+            {"procedure_code": "992I3", "rendering_provider_npi": "1234S67893"},
+            {"procedure_code": "G89I9", "charges": 10.0},
+        ],
+        "billing_provider_npi": "1234567893",
+    }
+
+    corrected, corrections = code_sets.correct_fields(fields)
+
+    assert corrected["diagnosis_codes"] == ["S06.0X0A", "E11.9", "I10", "M54.2"]
+    assert corrected["service_lines"][0] == {
+        "procedure_code": "99213",
+        "rendering_provider_npi": "1234567893",
+    }
+    assert corrected["service_lines"][1]["procedure_code"] == "G8919"
+    assert fields["diagnosis_codes"][0] == "5O6.0X0A"  # input untouched
+    assert {"field": "diagnosis_codes[0]", "from": "5O6.0X0A", "to": "S06.0X0A"} in corrections
+    assert len(corrections) == 6
+
+
+def test_ambiguous_or_valid_codes_are_left_alone(code_sets, monkeypatch):
+    fields = {
+        "diagnosis_codes": ["J06.9", "S06.OX0A", "XYZ"],
+        "service_lines": [{"procedure_code": "99999"}],
+    }
+
+    corrected, corrections = code_sets.correct_fields(fields)
+    assert corrected == fields and corrections == []
+
+    # Strict mode treats codes missing from the index as errors
+    monkeypatch.setattr(settings, "code_index_strict", True)
+    corrected, _ = code_sets.correct_fields({"diagnosis_codes": ["S06.OX0A", "J06.9"]})
+    assert corrected["diagnosis_codes"] == ["S06.0X0A", "J06.9"]
+
+
+def test_npi_correction():
+    assert correct_npi("1234567893") is None
+    assert correct_npi("I234567893") == "1234567893"
+    assert correct_npi("1234567B93") == "1234567893"
+    assert correct_npi("12345") is None
+
+
+def test_invalid_digit_npi_is_not_rewritten(code_sets):
+    """A mistyped all-digit NPI is kept as read and flagged, never guessed."""
+    # Changing the 5 to a 6 would pass the check digit, but is only a guess
+    assert correct_npi("1234567895") is None
+    fields = {
+        "billing_provider_npi": "1234567895",
+        "service_lines": [{"procedure_code": "99213", "rendering_provider_npi": "1234567895"}],
+    }
+
+    corrected, corrections = code_sets.correct_fields(fields)
+
+    assert corrected == fields and corrections == []
+    assert set(validate_fields(corrected, "").failed) == {"billing_provider_npi", "service_lines"}
+
+
+def test_lookup_is_fast(tmp_path):
+    source = tmp_path / "icd10cm.txt"
+    source.write_text("\n".join(f"A{n:05d}" for n in range(70000)))
+    start = time.perf_counter()
+    index = CodeIndex("icd10cm", source, ICD10_SHAPE)
+    index.load()
+    load_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for n in range(0, 70000, 70):
+        assert f"A{n:05d}" in index
+    lookup_seconds = (time.perf_counter() - start) / 1000
+
+    assert load_seconds < 1.0
+    assert lookup_seconds < 1e-3
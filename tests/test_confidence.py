@@ -0,0 +1,86 @@
+"""Local confidence scoring tests."""
+import json
+import math
+import time
+from pathlib import Path
+
+from app.agents.confidence import FormFields, score_fields, score_forms
+from app.connectors.llm_connector import LLMConnector
+
+
+FIXTURE = Path(__file__).parent.parent / "benchmarks" / "fixtures" / "sample_texas.json"
+
+OCR_TEXT = (
+    "2. PATIENT'S NAME DOE, JOHN 3. PATIENT'S BIRTH DATE 01 15 1980\n"
+    "17b. NPI 1234567893 21. A. E11.9 28. TOTAL CHARGE 150 00"
+)
+
+
+def test_evidence_orders_scores():
+    scores = score_fields(
+        {
+            "patient_name": "DOE, JOHN",
+            "patient_dob": "1980-01-15",
+            "referring_provider_npi": "1234567893",
+            "diagnosis_codes": ["E11.9"],
+            "insured_name": "DOE, JOHM",
+            "billing_provider_npi": "1234567890",
+            "prior_authorization_number": "XYZ-123",
+            "amount_paid": None,
+        },
+        OCR_TEXT,
+    )
+
+    assert scores["patient_name"] == 1.0
+    assert scores["patient_dob"] == 1.0
+    assert scores["referring_provider_npi"] == 1.0
+    assert scores["diagnosis_codes"] == 1.0
+    assert 0.5 < scores["insured_name"] < 1.0  # one OCR-distance edit away
+    assert scores["billing_provider_npi"] < 0.5  # fails the check digit, not on the form
+    assert scores["prior_authorization_number"] == 0.0
+    assert "amount_paid" not in scores
+
+
+def test_charge_total_mismatch_lowers_score():
+    fields = {"total_charge": "150.00", "service_lines": [{"charges": 100.0}, {"charges": 40.0}]}
+
+    scores = score_fields(fields, OCR_TEXT)
+
+    assert scores["total_charge"] < 1.0
+
+
+def test_logprobs_are_used_when_available():
+    raw = '{"patient_name": "DOE, JOHN"}'
+    tokens = [('{"patient_name": "', 0.0), ("DOE", math.log(0.5)), (", JOHN", math.log(0.5)), ('"}', 0.0)]
+
+    with_logprobs = score_fields({"patient_name": "DOE, JOHN"}, OCR_TEXT, raw, tokens)
+
+    assert with_logprobs["patient_name"] < 1.0
+
+
+def test_batch_scores_match_per_form_scores():
+    forms = [
+        FormFields({"patient_name": "DOE, JOHN", "billing_provider_npi": "1234567890"}, OCR_TEXT),
+        FormFields({"insured_name": "DOE, JOHM", "amount_paid": None}, OCR_TEXT),
+        FormFields({"patient_name": "ROE, JANE"}, "2. PATIENT'S NAME ROE, JANE"),
+    ]
+
+    batch = score_forms(forms)
+
+    assert batch == [score_fields(form.fields, form.ocr_text) for form in forms]
+    assert batch[2] == {"patient_name": 1.0}
+    assert score_forms([]) == []
+
+
+def test_scores_a_recorded_form_quickly():
+    fixture = json.loads(FIXTURE.read_text())
+    fields = LLMConnector.parse_response(fixture["llm"]["text"])
+    ocr_text = fixture["ocr"]["text"]
+
+    start = time.perf_counter()
+    scores = score_fields(fields, ocr_text, fixture["llm"]["text"])
+    elapsed = time.perf_counter() - start
+
+    assert scores["patient_name"] == 1.0
+    assert scores["service_lines"] > 0.9
+    assert elapsed < 0.05
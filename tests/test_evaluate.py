@@ -0,0 +1,109 @@
+"""Accuracy evaluation harness tests."""
+import json
+
+import pytest
+
+from benchmarks.evaluate import (
+    Variant,
+    evaluate_variant,
+    load_labels,
+    load_variants,
+    pareto_front,
+    score_document,
+)
+from benchmarks.mock_provider import MockProviderServer
+
+TRUTH = {
+    "patient_name": "GARCIA, MARIA L",
+    "patient_dob": "1979-04-17",
+    "insured_group_number": None,
+    "diagnosis_codes": ["S06.0X0A", "M54.2"],
+    "total_charge": "380.00",
+    "service_lines": [{"procedure_code": "99204", "charges": "225.00"}],
+}
+
+
+def test_equivalent_spellings_score_as_exact_matches():
+    predicted = {
+        "patient_name": "Garcia Maria L",
+        "patient_dob": "04/17/1979",
+        "diagnosis_codes": ["M54.2", "S06.0X0A"],
+        "total_charge": "$380.00",
+        "service_lines": [{"Procedure_Code": "99204", "charges": 225}],
+    }
+
+    score = score_document(predicted, TRUTH)
+
+    assert score["exact_match"] == 1.0
+    assert score["cer"] == 0.0
+    assert score["f1"] == 1.0
+
+
+def test_errors_cost_exact_match_cer_and_f1():
+    predicted = {
+        **TRUTH,
+        "patient_name": "GARCIA, MARIA",
+        "insured_group_number": "CVC-TX",
+        "diagnosis_codes": ["S06.0X0A"],
+    }
+
+    score = score_document(predicted, TRUTH)
+
+    assert score["fields"]["patient_name"]["exact"] is False
+    assert score["fields"]["patient_name"]["cer"] == pytest.approx(2 / len("GARCIA MARIA L"))
+    # A value for a field the form leaves blank is a false positive
+    assert score["fields"]["insured_group_number"] == {"exact": False, "cer": None}
+    assert (score["tp"], score["fp"], score["fn"]) == (5, 2, 2)
+    assert score["exact_match"] == pytest.approx(3 / 6)
+
+
+def test_pareto_front_keeps_non_dominated_variants():
+    points = [
+        {"variant": "fast", "latency": 100, "f1": 0.90, "cer": 0.08},
+        {"variant": "slow", "latency": 300, "f1": 0.99, "cer": 0.01},
+        {"variant": "worse", "latency": 200, "f1": 0.85, "cer": 0.10},
+    ]
+
+    assert pareto_front(points, "latency", "f1") == ["fast", "slow"]
+    assert pareto_front(points, "latency", "cer", higher_is_better=False) == ["fast", "slow"]
+
+
+def test_variants_must_name_real_settings(tmp_path):
+    path = tmp_path / "variants.json"
+    path.write_text(json.dumps([{"name": "typo", "settings": {"pdf_dip": 100}}]))
+
+    with pytest.raises(ValueError, match="pdf_dip"):
+        load_variants(path)
+    assert [v.name for v in load_variants()][0] == "baseline"
+
+
+async def test_variant_is_scored_on_its_recorded_responses(tmp_path):
+    form = next(f for f in load_labels() if f.name == "sample_texas")
+    recording = {
+        "source": "data/samples/sample_texas.pdf",
+        "ocr": {"text": "HEALTH INSURANCE CLAIM FORM"},
+        "llm": {"text": json.dumps({**form.fields, "patient_name": "GARCIA, MARIO"})},
+    }
+    (tmp_path / "misread").mkdir()
+    (tmp_path / "misread" / "sample_texas.json").write_text(json.dumps(recording))
+    small = {"pdf_dpi": 72}
+
+    with MockProviderServer() as server:
+        baseline = await evaluate_variant(
+            Variant("baseline", small), [form], server, recording_dir=tmp_path
+        )
+        misread = await evaluate_variant(
+            Variant("misread", small, image_format="jpeg", jpeg_quality=30),
+            [form],
+            server,
+            recording_dir=tmp_path,
+        )
+
+    assert baseline["responses"] == "fixtures"
+    assert baseline["f1"] == 1.0
+    assert baseline["provider_calls"] == 2
+    assert baseline["tokens_in"] > 0 and baseline["bytes_sent"] > 0
+    assert misread["responses"] == "recorded"
+    assert misread["field_exact_match"]["patient_name"] == 0.0
+    assert misread["f1"] < 1.0
+    assert misread["documents"][0]["latency_ms"] > 0
@@ -0,0 +1,69 @@
+"""Executor layer and off-loop file operation tests."""
+import asyncio
+import shutil
+import time
+from pathlib import Path
+
+import pytest
+from PIL import Image
+
+from app.utils import image_ops
+from app.utils.executors import LOOP_LAG_SECONDS, ExecutorManager, monitor_loop_lag
+from app.utils.file_handler import FileHandler
+
+
+@pytest.fixture
+def page_png(tmp_path):
+    path = tmp_path / "page.png"
+    Image.new("RGB", (200, 100), "white").save(path, "PNG")
+    return path
+
+
+async def test_process_pool_runs_image_ops(page_png, tmp_path):
+    """CPU work runs in worker processes using path-only arguments."""
+    manager = ExecutorManager(io_workers=2, cpu_workers=1)
+    broken = tmp_path / "broken.png"
+    broken.write_bytes(b"not an image")
+    try:
+        assert await manager.run_cpu(image_ops.verify_image, str(page_png)) is True
+        assert await manager.run_cpu(image_ops.verify_image, str(broken)) is False
+        uri = await manager.run_io(image_ops.encode_data_uri, str(page_png))
+    finally:
+        manager.shutdown()
+
+    assert uri.startswith("data:image/png;base64,")
+    assert manager._processes is None and manager._threads is None
+
+
+async def test_file_handler_async_methods(page_png, tmp_path):
+    """Async FileHandler variants match their synchronous counterparts."""
+    handler = FileHandler(upload_dir=str(tmp_path))
+
+    assert await handler.validate_image_async(page_png) is handler.validate_image(page_png)
+    assert await handler.image_to_base64_async(page_png) == handler.image_to_base64(page_png)
+
+
+@pytest.mark.skipif(shutil.which("pdftoppm") is None, reason="poppler not installed")
+async def test_pdf_rasterised_off_loop(tmp_path):
+    """PDF pages are rendered by a worker and returned as paths."""
+    pdf = tmp_path / "sample.pdf"
+    shutil.copy(Path("data/samples/sample_cms_pqrs.pdf"), pdf)
+    handler = FileHandler(upload_dir=str(tmp_path))
+
+    pages = await handler.pdf_to_images_async(pdf, dpi=72)
+
+    assert pages and all(page.suffix == ".png" and page.exists() for page in pages)
+    first = await handler.pdf_to_images_async(pdf, dpi=72, max_pages=1)
+    assert len(first) == 1
+
+
+async def test_loop_lag_monitor_observes_blocking():
+    """A blocked event loop shows up in the lag histogram."""
+    before = LOOP_LAG_SECONDS.count()
+    monitor = asyncio.create_task(monitor_loop_lag(0.01))
+    await asyncio.sleep(0.02)
+    time.sleep(0.05)  # block the loop
+    await asyncio.sleep(0.03)
+    monitor.cancel()
+
+    assert LOOP_LAG_SECONDS.count() > before
@@ -0,0 +1,63 @@
+"""File handler upload tests."""
+import hashlib
+import io
+
+import pytest
+from fastapi import UploadFile
+from fastapi.testclient import TestClient
+
+from app.config import settings
+from app.main import app
+from app.utils.file_handler import FileHandler, UploadTooLargeError
+
+
+def _upload(name: str, content: bytes) -> UploadFile:
+    return UploadFile(file=io.BytesIO(content), filename=name)
+
+
+async def test_save_upload_streams_to_unique_paths(tmp_path, monkeypatch):
+    """Same-named uploads get distinct paths and a streaming content hash."""
+    monkeypatch.setattr(settings, "upload_chunk_size_kb", 1)
+    handler = FileHandler(upload_dir=str(tmp_path))
+    content = b"%PDF-1.4 " + b"x" * 5000
+
+    first = await handler.save_upload(_upload("claim.pdf", content))
+    second = await handler.save_upload(_upload("claim.pdf", content))
+
+    assert first.path != second.path
+    assert first.path.read_bytes() == content
+    assert first.sha256 == second.sha256 == hashlib.sha256(content).hexdigest()
+    assert first.size_bytes == len(content)
+    assert first.original_filename == "claim.pdf"
+
+
+async def test_save_upload_enforces_size_limit(tmp_path, monkeypatch):
+    """Oversized uploads are rejected mid-stream and leave no partial file."""
+    monkeypatch.setattr(settings, "max_upload_size_mb", 1)
+    monkeypatch.setattr(settings, "upload_chunk_size_kb", 64)
+    handler = FileHandler(upload_dir=str(tmp_path))
+
+    with pytest.raises(UploadTooLargeError):
+        await handler.save_upload(_upload("big.png", b"0" * (1024 * 1024 + 1)))
+
+    assert list(tmp_path.iterdir()) == []
+
+
+async def test_save_upload_rejects_extension(tmp_path):
+    """Disallowed extensions raise ValueError."""
+    handler = FileHandler(upload_dir=str(tmp_path))
+    with pytest.raises(ValueError):
+        await handler.save_upload(_upload("payload.exe", b"MZ"))
+
+
+def test_upload_endpoint_rejects_large_body_early():
+    """Bodies over the limit get 413 before the form is parsed."""
+    client = TestClient(app)
+    too_big = settings.max_upload_size_mb * 1024 * 1024 + 128 * 1024
+
+    response = client.post(
+        "/api/v1/process/upload",
+        files={"file": ("big.pdf", b"0" * too_big, "application/pdf")},
+    )
+
+    assert response.status_code == 413
@@ -0,0 +1,127 @@
+"""Model cascade tests."""
+from types import SimpleNamespace
+
+import pytest
+
+from app.config import settings
+from app.connectors.llm_connector import LLMConnector, call_cost, context_window
+from tests.test_agent import CLEAN_FIELDS, OCR_TEXT
+
+SMALL, LARGE = "moonshot-v1-8k", "moonshot-v1-128k"
+
+
+def _connector(monkeypatch, responses):
+    """Connector whose extract_fields answers from ``responses`` per model."""
+    connector = LLMConnector()
+    connector.cascade = [SMALL, LARGE]
+    calls = []
+
+    async def fake_extract(ocr_text, form_type="CMS-1500", system_prompt=None,
+                           field_names=None, model=None):
+        calls.append(model)
+        response = responses[model]
+        if isinstance(response, Exception):
+            raise response
+        return {
+            "raw_response": "{}",
+            "fields": dict(response),
+            "reasoning": [],
+            "confidence_scores": {},
+            "usage": {"latency_ms": 5.0, "prompt_tokens": 900, "completion_tokens": 200},
+        }
+
+    monkeypatch.setattr(connector, "extract_fields", fake_extract)
+    return connector, calls
+
+
+def test_model_names_advertise_context_and_price(monkeypatch):
+    assert context_window(SMALL) == 8192
+    assert context_window("kimi-k2-thinking") is None
+
+    monkeypatch.setattr(settings, "llm_model_prices", {SMALL: [1.0, 3.0]})
+    assert call_cost(SMALL, 1_000_000, 1_000_000) == 4.0
+    assert call_cost(LARGE, 1000, 1000) is None
+
+
+async def test_accepted_small_model_is_not_escalated(monkeypatch):
+    connector, calls = _connector(monkeypatch, {SMALL: CLEAN_FIELDS, LARGE: CLEAN_FIELDS})
+
+    result = await connector.extract_fields_cascade(OCR_TEXT, review=lambda e: None)
+
+    assert calls == [SMALL]
+    assert result["model"] == SMALL
+    assert result["llm_calls"] == 1
+    assert result["model_attempts"] == [
+        {"model": SMALL, "latency_ms": 5.0, "prompt_tokens": 900, "completion_tokens": 200}
+    ]
+    assert "usage" not in result
+
+
+async def test_parse_failure_and_errors_escalate(monkeypatch):
+    connector, calls = _connector(monkeypatch, {SMALL: {}, LARGE: CLEAN_FIELDS})
+
+    result = await connector.extract_fields_cascade(OCR_TEXT)
+
+    assert calls == [SMALL, LARGE]
+    assert result["model"] == LARGE
+    assert result["model_attempts"][0]["escalation"] == "parse failure"
+
+    connector, calls = _connector(
+        monkeypatch, {SMALL: Exception("timeout"), LARGE: Exception("timeout")}
+    )
+    with pytest.raises(Exception, match="timeout"):
+        await connector.extract_fields_cascade(OCR_TEXT)
+    assert calls == [SMALL, LARGE]
+
+
+async def test_prompt_too_large_for_small_context_skips_model(monkeypatch):
+    connector, calls = _connector(monkeypatch, {SMALL: CLEAN_FIELDS, LARGE: CLEAN_FIELDS})
+
+    result = await connector.extract_fields_cascade(OCR_TEXT + "x" * 40_000)
+
+    assert calls == [LARGE]
+    assert result["model_attempts"][0] == {"model": SMALL, "escalation": "context window"}
+    assert result["llm_calls"] == 1
+
+
+async def test_pipeline_escalates_on_validation_failure_and_weak_fields(monkeypatch):
+    from app import pipeline
+
+    connector, calls = _connector(
+        monkeypatch,
+        {SMALL: {**CLEAN_FIELDS, "total_charge": "180.00"}, LARGE: CLEAN_FIELDS},
+    )
+    monkeypatch.setattr(pipeline, "llm_connector", connector)
+
+    result = await pipeline.extract_fields(OCR_TEXT, "CMS-1500")
+
+    assert calls == [SMALL, LARGE]
+    assert result["model_attempts"][0]["escalation"] == "validation failed: total_charge"
+    assert result["fields"]["total_charge"] == "150.00"
+    assert result["llm_calls"] == 2
+
+    # A required field the form carries but the small model left out
+    connector, calls = _connector(
+        monkeypatch,
+        {SMALL: {k: v for k, v in CLEAN_FIELDS.items() if k != "insured_id"}, LARGE: CLEAN_FIELDS},
+    )
+    monkeypatch.setattr(pipeline, "llm_connector", connector)
+
+    result = await pipeline.extract_fields(OCR_TEXT, "CMS-1500")
+
+    assert result["model_attempts"][0]["escalation"] == "low confidence: insured_id"
+    assert result["model"] == LARGE
+
+
+def test_model_call_records_cost(monkeypatch):
+    monkeypatch.setattr(settings, "llm_model_prices", {SMALL: [1.0, 2.0]})
+    completion = SimpleNamespace(usage=SimpleNamespace(prompt_tokens=1000, completion_tokens=500))
+
+    record = LLMConnector._record_model_call(SMALL, 0.25, completion)
+
+    assert record == {
+        "latency_ms": 250.0,
+        "prompt_tokens": 1000,
+        "completion_tokens": 500,
+        "cost": pytest.approx(0.002),
+    }
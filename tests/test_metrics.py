@@ -0,0 +1,49 @@
+"""Metrics registry and stage timer tests."""
+from app.utils.metrics import MetricsRegistry, StageTimer, STAGE_SECONDS, stage
+from app.connectors.llm_connector import LLMConnector
+
+
+def test_counter_and_histogram_render_prometheus_text():
+    """Counters and histograms render cumulative buckets, sum and count."""
+    registry = MetricsRegistry()
+    hits = registry.counter("test_hits_total", "Test hits", ["cache"])
+    latency = registry.histogram("test_latency_seconds", "Test latency", buckets=(0.1, 1.0))
+
+    hits.inc(cache="results")
+    hits.inc(2, cache="results")
+    latency.observe(0.05)
+    latency.observe(0.5)
+    latency.observe(5)
+
+    text = registry.render()
+    assert "# TYPE test_hits_total counter" in text
+    assert 'test_hits_total{cache="results"} 3' in text
+    assert 'test_latency_seconds_bucket{le="0.1"} 1' in text
+    assert 'test_latency_seconds_bucket{le="1"} 2' in text
+    assert 'test_latency_seconds_bucket{le="+Inf"} 3' in text
+    assert "test_latency_seconds_count 3" in text
+
+
+def test_stage_timer_collects_nested_stage_calls():
+    """Module-level stage() records into the active request timer."""
+    timer = StageTimer()
+    before = STAGE_SECONDS.count(stage="unit")
+
+    with timer.activate():
+        with stage("unit"):
+            pass
+        with timer.stage("unit"):
+            pass
+
+    assert set(timer.as_ms()) == {"unit"}
+    assert STAGE_SECONDS.count(stage="unit") == before + 2
+
+
+def test_parse_response_handles_fenced_and_embedded_json():
+    """LLM responses are parsed whether fenced, embedded in prose or invalid."""
+    fenced = 'Here you go:\n```json\n{"patient_name": "DOE, JOHN"}\n```'
+    embedded = 'Result: {"npi": "1234567893"} end'
+
+    assert LLMConnector.parse_response(fenced) == {"patient_name": "DOE, JOHN"}
+    assert LLMConnector.parse_response(embedded) == {"npi": "1234567893"}
+    assert LLMConnector.parse_response("no json here") == {}
@@ -0,0 +1,62 @@
+"""Request profiling tests."""
+import pstats
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.utils.profiling import RequestProfiler
+
+
+def _client(tmp_path, **kwargs):
+    app = FastAPI()
+    app.middleware("http")(RequestProfiler(output_dir=str(tmp_path), **kwargs))
+
+    @app.get("/work")
+    async def work():
+        return {"total": sum(i * i for i in range(10_000))}
+
+    return TestClient(app)
+
+
+def test_header_mode_profiles_only_flagged_requests(tmp_path):
+    """In header mode only requests with X-Profile are profiled."""
+    client = _client(tmp_path, mode="header", slow_ms=0)
+
+    plain = client.get("/work")
+    profiled = client.get("/work", headers={"X-Profile": "1"})
+
+    assert "X-Profile-Path" not in plain.headers
+    path = profiled.headers["X-Profile-Path"]
+    assert pstats.Stats(path).total_calls > 0
+    assert len(list(tmp_path.glob("*.prof"))) == 1
+
+
+def test_fast_requests_are_not_dumped(tmp_path):
+    """Profiles are discarded for requests under the slow threshold."""
+    client = _client(tmp_path, mode="always", slow_ms=60_000)
+
+    response = client.get("/work")
+
+    assert response.status_code == 200
+    assert "X-Profile-Path" not in response.headers
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_profiles_are_written_off_the_event_loop(tmp_path, monkeypatch):
+    """The profile dump goes through the I/O thread pool."""
+    from app.utils import profiling
+
+    offloaded = []
+    run_io = profiling.executors.run_io
+
+    async def recording_run_io(func, *args):
+        offloaded.append(func.__name__)
+        return await run_io(func, *args)
+
+    monkeypatch.setattr(profiling.executors, "run_io", recording_run_io)
+    client = _client(tmp_path, mode="always", slow_ms=0)
+
+    response = client.get("/work")
+
+    assert offloaded == ["_write"]
+    assert pstats.Stats(response.headers["X-Profile-Path"]).total_calls > 0
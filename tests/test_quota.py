@@ -0,0 +1,118 @@
+"""Provider rate-limit budget tests."""
+from types import SimpleNamespace
+
+import pytest
+
+from app.utils.quota import (
+    IMAGE_TOKEN_ESTIMATE,
+    ProviderLimits,
+    ProviderQuotaExceededError,
+    QuotaManager,
+    estimate_tokens,
+)
+from app.utils.state import MemoryStateBackend, SQLiteStateBackend
+
+
+NOW = 1_000_000.0
+
+
+def make_manager(backend=None, **limits):
+    return QuotaManager(
+        backend or MemoryStateBackend(),
+        {"moonshot": ProviderLimits(**limits)},
+        target_ratio=1.0,
+        batch_ratio=0.5,
+        max_wait_seconds=0.05,
+    )
+
+
+def test_estimate_tokens_counts_text_and_images():
+    """Text is counted at ~4 chars per token and images at a flat rate."""
+    messages = [
+        {"role": "system", "content": "x" * 400},
+        {
+            "role": "user",
+            "content": [
+                {"type": "text", "text": "y" * 40},
+                {"type": "image_url", "image_url": {"url": "data:image/png;base64,AAAA"}},
+            ],
+        },
+    ]
+
+    assert estimate_tokens(messages) == 110 + IMAGE_TOKEN_ESTIMATE + 8
+
+
+def test_requests_are_limited_over_a_sliding_window():
+    """The budget is shared over the window and frees up as it slides."""
+    manager = make_manager(rpm=2)
+    key = manager.key_id("secret")
+
+    assert manager.try_reserve("moonshot", key, 10, now=NOW)
+    assert manager.try_reserve("moonshot", key, 10, now=NOW + 1)
+    assert manager.try_reserve("moonshot", key, 10, now=NOW + 2) is None
+    assert manager.usage("moonshot", key, "requests", now=NOW + 2) == 2
+
+    assert manager.try_reserve("moonshot", key, 10, now=NOW + 66)
+
+
+def test_batch_lane_keeps_headroom_for_interactive():
+    """Batch calls stop at their share of the token budget."""
+    manager = make_manager(tpm=1000)
+    key = manager.key_id("secret")
+
+    assert manager.try_reserve("moonshot", key, 400, lane="batch", now=NOW)
+    assert manager.try_reserve("moonshot", key, 400, lane="batch", now=NOW) is None
+    assert manager.try_reserve("moonshot", key, 400, lane="interactive", now=NOW)
+
+
+async def test_reservation_is_corrected_with_actual_usage():
+    """Over-estimates are refunded once the provider reports usage."""
+    manager = make_manager(tpm=1000)
+    key = manager.key_id("secret")
+
+    reservation = await manager.acquire("moonshot", "secret", 900)
+    await reservation.settle(150)
+
+    assert manager.usage("moonshot", key, "tokens") == pytest.approx(150)
+    assert manager.try_reserve("moonshot", key, 800)
+
+
+async def test_budget_is_shared_between_workers(tmp_path):
+    """Managers on one SQLite backend draw from a single budget."""
+    path = str(tmp_path / "state.db")
+    worker_a = make_manager(SQLiteStateBackend(path), rpm=1)
+    worker_b = make_manager(SQLiteStateBackend(path), rpm=1)
+
+    await worker_a.acquire("moonshot", "secret", 10)
+    with pytest.raises(ProviderQuotaExceededError):
+        await worker_b.acquire("moonshot", "secret", 10)
+
+    # Other keys and unlimited providers are unaffected
+    await worker_b.acquire("moonshot", "other-key", 10)
+    await worker_b.acquire("huggingface", "secret", 10)
+
+
+async def test_failed_provider_call_releases_its_reservation(monkeypatch):
+    """A call that raises hands its token estimate back to the budget."""
+    from app.connectors import llm_connector
+
+    manager = make_manager(tpm=1000)
+    monkeypatch.setattr(llm_connector, "quota", manager)
+    monkeypatch.setattr(llm_connector.settings, "moonshot_api_key", "secret")
+
+    async def unavailable(**kwargs):
+        raise RuntimeError("provider unavailable")
+
+    connector = llm_connector.LLMConnector()
+    connector._client = SimpleNamespace(
+        chat=SimpleNamespace(completions=SimpleNamespace(
+            with_raw_response=SimpleNamespace(create=unavailable)
+        ))
+    )
+
+    with pytest.raises(Exception, match="provider unavailable"):
+        await connector.chat([{"role": "user", "content": "x" * 2000}], max_tokens=400)
+
+    key = manager.key_id("secret")
+    assert manager.usage("moonshot", key, "requests") == 1
+    assert manager.usage("moonshot", key, "tokens") == pytest.approx(0)
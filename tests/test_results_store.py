@@ -0,0 +1,119 @@
+"""Columnar results store tests."""
+import asyncio
+import io
+import json
+from datetime import date, datetime, timedelta, timezone
+
+import pytest
+
+from app.utils.results_store import ResultsStore, flatten
+
+EXTRACTION = {
+    "fields": {
+        "patient_name": "DOE, JOHN",
+        "diagnosis_codes": ["E11.9", "I10"],
+        "total_charge": "150.00",
+        "service_lines": [
+            {"CPT Code": "99213", "charge": "100.00"},
+            {"CPT Code": "36415", "charge": "50.00"},
+        ],
+        "notes": "signed",
+    },
+    "confidence_scores": {"patient_name": 0.98, "total_charge": 0.9},
+    "llm_calls": 1,
+    "model": "moonshot-v1-8k",
+}
+
+
+def test_flatten_splits_forms_and_service_lines():
+    now = datetime(2026, 10, 19, tzinfo=timezone.utc)
+
+    rows = flatten("abc", "CMS-1500", EXTRACTION, now)
+
+    form = rows["forms"][0]
+    assert form["patient_name"] == "DOE, JOHN"
+    assert form["diagnosis_codes"] == ["E11.9", "I10"]
+    assert form["confidence_patient_name"] == 0.98
+    assert form["insured_id"] is None
+    assert json.loads(form["other_fields"]) == {"notes": "signed"}
+    assert [line["cpt_code"] for line in rows["service_lines"]] == ["99213", "36415"]
+    assert rows["service_lines"][1]["line_number"] == 2
+
+
+async def test_store_buffers_then_exports_projected_date_ranges(tmp_path, monkeypatch):
+    pd = pytest.importorskip("pandas")
+    pytest.importorskip("pyarrow")
+    import app.utils.results_store as module
+
+    store = ResultsStore(tmp_path, flush_rows=3)
+    days = iter([datetime(2026, 10, 1, tzinfo=timezone.utc)] * 2 + [
+        datetime(2026, 10, 19, tzinfo=timezone.utc)
+    ])
+
+    class Clock(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return next(days)
+
+    monkeypatch.setattr(module, "datetime", Clock)
+    for sha in ("a", "b"):
+        await store.append(sha, "CMS-1500", EXTRACTION)
+    assert list(tmp_path.rglob("*.parquet")) == []
+    await store.append("c", "CMS-1500", EXTRACTION)
+
+    assert sorted(p.parent.name for p in (tmp_path / "forms").glob("*/*.parquet")) == [
+        "date=2026-10-01", "date=2026-10-19"
+    ]
+    monkeypatch.setattr(module, "datetime", datetime)
+
+    recent = store.query("forms", ["patient_name", "total_charge"], start=date(2026, 10, 10))
+    assert list(recent.columns) == [
+        "document_sha256", "processed_at", "patient_name", "total_charge"
+    ]
+    assert recent["document_sha256"].tolist() == ["c"]
+
+    lines = store.query("service_lines", end=date(2026, 10, 1))
+    assert len(lines) == 4
+    assert set(lines["document_sha256"]) == {"a", "b"}
+
+    exported = pd.read_parquet(io.BytesIO(store.export("forms", ["diagnosis_codes"])))
+    assert [list(codes) for codes in exported["diagnosis_codes"]] == [["E11.9", "I10"]] * 3
+
+
+def test_unknown_table_or_format_is_rejected(tmp_path):
+    store = ResultsStore(tmp_path)
+
+    with pytest.raises(ValueError):
+        store.export("claims")
+    with pytest.raises(ValueError):
+        store.export("forms", fmt="xlsx")
+
+
+def test_export_endpoint_returns_csv(tmp_path, monkeypatch):
+    pytest.importorskip("pandas")
+    pytest.importorskip("pyarrow")
+    from fastapi.testclient import TestClient
+
+    from app import routes
+    from app.main import app
+
+    store = ResultsStore(tmp_path)
+    monkeypatch.setattr(routes, "results_store", store)
+    client = TestClient(app)
+    today = datetime.now(timezone.utc).date()
+
+    asyncio.run(store.append("abc", "CMS-1500", EXTRACTION))
+    response = client.get(
+        "/api/v1/results/export",
+        params={
+            "fields": "patient_name",
+            "format": "csv",
+            "start": str(today - timedelta(days=1)),
+        },
+    )
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    assert response.text.splitlines()[0] == "document_sha256,processed_at,patient_name"
+    assert "DOE, JOHN" in response.text
+    assert client.get("/api/v1/results/export?table=claims").status_code == 400
@@ -0,0 +1,149 @@
+"""Request coalescing tests."""
+import asyncio
+
+import pytest
+from PIL import Image
+
+from app.utils.metrics import StageTimer
+from app.utils.single_flight import SingleFlight
+from app.utils.state import MemoryStateBackend
+
+
+async def test_concurrent_callers_share_one_computation():
+    flight = SingleFlight(None, lease_seconds=10)
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "result"
+
+    results = await asyncio.gather(*(flight.run("doc", compute) for _ in range(5)))
+
+    assert calls == [1]
+    assert [value for value, _ in results] == ["result"] * 5
+    assert sorted(shared for _, shared in results) == [False, True, True, True, True]
+
+
+async def test_leader_failure_reaches_every_caller_and_is_not_remembered():
+    flight = SingleFlight(None, lease_seconds=10)
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("provider down")
+
+    results = await asyncio.gather(
+        *(flight.run("doc", fail) for _ in range(3)), return_exceptions=True
+    )
+    assert all(isinstance(r, RuntimeError) for r in results)
+
+    async def succeed():
+        return "ok"
+
+    assert await flight.run("doc", succeed) == ("ok", False)
+
+
+async def test_cancelled_leader_is_taken_over():
+    flight = SingleFlight(None, lease_seconds=10)
+    started = asyncio.Event()
+
+    async def slow():
+        started.set()
+        await asyncio.sleep(10)
+
+    async def quick():
+        return "ok"
+
+    leader = asyncio.create_task(flight.run("doc", slow))
+    await started.wait()
+    follower = asyncio.create_task(flight.run("doc", quick))
+    await asyncio.sleep(0)
+    leader.cancel()
+
+    assert await follower == ("ok", False)
+
+
+async def test_workers_coalesce_through_the_shared_lease():
+    """A second worker waits for the lease holder and reads its published result."""
+    backend = MemoryStateBackend()
+    published = {}
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        published["doc"] = "result"
+        return "result"
+
+    async def lookup():
+        return published.get("doc")
+
+    workers = [SingleFlight(backend, lease_seconds=10, poll_interval=0.01) for _ in range(2)]
+    results = await asyncio.gather(*(w.run("doc", compute, lookup) for w in workers))
+
+    assert calls == [1]
+    assert sorted(results) == [("result", False), ("result", True)]
+    assert backend.get("inflight:doc") is None
+
+
+
+async def test_slow_leader_renews_its_lease_and_releases_only_its_own():
+    backend = MemoryStateBackend()
+    published = {}
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.2)  # Several lease lifetimes
+        published["doc"] = "result"
+        return "result"
+
+    async def lookup():
+        return published.get("doc")
+
+    workers = [SingleFlight(backend, lease_seconds=0.05, poll_interval=0.01) for _ in range(2)]
+    results = await asyncio.gather(*(w.run("doc", compute, lookup) for w in workers))
+
+    assert calls == [1]
+    assert sorted(results) == [("result", False), ("result", True)]
+
+    # A leader whose lease was taken over must not release the new holder's lease
+    async def overtaken():
+        backend.set("inflight:other", "another-worker", ttl=10)
+        return "late"
+
+    flight = SingleFlight(backend, lease_seconds=10)
+    assert await flight.run("other", overtaken, lambda: asyncio.sleep(0)) == ("late", False)
+    assert backend.get("inflight:other") == "another-worker"
+
+
+async def test_duplicate_documents_run_the_pipeline_once(monkeypatch, tmp_path):
+    from app import pipeline
+
+    monkeypatch.setattr(pipeline.result_cache, "backend", MemoryStateBackend())
+    monkeypatch.setattr(pipeline.ocr_cache, "backend", MemoryStateBackend())
+    calls = []
+
+    async def fake_ocr(image_data, prompt=None):
+        calls.append("ocr")
+        await asyncio.sleep(0.05)
+        return "PATIENT'S NAME DOE, JOHN"
+
+    async def fake_extract(ocr_text, form_type="CMS-1500", system_prompt=None, **kwargs):
+        calls.append("llm")
+        return {"fields": {"patient_name": "DOE, JOHN"}, "reasoning": [], "confidence_scores": {}}
+
+    monkeypatch.setattr(pipeline.ocr_connector, "extract_text", fake_ocr)
+    monkeypatch.setattr(pipeline.llm_connector, "extract_fields", fake_extract)
+    path = tmp_path / "form.png"
+    Image.new("RGB", (8, 8), "white").save(path)
+
+    timers = [StageTimer() for _ in range(3)]
+    results = await asyncio.gather(
+        *(pipeline.process_file(path, "CMS-1500", timer) for timer in timers)
+    )
+
+    assert calls == ["ocr", "llm"]
+    assert sorted(r.cached for r in results) == [False, True, True]
+    assert all(r.extraction["fields"] == {"patient_name": "DOE, JOHN"} for r in results)
+    assert sum("coalesce" in timer.stages for timer in timers) == 2
@@ -0,0 +1,56 @@
+"""Cold-start import budget tests."""
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+# Heavy libraries that must only be imported when first used
+DEFERRED_MODULES = ["openai", "langgraph", "pdf2image", "pandas", "streamlit", "sklearn"]
+
+_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps({{
+    "seconds": elapsed,
+    "loaded": [m for m in {deferred!r} if m in sys.modules],
+}}))
+"""
+
+
+def _probe(module):
+    env = dict(os.environ, HF_TOKEN="test-hf-token", MOONSHOT_API_KEY="test-moonshot-key")
+    result = subprocess.run(
+        [sys.executable, "-c", _PROBE.format(module=module, deferred=DEFERRED_MODULES)],
+        cwd=REPO_ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+@pytest.mark.parametrize(
+    "module, budget",
+    [
+        ("app.main", 1.5),
+        ("app.connectors.ocr_connector", 0.75),
+        ("app.agents.extraction_agent", 0.75),
+    ],
+)
+def test_import_stays_within_budget(module, budget):
+    """Importing the app or a connector defers heavy clients and libraries."""
+    budget *= float(os.environ.get("IMPORT_BUDGET_SCALE", "1"))
+
+    probe = _probe(module)
+
+    assert probe["loaded"] == []
+    assert probe["seconds"] < budget
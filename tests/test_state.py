@@ -0,0 +1,112 @@
+"""Shared state backend and result cache tests."""
+import io
+import multiprocessing
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+from PIL import Image
+
+from app.main import app
+from app.utils.state import MemoryStateBackend, SQLiteStateBackend
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def backend(request, tmp_path):
+    if request.param == "memory":
+        backend = MemoryStateBackend()
+    else:
+        backend = SQLiteStateBackend(str(tmp_path / "state.db"))
+    yield backend
+    backend.close()
+
+
+def test_backend_get_set_and_expiry(backend):
+    """Values round-trip and disappear after their TTL."""
+    backend.set("a", "1")
+    backend.set("b", "2", ttl=0.01)
+    assert backend.get_many(["a", "b", "missing"]) == ["1", "2", None]
+
+    time.sleep(0.02)
+    assert backend.get("b") is None
+    backend.delete("a")
+    assert backend.get("a") is None
+
+
+def test_backend_set_if_absent_and_incr(backend):
+    """Claims are exclusive until they expire, and counters accumulate."""
+    assert backend.set_if_absent("lock", "worker-1", ttl=0.01)
+    assert not backend.set_if_absent("lock", "worker-2")
+    time.sleep(0.02)
+    assert backend.set_if_absent("lock", "worker-2")
+
+    assert backend.incr("tokens", 100, ttl=60) == 100
+    assert backend.incr("tokens", 50, ttl=60) == 150
+
+
+def _increment(path, times):
+    backend = SQLiteStateBackend(path)
+    for _ in range(times):
+        backend.incr("shared", 1)
+    backend.close()
+
+
+def test_sqlite_counters_are_shared_across_processes(tmp_path):
+    """Increments from several worker processes are never lost."""
+    path = str(tmp_path / "state.db")
+    context = multiprocessing.get_context("spawn")
+    workers = [context.Process(target=_increment, args=(path, 50)) for _ in range(3)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join(timeout=60)
+
+    assert SQLiteStateBackend(path).get("shared") == "150.0"
+
+
+def test_repeated_upload_is_served_from_cache(monkeypatch):
+    """A re-uploaded document skips OCR and extraction."""
+    from app import pipeline, routes
+
+    monkeypatch.setattr(routes.result_cache, "backend", MemoryStateBackend())
+    monkeypatch.setattr(pipeline.ocr_cache, "backend", MemoryStateBackend())
+    calls = []
+
+    async def fake_ocr(image_data, prompt=None):
+        calls.append("ocr")
+        return "PATIENT'S NAME DOE, JOHN"
+
+    async def fake_extract(ocr_text, form_type="CMS-1500", system_prompt=None, **kwargs):
+        return {"fields": {"patient_name": "DOE, JOHN"}, "reasoning": [], "confidence_scores": {}}
+
+    monkeypatch.setattr(routes.ocr_connector, "extract_text", fake_ocr)
+    monkeypatch.setattr(pipeline.llm_connector, "extract_fields", fake_extract)
+    buffer = io.BytesIO()
+    Image.new("RGB", (8, 8), "white").save(buffer, format="PNG")
+    client = TestClient(app)
+
+    responses = [
+        client.post(
+            "/api/v1/process/upload",
+            files={"file": ("form.png", buffer.getvalue(), "image/png")},
+        ).json()
+        for _ in range(2)
+    ]
+
+    assert calls == ["ocr"]
+    assert [r["cached"] for r in responses] == [False, True]
+    assert responses[1]["extracted_fields"] == {"patient_name": "DOE, JOHN"}
+
+
+def test_backend_compare_and_delete_or_renew(backend):
+    backend.set("lease", "mine", ttl=0.05)
+
+    assert backend.expire_if_equal("lease", "theirs", ttl=10) is False
+    assert backend.expire_if_equal("lease", "mine", ttl=10) is True
+    time.sleep(0.1)
+    assert backend.get("lease") == "mine"
+
+    assert backend.delete_if_equal("lease", "theirs") is False
+    assert backend.get("lease") == "mine"
+    assert backend.delete_if_equal("lease", "mine") is True
+    assert backend.get("lease") is None
@@ -0,0 +1,76 @@
+"""Tracing tests."""
+from app.utils.tracing import (
+    NOOP_SPAN,
+    InMemorySpanExporter,
+    SimpleSpanProcessor,
+    Tracer,
+    parse_traceparent,
+)
+
+
+def _tracer(sample_ratio=1.0):
+    tracer = Tracer()
+    exporter = InMemorySpanExporter()
+    tracer.configure(SimpleSpanProcessor(exporter), sample_ratio)
+    return tracer, exporter
+
+
+def test_disabled_tracer_yields_noop_span():
+    """A disabled tracer records nothing."""
+    tracer = Tracer()
+    with tracer.span("root") as span:
+        span.set_attribute("ignored", 1)
+    assert span is NOOP_SPAN
+
+
+def test_child_spans_share_trace_and_link_parent():
+    """Nested spans form a single trace with parent links and attributes."""
+    tracer, exporter = _tracer()
+
+    with tracer.span("root", {"route": "/process/upload"}) as root:
+        with tracer.span("child") as child:
+            child.set_attribute("pdf.page_count", 2)
+
+    child_span, root_span = exporter.spans
+    assert child_span.trace_id == root_span.trace_id == root.trace_id
+    assert child_span.parent_id == root_span.span_id
+    assert child_span.attributes["pdf.page_count"] == 2
+    assert root_span.to_dict()["attributes"][0]["key"] == "route"
+
+
+def test_unsampled_trace_drops_all_spans():
+    """A root that is not sampled suppresses its children too."""
+    tracer, exporter = _tracer(sample_ratio=0.0)
+
+    with tracer.span("root"):
+        with tracer.span("child") as child:
+            pass
+
+    assert child is NOOP_SPAN
+    assert exporter.spans == []
+
+
+def test_exception_marks_span_as_error():
+    """Exceptions leaving a span set its status to ERROR."""
+    tracer, exporter = _tracer()
+
+    try:
+        with tracer.span("failing"):
+            raise RuntimeError("boom")
+    except RuntimeError:
+        pass
+
+    assert exporter.spans[0].status == "ERROR"
+
+
+def test_traceparent_continues_remote_trace():
+    """An incoming traceparent header sets the trace id and parent."""
+    header = "00-4bf92f3577b34da6a3ce929d0e0e4736-00f067aa0ba902b7-01"
+    tracer, exporter = _tracer(sample_ratio=0.0)
+
+    with tracer.span("root", traceparent=header):
+        pass
+
+    assert parse_traceparent("garbage") is None
+    assert exporter.spans[0].trace_id == "4bf92f3577b34da6a3ce929d0e0e4736"
+    assert exporter.spans[0].parent_id == "00f067aa0ba902b7"
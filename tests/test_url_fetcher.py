@@ -0,0 +1,176 @@
+"""Server-side URL fetch tests."""
+import hashlib
+
+import pytest
+
+from app.utils.file_handler import UploadTooLargeError
+from app.utils.url_fetcher import RemoteFetchError, URLFetcher
+
+PDF = b"%PDF-1.4 " + b"x" * 5000
+PNG = b"\x89PNG\r\n\x1a\n" + b"\0" * 100
+
+
+@pytest.fixture
+def fetcher(tmp_path):
+    fetcher = URLFetcher(
+        tmp_path / "cache", max_bytes=64 * 1024, timeout=5, allow_private=True
+    )
+    return fetcher
+
+
+async def test_fetch_streams_document_into_workspace(fetcher, document_server, tmp_path):
+    url = document_server.add("/claims/form", PDF)
+
+    document = await fetcher.fetch(url, tmp_path)
+    await fetcher.aclose()
+
+    assert document.path.parent == tmp_path
+    assert document.path.suffix == ".pdf"
+    assert document.path.read_bytes() == PDF
+    assert document.sha256 == hashlib.sha256(PDF).hexdigest()
+    assert document.size_bytes == len(PDF)
+
+
+async def test_unchanged_document_is_revalidated_not_downloaded(
+    fetcher, document_server, tmp_path
+):
+    url = document_server.add("/form.png", PNG, etag='"v1"')
+
+    first = await fetcher.fetch(url, tmp_path)
+    second = await fetcher.fetch(url, tmp_path)
+    await fetcher.aclose()
+
+    assert document_server.requests[1][1]["If-None-Match"] == '"v1"'
+    assert second.path != first.path
+    assert second.path.read_bytes() == PNG
+    assert second.sha256 == first.sha256
+
+
+async def test_body_evicted_during_revalidation_is_downloaded_again(
+    fetcher, document_server, tmp_path
+):
+    url = document_server.add("/form.png", PNG, etag='"v1"')
+    await fetcher.fetch(url, tmp_path)
+    load_meta = fetcher._load_meta
+
+    def load_then_evict(url):
+        meta = load_meta(url)
+        fetcher._cache_paths(url)[0].unlink()  # a concurrent _store evicts the body
+        return meta
+
+    fetcher._load_meta = load_then_evict
+    document = await fetcher.fetch(url, tmp_path)
+    await fetcher.aclose()
+
+    assert document.path.read_bytes() == PNG
+    assert [headers.get("If-None-Match") for _, headers in document_server.requests] == [
+        None, '"v1"', None
+    ]
+
+
+async def test_oversized_document_is_rejected(fetcher, document_server, tmp_path):
+    url = document_server.add("/big.pdf", b"%PDF-" + b"x" * (128 * 1024))
+
+    with pytest.raises(UploadTooLargeError):
+        await fetcher.fetch(url, tmp_path)
+    await fetcher.aclose()
+
+    assert list(tmp_path.glob("*.download")) == []
+
+
+async def test_unsupported_content_is_rejected(fetcher, document_server, tmp_path):
+    url = document_server.add("/form.pdf", b"<html>not found</html>")
+
+    with pytest.raises(ValueError, match="not a PDF"):
+        await fetcher.fetch(url, tmp_path)
+    await fetcher.aclose()
+
+
+async def test_http_error_raises_remote_fetch_error(fetcher, document_server, tmp_path):
+    url = document_server.add("/exists.pdf", PDF).replace("exists", "missing")
+
+    with pytest.raises(RemoteFetchError, match="404"):
+        await fetcher.fetch(url, tmp_path)
+    await fetcher.aclose()
+
+
+@pytest.mark.parametrize("url", ["http://127.0.0.1/form.pdf", "file:///etc/passwd"])
+async def test_private_and_non_http_urls_are_refused(url, tmp_path):
+    fetcher = URLFetcher(tmp_path / "cache", max_bytes=1024, timeout=5)
+
+    with pytest.raises(ValueError):
+        await fetcher.fetch(url, tmp_path)
+
+
+@pytest.fixture
+def public_server(monkeypatch):
+    """A document server on 127.0.0.2, which the fetcher is told is public."""
+    import ipaddress
+
+    from app.utils import url_fetcher
+    from tests.conftest import DocumentServer
+
+    monkeypatch.setattr(
+        url_fetcher, "_is_public", lambda address: address == ipaddress.ip_address("127.0.0.2")
+    )
+    server = DocumentServer(host="127.0.0.2")
+    server.thread.start()
+    yield server
+    server.httpd.shutdown()
+    server.httpd.server_close()
+
+
+async def test_redirects_are_followed_and_checked_per_hop(
+    public_server, document_server, tmp_path
+):
+    fetcher = URLFetcher(tmp_path / "cache", max_bytes=64 * 1024, timeout=5)
+    target = public_server.add("/form.pdf", PDF)
+    moved = public_server.redirect("/moved", target)
+    internal = public_server.redirect("/metadata", document_server.add("/secret.pdf", PDF))
+
+    document = await fetcher.fetch(moved, tmp_path)
+    assert document.path.read_bytes() == PDF
+
+    with pytest.raises(ValueError, match="not a public address"):
+        await fetcher.fetch(internal, tmp_path)
+    await fetcher.aclose()
+
+    assert document_server.requests == []
+
+
+async def test_connections_to_private_addresses_are_refused(monkeypatch, document_server, tmp_path):
+    """An address that changes after the URL check (DNS rebinding) is caught at connect."""
+    fetcher = URLFetcher(tmp_path / "cache", max_bytes=64 * 1024, timeout=5)
+    url = document_server.add("/form.pdf", PDF)
+
+    async def checked(url):
+        pass
+
+    monkeypatch.setattr(fetcher, "_check_host", checked)
+    with pytest.raises(ValueError, match="not a public address"):
+        await fetcher.fetch(url, tmp_path)
+    await fetcher.aclose()
+
+    assert document_server.requests == []
+
+
+async def test_host_rebound_to_loopback_is_refused_at_connect(
+    monkeypatch, public_server, tmp_path
+):
+    """A name that resolves publicly for the URL check and to loopback at connect."""
+    from app.utils import url_fetcher
+
+    answers = iter([["127.0.0.2"], ["127.0.0.1"]])
+
+    async def rebinding_resolve(host, port):
+        return next(answers)
+
+    monkeypatch.setattr(url_fetcher, "_resolve", rebinding_resolve)
+    fetcher = URLFetcher(tmp_path / "cache", max_bytes=64 * 1024, timeout=5)
+    url = public_server.add("/form.pdf", PDF).replace("127.0.0.2", "rebind.example")
+
+    with pytest.raises(ValueError, match="not a public address"):
+        await fetcher.fetch(url, tmp_path)
+    await fetcher.aclose()
+
+    assert public_server.requests == []
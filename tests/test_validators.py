@@ -0,0 +1,53 @@
+"""Deterministic field check tests."""
+from app.agents.validators import (
+    grounded,
+    icd10_valid,
+    npi_valid,
+    parse_date,
+    parse_money,
+    validate_fields,
+)
+
+
+def test_npi_check_digit():
+    assert npi_valid("1234567893")
+    assert not npi_valid("1234567890")
+    assert not npi_valid("12345")
+
+
+def test_formats():
+    assert icd10_valid("E11.9") and icd10_valid("z0000")
+    assert not icd10_valid("U07") and not icd10_valid("123")
+    assert parse_money("150 00") == 150.0
+    assert parse_money("$1,250.50") == 1250.5
+    assert parse_money("n/a") is None
+    assert parse_date("01 15 1980").year == 1980
+    assert parse_date("13 45 1980") is None
+    assert parse_date("01 15 2999") is None
+
+
+def test_grounded_ignores_punctuation_and_case():
+    text = "2. PATIENT'S NAME DOE, JOHN\n28. TOTAL CHARGE 150 00"
+    assert grounded("Doe John", text)
+    assert grounded("150.00", text)
+    assert not grounded("DOE, JANE", text)
+
+
+def test_validate_fields_reports_cross_field_failures():
+    text = "TOTAL CHARGE 180 00 AMOUNT PAID 20 00 PATIENT'S NAME DOE, JOHN"
+    fields = {
+        "patient_name": "DOE, JOHN",
+        "insured_name": "ROE, JANE",
+        "total_charge": "180.00",
+        "amount_paid": "20.00",
+        "patient_sex": "X",
+        "service_lines": [{"charge": "100.00"}, {"charge": "50.00"}],
+        "prior_authorization_number": None,
+    }
+
+    report = validate_fields(fields, text)
+
+    assert set(report.failed) == {"total_charge", "patient_sex"}
+    assert {"patient_name", "amount_paid"} <= set(report.validated)
+    assert "insured_name" in report.unverified
+    assert "prior_authorization_number" not in report.validated + report.unverified
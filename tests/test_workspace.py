@@ -0,0 +1,90 @@
+"""Request workspace, sweeper and disk quota tests."""
+import os
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.utils.workspace import DiskQuotaExceededError, WorkspaceManager
+
+
+async def test_workspace_removed_on_failure(tmp_path):
+    """Every artefact in a workspace is removed even if processing fails."""
+    manager = WorkspaceManager(tmp_path)
+
+    with pytest.raises(RuntimeError):
+        async with manager.workspace() as workspace:
+            workspace.file("upload.pdf").write_bytes(b"%PDF")
+            (workspace.path / "upload_page-1.png").write_bytes(b"png")
+            raise RuntimeError("OCR failed")
+
+    assert not workspace.path.exists()
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_sweeper_removes_only_expired_entries(tmp_path):
+    """Orphans older than the TTL are swept; fresh and hidden files stay."""
+    manager = WorkspaceManager(tmp_path, ttl_seconds=60)
+    stale = tmp_path / "req-stale"
+    stale.mkdir()
+    (stale / "page.png").write_bytes(b"x")
+    legacy = tmp_path / "old_upload.pdf"
+    legacy.write_bytes(b"x")
+    old = time.time() - 3600
+    for path in (stale, legacy):
+        os.utime(path, (old, old))
+    fresh = tmp_path / "req-fresh"
+    fresh.mkdir()
+    (tmp_path / ".gitkeep").touch()
+
+    assert manager.sweep() == 2
+    assert sorted(p.name for p in tmp_path.iterdir()) == [".gitkeep", "req-fresh"]
+
+
+def test_quota_blocks_new_workspaces(tmp_path):
+    """Workspaces are refused once the upload directory reaches its quota."""
+    manager = WorkspaceManager(tmp_path, quota_mb=1, min_free_mb=0)
+    (tmp_path / "blob").write_bytes(b"0" * (1024 * 1024))
+
+    with pytest.raises(DiskQuotaExceededError):
+        manager.workspace()
+
+
+def test_quota_check_uses_usage_cached_by_the_sweeper(tmp_path, monkeypatch):
+    """The quota check reads the cached figure; only the sweeper walks the tree."""
+    from app.utils import workspace as workspace_module
+
+    walks = []
+    real_tree_size = workspace_module._tree_size
+    monkeypatch.setattr(
+        workspace_module, "_tree_size", lambda path: walks.append(path) or real_tree_size(path)
+    )
+    manager = WorkspaceManager(tmp_path, quota_mb=1, min_free_mb=0)
+
+    for _ in range(3):
+        with manager.workspace():
+            pass
+    assert len(walks) == 1
+
+    (tmp_path / "blob").write_bytes(b"0" * (1024 * 1024))
+    manager.workspace()
+    manager.sweep()
+    assert len(walks) == 2
+    with pytest.raises(DiskQuotaExceededError):
+        manager.workspace()
+
+
+def test_upload_endpoint_sheds_load_over_quota(monkeypatch):
+    """The upload endpoint answers 503 with Retry-After when over quota."""
+    from app import routes
+
+    monkeypatch.setattr(routes.workspaces, "quota_bytes", 0)
+    client = TestClient(app)
+
+    response = client.post(
+        "/api/v1/process/upload", files={"file": ("form.png", b"png", "image/png")}
+    )
+
+    assert response.status_code == 503
+    assert "Retry-After" in response.headers